@@ -0,0 +1,149 @@
+import bisect
+import datetime
+import threading
+from collections import defaultdict
+
+import almacen_pedidos
+
+PEDIDOS_FILE = almacen_pedidos.PEDIDOS_FILE
+
+CONFIRMADOS = ("confirmado",)
+
+
+def inicio_semana(fecha):
+    """Lunes de la semana de `fecha`."""
+    return fecha - datetime.timedelta(days=fecha.weekday())
+
+
+class Agenda:
+    """
+    Índice de pedidos por fecha de evento, una lista ordenada por estado:
+    estado -> [(ordinal de fecha_evento, seq, id_pedido)]
+    Un rango ("confirmados entre D1 y D2") son dos bisect más los k
+    resultados: O(log n + k). Los pedidos sin fecha válida no se indexan.
+    actualizar() sólo mueve los pedidos que cambiaron entre listas.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._lock = threading.RLock()
+        self._generacion = None
+        self._listas = defaultdict(list)
+        self._claves = {}     # id_pedido -> (estado, (ordinal, seq, id_pedido))
+        self._pedidos = {}
+        self._siguiente_seq = 0
+
+    # ---------------------------
+    # Mantenimiento
+    # ---------------------------
+    def actualizar(self):
+        with self._lock:
+            generacion, cambiados = self.store.cambios_desde(self._generacion)
+            if cambiados is None:
+                self._reconstruir()
+            else:
+                for id_pedido in cambiados:
+                    self._quitar(id_pedido)
+                    pedido = self.store.get(id_pedido)
+                    if pedido is not None:
+                        self._poner(pedido, ordenado=True)
+            self._generacion = generacion
+        return self
+
+    def _reconstruir(self):
+        self._listas = defaultdict(list)
+        self._claves = {}
+        self._pedidos = {}
+        self._siguiente_seq = 0
+        for pedido in self.store.query():
+            self._poner(pedido, ordenado=False)
+        for lista in self._listas.values():
+            lista.sort()
+
+    def _poner(self, pedido, ordenado):
+        self._pedidos[pedido.id_pedido] = pedido
+        if pedido.fecha_evento is None:
+            return
+        anterior = self._claves.get(pedido.id_pedido)
+        if anterior:
+            seq = anterior[1][1]
+        else:
+            seq = self._siguiente_seq
+            self._siguiente_seq += 1
+        clave = (pedido.fecha_evento.toordinal(), seq, pedido.id_pedido)
+        self._claves[pedido.id_pedido] = (pedido.estado, clave)
+        if ordenado:
+            bisect.insort(self._listas[pedido.estado], clave)
+        else:
+            self._listas[pedido.estado].append(clave)
+
+    def _quitar(self, id_pedido):
+        # La clave se conserva en _claves para que el pedido mantenga su seq
+        self._pedidos.pop(id_pedido, None)
+        anterior = self._claves.get(id_pedido)
+        if anterior is None:
+            return
+        estado, clave = anterior
+        lista = self._listas[estado]
+        i = bisect.bisect_left(lista, clave)
+        if i < len(lista) and lista[i] == clave:
+            del lista[i]
+
+    # ---------------------------
+    # Consultas
+    # ---------------------------
+    def __len__(self):
+        return len(self._pedidos)
+
+    def rango(self, desde=None, hasta=None, estados=CONFIRMADOS):
+        """Pedidos en `estados` con evento entre `desde` y `hasta` (inclusive; None = sin límite), por fecha."""
+        if isinstance(estados, str):
+            estados = (estados,)
+        inicio = (desde.toordinal(),) if desde else ()
+        fin = (hasta.toordinal() + 1,) if hasta else None
+
+        with self._lock:
+            claves = []
+            for estado in estados:
+                lista = self._listas.get(estado, [])
+                i = bisect.bisect_left(lista, inicio)
+                j = bisect.bisect_left(lista, fin) if fin else len(lista)
+                claves.extend(lista[i:j])
+            if len(estados) > 1:
+                claves.sort()
+            return [self._pedidos[c[2]] for c in claves]
+
+    def dia(self, fecha, estados=CONFIRMADOS):
+        return self.rango(fecha, fecha, estados)
+
+    def semana(self, fecha, estados=CONFIRMADOS):
+        """Lunes a domingo de la semana de `fecha`."""
+        lunes = inicio_semana(fecha)
+        return self.rango(lunes, lunes + datetime.timedelta(days=6), estados)
+
+    def mes(self, fecha, estados=CONFIRMADOS):
+        primero = fecha.replace(day=1)
+        siguiente = (primero + datetime.timedelta(days=32)).replace(day=1)
+        return self.rango(primero, siguiente - datetime.timedelta(days=1), estados)
+
+    def por_dia(self, desde=None, hasta=None, estados=CONFIRMADOS):
+        """{fecha: [pedidos]} del rango."""
+        dias = defaultdict(list)
+        for pedido in self.rango(desde, hasta, estados):
+            dias[pedido.fecha_evento].append(pedido)
+        return dict(dias)
+
+
+# ---------------------------
+# Agenda compartida por el proceso (sobrevive a los reruns de Streamlit)
+# ---------------------------
+_agendas = {}
+_agendas_lock = threading.Lock()
+
+
+def obtener_agenda(file=PEDIDOS_FILE):
+    with _agendas_lock:
+        if file not in _agendas:
+            _agendas[file] = Agenda(almacen_pedidos.obtener_store(file))
+        agenda = _agendas[file]
+    return agenda.actualizar()
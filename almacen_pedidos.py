@@ -0,0 +1,272 @@
+import csv
+import os
+import sys
+import threading
+from collections import Counter
+from dataclasses import replace
+
+import busqueda
+import persistencia
+from modelos import Order
+
+PEDIDOS_FILE = "pedidos.csv"
+
+CAMPOS = [
+    "id_pedido", "fecha_creacion", "id_cliente", "nombre_cliente", "fecha_evento", "items", "total", "estado", "version"
+]
+
+# Cada cuántos cambios de estado en el diario se reescribe pedidos.csv
+COMPACTAR_CADA = 1000
+
+# Máquina de estados: acción -> (estado requerido, estado nuevo)
+# cotizacion -> confirmado -> recogido, y cancelar regresa a cotizacion
+TRANSICIONES = {
+    "confirm": ("cotizacion", "confirmado"),
+    "cancel": ("confirmado", "cotizacion"),
+    "mark_picked_up": ("confirmado", "recogido"),
+}
+
+
+class TransicionInvalida(ValueError):
+    """El pedido no está en el estado que la acción requiere."""
+
+
+class ConflictoVersion(RuntimeError):
+    """El pedido cambió (otra pestaña u otro proceso) desde la versión que se leyó."""
+
+
+def migrar(file=PEDIDOS_FILE):
+    """
+    Migración única del pedidos.csv original al formato del almacén:
+    agrega la columna `version` y rellena `estado` vacío con "cotizacion".
+    No hace nada si el archivo ya está migrado. Devuelve True si migró.
+    """
+    with persistencia.bloqueo(file):
+        if not os.path.exists(file):
+            persistencia.escribir_atomico(file, persistencia.csv_a_texto([], CAMPOS), newline="")
+            return True
+
+        with open(file, newline="", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            if reader.fieldnames and "version" in reader.fieldnames:
+                return False
+            filas = list(reader)
+
+        for fila in filas:
+            fila["estado"] = fila.get("estado") or "cotizacion"
+            fila["version"] = "0"
+
+        persistencia.escribir_atomico(file, persistencia.csv_a_texto(filas, CAMPOS), newline="")
+        return True
+
+
+class OrderStore(persistencia.CSVConDiario):
+    """
+    Almacén de pedidos de sólo-anexar.
+    - pedidos.csv sigue siendo la base: un pedido nuevo es una fila anexada.
+    - Los cambios de estado se anexan a pedidos.log (una línea JSON cada uno).
+    - Cada COMPACTAR_CADA cambios, el diario se aplica sobre pedidos.csv
+      (reescritura atómica) y se vacía.
+    Escribir cuesta lo mismo con 10 o con 100k pedidos. La lectura es
+    incremental: sólo se leen los bytes anexados desde la última vez.
+    En memoria cada pedido es un modelos.Order (inmutable, con __slots__):
+    las consultas devuelven los mismos objetos sin copiarlos.
+    """
+
+    CAMPOS = CAMPOS
+
+    def __init__(self, file=PEDIDOS_FILE, compactar_cada=COMPACTAR_CADA):
+        super().__init__(file, compactar_cada)
+
+    def _preparar(self):
+        migrar(self.file)
+
+    def _vaciar(self):
+        self._pedidos = {}
+        self._nombres = Counter()
+        self._indice = None  # se construye con la primera búsqueda
+        # Registro de cambios para quien mantenga vistas derivadas:
+        # cada fila cargada o cambio aplicado suma 1 a la generación
+        self._generacion = getattr(self, "_generacion", 0) + 1
+        self._generacion_base = self._generacion
+        self._cambiados = []
+
+    def _registrar_cambio(self, id_pedido):
+        self._generacion += 1
+        self._cambiados.append(id_pedido)
+
+    def _cargar_fila(self, fila):
+        pedido = Order.from_row(fila)
+        self._guardar_en_memoria(pedido)
+        if self._indice is not None:
+            self._indice.agregar(pedido.id_pedido, pedido.id_pedido, pedido.nombre_cliente)
+
+    def _guardar_en_memoria(self, pedido):
+        self._registrar_cambio(pedido.id_pedido)
+        anterior = self._pedidos.get(pedido.id_pedido)
+        if anterior is not None:
+            self._nombres[anterior.nombre_cliente] -= 1
+        self._pedidos[pedido.id_pedido] = pedido
+        self._nombres[pedido.nombre_cliente] += 1
+
+    def _aplicar(self, cambio):
+        pedido = self._pedidos.get(cambio["id_pedido"])
+        if pedido is not None:
+            self._guardar_en_memoria(pedido.con_estado(cambio["estado"], int(cambio["version"])))
+
+    def _filas(self):
+        return (p.to_row() for p in self._pedidos.values())
+
+    # ---------------------------
+    # API
+    # ---------------------------
+    def add(self, pedido):
+        """Anexa un pedido nuevo (Order o dict con las columnas de pedidos.csv) y lo devuelve como Order."""
+        if not isinstance(pedido, Order):
+            pedido = Order.from_row(pedido)
+
+        with persistencia.bloqueo(self.file):
+            self._sincronizar()
+            if pedido.id_pedido in self._pedidos:
+                raise ValueError(f"El pedido {pedido.id_pedido} ya existe")
+            self._anexar_fila(pedido.to_row())
+
+        return pedido
+
+    def get(self, id_pedido):
+        self._sincronizar()
+        return self._pedidos.get(id_pedido)
+
+    def __len__(self):
+        self._sincronizar()
+        return len(self._pedidos)
+
+    def update_estado(self, id_pedido, estado, version=None, requerido=None, validar=None):
+        """
+        Registra el nuevo estado en el diario (una línea, sin reescribir el csv)
+        y devuelve el pedido actualizado.
+        - version: la que el llamador leyó; si ya no es la actual, lanza ConflictoVersion
+        - requerido: estado en el que debe estar; si no, lanza TransicionInvalida
+        - validar: función(pedido) que se llama con el bloqueo tomado antes de
+          escribir; si lanza una excepción, el cambio no se registra
+        """
+        with persistencia.bloqueo(self.file):
+            self._sincronizar()
+            pedido = self._pedidos.get(id_pedido)
+            if pedido is None:
+                raise KeyError(f"No existe el pedido {id_pedido}")
+            if version is not None and pedido.version != version:
+                raise ConflictoVersion(
+                    f"El pedido {id_pedido} fue modificado por alguien más (versión {pedido.version}, se esperaba {version})"
+                )
+            if requerido is not None and pedido.estado != requerido:
+                raise TransicionInvalida(
+                    f"El pedido {id_pedido} está en '{pedido.estado}', se requiere '{requerido}' para pasar a '{estado}'"
+                )
+            if validar is not None:
+                validar(pedido)
+
+            self._anexar_cambio({
+                "id_pedido": id_pedido,
+                "estado": estado,
+                "version": pedido.version + 1
+            })
+            return self._pedidos[id_pedido]
+
+    def transicion(self, id_pedido, accion, version=None, validar=None):
+        """Aplica una acción de TRANSICIONES respetando la máquina de estados."""
+        requerido, estado = TRANSICIONES[accion]
+        return self.update_estado(id_pedido, estado, version=version, requerido=requerido, validar=validar)
+
+    def confirm(self, id_pedido, version=None, validar=None):
+        """cotizacion -> confirmado (p. ej. validar=inventario.obtener_disponibilidad().verificar)"""
+        return self.transicion(id_pedido, "confirm", version, validar)
+
+    def cancel(self, id_pedido, version=None):
+        """confirmado -> cotizacion"""
+        return self.transicion(id_pedido, "cancel", version)
+
+    def mark_picked_up(self, id_pedido, version=None):
+        """confirmado -> recogido"""
+        return self.transicion(id_pedido, "mark_picked_up", version)
+
+    def recodificar_items(self, codificar):
+        """
+        Reescribe pedidos.csv (atómico, con el diario aplicado) guardando los
+        ítems de cada pedido con `codificar(items)`. Los pedidos cuyo texto no
+        cambia o no se puede leer se dejan igual. Devuelve cuántos cambiaron.
+        """
+        with persistencia.bloqueo(self.file):
+            self._sincronizar()
+            cambiados = 0
+            for id_pedido, pedido in list(self._pedidos.items()):
+                if pedido.items is None:
+                    continue
+                texto = codificar(pedido.items)
+                if texto != pedido.items_texto:
+                    self._pedidos[id_pedido] = replace(pedido, items_texto=texto, _items=pedido.items)
+                    cambiados += 1
+            if cambiados:
+                self._compactar()   # recarga todo: las vistas derivadas se reconstruyen
+            return cambiados
+
+    def buscar(self, texto, k=20):
+        """Top-k pedidos por id_pedido o nombre del cliente (sin acentos ni mayúsculas)."""
+        self._sincronizar()
+        with self._lock:
+            if self._indice is None:
+                self._indice = busqueda.IndiceBusqueda()
+                for p in self._pedidos.values():
+                    self._indice.agregar(p.id_pedido, p.id_pedido, p.nombre_cliente)
+            return [self._pedidos[i] for i in self._indice.buscar(texto, k)]
+
+    def cambios_desde(self, generacion):
+        """
+        (generación actual, ids de pedidos que cambiaron desde `generacion`).
+        Los ids son None si hubo una recarga completa y hay que reconstruir todo.
+        """
+        self._sincronizar()
+        with self._lock:
+            if generacion is None or generacion < self._generacion_base:
+                return self._generacion, None
+            return self._generacion, set(self._cambiados[generacion - self._generacion_base:])
+
+    def nombres_clientes(self):
+        """Nombres de cliente distintos, mantenidos al cargar (sin recorrer los pedidos)."""
+        self._sincronizar()
+        with self._lock:
+            return sorted(nombre for nombre, cuenta in self._nombres.items() if cuenta > 0)
+
+    def query(self, estado=None, id_cliente=None, nombre_cliente=None):
+        """Pedidos (Order) en orden de creación que cumplen todos los filtros dados."""
+        self._sincronizar()
+        with self._lock:
+            return [
+                p for p in self._pedidos.values()
+                if (estado is None or p.estado == estado)
+                and (id_cliente is None or p.id_cliente == id_cliente)
+                and (nombre_cliente is None or p.nombre_cliente == nombre_cliente)
+            ]
+
+
+# ---------------------------
+# Almacén compartido por el proceso
+# ---------------------------
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def obtener_store(file=PEDIDOS_FILE):
+    with _stores_lock:
+        if file not in _stores:
+            _stores[file] = OrderStore(file)
+        return _stores[file]
+
+
+if __name__ == "__main__":
+    # python almacen_pedidos.py migrar [pedidos.csv]
+    if len(sys.argv) > 1 and sys.argv[1] == "migrar":
+        archivo = sys.argv[2] if len(sys.argv) > 2 else PEDIDOS_FILE
+        print("[OK] Migrado" if migrar(archivo) else "[INFO] Ya estaba migrado")
+    else:
+        print("Uso: python almacen_pedidos.py migrar [pedidos.csv]")
@@ -0,0 +1,208 @@
+import datetime
+import threading
+
+import numpy as np
+
+import almacen_pedidos
+from modelos import ESTADOS, ColumnasPedidos
+
+PEDIDOS_FILE = almacen_pedidos.PEDIDOS_FILE
+
+# Estados que cuentan como ingreso (una cotización todavía no lo es)
+INGRESOS = ("confirmado", "recogido")
+
+_EPOCA = datetime.date(1970, 1, 1).toordinal()
+
+
+def _agrupar(claves, centavos):
+    """(claves únicas, suma de centavos, cantidad) por clave, en una pasada con bincount."""
+    unicas, inversa = np.unique(claves, return_inverse=True)
+    totales = np.bincount(inversa, weights=centavos, minlength=len(unicas))
+    cuentas = np.bincount(inversa, minlength=len(unicas))
+    return unicas, np.rint(totales).astype(np.int64), cuentas
+
+
+class Analitica:
+    """
+    Ingresos agregados con NumPy sobre modelos.ColumnasPedidos:
+    - por_mes / por_semana: total y número de pedidos por periodo
+    - por_cliente / por_item: ranking de ingresos
+    - utilizacion: qué tanto se rentó cada artículo en un rango de fechas
+    Cada consulta es un par de pasadas vectorizadas (unique + bincount).
+    actualizar() sólo agrega o modifica las filas de los pedidos que
+    cambiaron; las columnas se reconstruyen si pedidos.csv se recargó.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._lock = threading.RLock()
+        self._generacion = None
+        self._columnas = ColumnasPedidos()
+        self._arreglos = None
+
+    def actualizar(self):
+        with self._lock:
+            generacion, cambiados = self.store.cambios_desde(self._generacion)
+            if cambiados is None:
+                self._columnas = ColumnasPedidos.desde(self.store.query())
+                self._arreglos = None
+            elif cambiados:
+                for id_pedido in cambiados:
+                    pedido = self.store.get(id_pedido)
+                    if pedido is not None:
+                        self._columnas.agregar(pedido)
+                self._arreglos = None
+            self._generacion = generacion
+        return self
+
+    def _np(self):
+        """Copia de las columnas como arreglos NumPy (se rehace sólo si hubo cambios)."""
+        with self._lock:
+            if self._arreglos is None:
+                c = self._columnas
+                self._arreglos = {
+                    "evento": np.array(c.evento, dtype=np.int64),
+                    "total": np.array(c.total, dtype=np.int64),
+                    "estado": np.array(c.estado, dtype=np.int8),
+                    "cliente": np.array(c.cliente, dtype=np.int64),
+                    "item_fila": np.array(c.item_fila, dtype=np.int64),
+                    "item_codigo": np.array(c.item_codigo, dtype=np.int64),
+                    "item_cantidad": np.array(c.item_cantidad, dtype=np.int64),
+                    "item_importe": np.array(c.item_importe, dtype=np.int64),
+                    "clientes": list(c.clientes),
+                    "descripciones": list(c.descripciones),
+                }
+            return self._arreglos
+
+    def __len__(self):
+        return len(self._columnas)
+
+    # ---------------------------
+    # Filtros
+    # ---------------------------
+    @staticmethod
+    def _mascara(a, estados, desde, hasta):
+        codigos = [ESTADOS.index(e) for e in estados]
+        mascara = np.isin(a["estado"], codigos) & (a["evento"] > 0)
+        if desde is not None:
+            mascara &= a["evento"] >= desde.toordinal()
+        if hasta is not None:
+            mascara &= a["evento"] <= hasta.toordinal()
+        return mascara
+
+    # ---------------------------
+    # Consultas
+    # ---------------------------
+    def rango(self, estados=INGRESOS):
+        """(primera, última) fecha de evento de los pedidos en `estados`; None si no hay."""
+        a = self._np()
+        eventos = a["evento"][self._mascara(a, estados, None, None)]
+        if not len(eventos):
+            return None
+        return datetime.date.fromordinal(int(eventos.min())), datetime.date.fromordinal(int(eventos.max()))
+
+    def por_mes(self, estados=INGRESOS, desde=None, hasta=None):
+        """[{mes: date(año, mes, 1), total_centavos, pedidos}] del mes más reciente al más antiguo."""
+        a = self._np()
+        m = self._mascara(a, estados, desde, hasta)
+        # meses desde 1970: entero que ordena igual que la fecha
+        meses = (a["evento"][m] - _EPOCA).astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+        claves, totales, cuentas = _agrupar(meses, a["total"][m])
+        return [
+            {"mes": datetime.date(1970 + int(k) // 12, int(k) % 12 + 1, 1), "total_centavos": int(t), "pedidos": int(n)}
+            for k, t, n in zip(claves[::-1], totales[::-1], cuentas[::-1])
+        ]
+
+    def por_semana(self, estados=INGRESOS, desde=None, hasta=None):
+        """[{semana: lunes (date), total_centavos, pedidos}] de la semana más reciente a la más antigua."""
+        a = self._np()
+        m = self._mascara(a, estados, desde, hasta)
+        eventos = a["evento"][m]
+        lunes = eventos - (eventos - 1) % 7    # el ordinal 1 (01-01-0001) fue lunes
+        claves, totales, cuentas = _agrupar(lunes, a["total"][m])
+        return [
+            {"semana": datetime.date.fromordinal(int(k)), "total_centavos": int(t), "pedidos": int(n)}
+            for k, t, n in zip(claves[::-1], totales[::-1], cuentas[::-1])
+        ]
+
+    def por_cliente(self, estados=INGRESOS, desde=None, hasta=None, k=None):
+        """[{cliente, total_centavos, pedidos}] de mayor a menor ingreso (top-k si se indica)."""
+        a = self._np()
+        m = self._mascara(a, estados, desde, hasta)
+        claves, totales, cuentas = _agrupar(a["cliente"][m], a["total"][m])
+        orden = np.argsort(-totales, kind="stable")[:k]
+        return [
+            {"cliente": a["clientes"][claves[i]], "total_centavos": int(totales[i]), "pedidos": int(cuentas[i])}
+            for i in orden
+        ]
+
+    def por_item(self, estados=INGRESOS, desde=None, hasta=None):
+        """[{descripcion, cantidad, total_centavos, pedidos}] de mayor a menor ingreso."""
+        a = self._np()
+        m = self._mascara(a, estados, desde, hasta)[a["item_fila"]]
+        codigos = a["item_codigo"][m]
+        claves, totales, cuentas = _agrupar(codigos, a["item_importe"][m])
+        unidades = np.bincount(np.searchsorted(claves, codigos), weights=a["item_cantidad"][m], minlength=len(claves))
+        orden = np.argsort(-totales, kind="stable")
+        return [
+            {
+                "descripcion": a["descripciones"][claves[i]],
+                "cantidad": int(unidades[i]),
+                "total_centavos": int(totales[i]),
+                "pedidos": int(cuentas[i])
+            }
+            for i in orden
+        ]
+
+    def utilizacion(self, desde, hasta, stock=None, estados=INGRESOS):
+        """
+        Uso de cada artículo rentado entre `desde` y `hasta` (inclusive):
+        - dias_en_uso: días con al menos un pedido que lo incluye
+        - unidades_dia: suma de unidades rentadas por día
+        - ocupacion: unidades_dia / (stock * días) si se da `stock`
+          ({descripcion: unidades}); si no, dias_en_uso / días
+        """
+        a = self._np()
+        dias = (hasta - desde).days + 1
+        m = self._mascara(a, estados, desde, hasta)[a["item_fila"]]
+        codigos = a["item_codigo"][m]
+        eventos = a["evento"][a["item_fila"][m]]
+
+        claves, _, _ = _agrupar(codigos, a["item_importe"][m])
+        posicion = np.searchsorted(claves, codigos)
+        unidades_dia = np.bincount(posicion, weights=a["item_cantidad"][m], minlength=len(claves))
+        # días distintos por artículo: pares (artículo, día) únicos
+        pares = np.unique(posicion * (dias + 1) + (eventos - desde.toordinal()))
+        dias_en_uso = np.bincount(pares // (dias + 1), minlength=len(claves))
+
+        resultado = []
+        for i, codigo in enumerate(claves):
+            descripcion = a["descripciones"][codigo]
+            unidades = (stock or {}).get(descripcion)
+            if unidades:
+                ocupacion = unidades_dia[i] / (unidades * dias)
+            else:
+                ocupacion = dias_en_uso[i] / dias
+            resultado.append({
+                "descripcion": descripcion,
+                "dias_en_uso": int(dias_en_uso[i]),
+                "unidades_dia": int(unidades_dia[i]),
+                "ocupacion": float(ocupacion)
+            })
+        resultado.sort(key=lambda r: -r["ocupacion"])
+        return resultado
+
+
+# ---------------------------
+# Analítica compartida por el proceso (sobrevive a los reruns de Streamlit)
+# ---------------------------
+_analiticas = {}
+_analiticas_lock = threading.Lock()
+
+
+def obtener_analitica(file=PEDIDOS_FILE):
+    with _analiticas_lock:
+        if file not in _analiticas:
+            _analiticas[file] = Analitica(almacen_pedidos.obtener_store(file))
+        analitica = _analiticas[file]
+    return analitica.actualizar()
@@ -0,0 +1,232 @@
+import datetime
+import glob
+import gzip
+import hashlib
+import os
+import sys
+import threading
+from collections import defaultdict
+
+import busqueda
+import folios
+import persistencia
+from modelos import EntradaPDF, parse_fecha
+
+PDF_DIR = "pdfs"
+
+CAMPOS = ["folio", "id_pedido", "cliente", "fecha", "ruta", "bytes", "sha256", "comprimido"]
+
+# Días después de los cuales `archivar` comprime un PDF (archivo frío)
+DIAS_ARCHIVO_FRIO = int(os.environ.get("ARCHIVO_PDF_DIAS_FRIO", "180"))
+
+
+def _ruta_fragmento(fecha, folio):
+    """pdfs/AAAA/MM/COT-xxx.pdf: ningún directorio junta más de un mes de cotizaciones."""
+    return os.path.join(f"{fecha.year:04d}", f"{fecha.month:02d}", f"{folio}.pdf")
+
+
+class ArchivoPDF(persistencia.CSVConDiario):
+    """
+    Archivo de cotizaciones en PDF con índice (pdfs/indice.csv):
+    folio -> id_pedido, cliente, fecha, ruta, tamaño y sha256.
+    - los PDFs van en subdirectorios por año/mes (pdfs/2025/09/COT-042.pdf)
+    - consultas por folio, por pedido, por cliente y búsqueda por prefijo,
+      sin listar el directorio
+    - los PDFs viejos se pueden comprimir con gzip (archivar); leer() los
+      devuelve ya descomprimidos
+    Los PDFs sueltos de la versión anterior (pdfs/COT-*.pdf) se indexan y
+    se mueven a su subdirectorio la primera vez que se abre el archivo.
+    """
+
+    CAMPOS = CAMPOS
+
+    def __init__(self, directorio=PDF_DIR, compactar_cada=1000):
+        self.directorio = directorio
+        super().__init__(os.path.join(directorio, "indice.csv"), compactar_cada)
+
+    def _preparar(self):
+        with persistencia.bloqueo(self.file):
+            if os.path.exists(self.file):
+                return
+            filas = [self._importar_suelto(p).to_row()
+                     for p in sorted(glob.glob(os.path.join(self.directorio, "COT-*.pdf")), key=folios.clave_orden)]
+            persistencia.escribir_atomico(self.file, persistencia.csv_a_texto(filas, self.CAMPOS), newline="")
+
+    def _importar_suelto(self, path):
+        folio = os.path.splitext(os.path.basename(path))[0]
+        fecha = datetime.date.fromtimestamp(os.stat(path).st_mtime)
+        with open(path, "rb") as f:
+            pdf_bytes = f.read()
+        ruta = _ruta_fragmento(fecha, folio)
+        os.makedirs(os.path.dirname(self._absoluta(ruta)), exist_ok=True)
+        os.replace(path, self._absoluta(ruta))
+        return EntradaPDF(folio, "", "", fecha, ruta, len(pdf_bytes), hashlib.sha256(pdf_bytes).hexdigest())
+
+    def _vaciar(self):
+        self._por_folio = {}
+        self._por_pedido = defaultdict(list)
+        self._por_cliente = defaultdict(list)
+        self._orden_cache = None
+        self._indice = None  # se construye con la primera búsqueda
+
+    def _indexar(self, entrada):
+        anterior = self._por_folio.get(entrada.folio)
+        if anterior is not None:
+            self._por_pedido[anterior.id_pedido].remove(anterior.folio)
+            self._por_cliente[busqueda.normalizar(anterior.cliente)].remove(anterior.folio)
+        else:
+            self._orden_cache = None
+        self._por_folio[entrada.folio] = entrada
+        self._por_pedido[entrada.id_pedido].append(entrada.folio)
+        self._por_cliente[busqueda.normalizar(entrada.cliente)].append(entrada.folio)
+        if self._indice is not None:
+            self._indice.agregar(entrada.folio, entrada.folio, entrada.cliente)
+
+    def _cargar_fila(self, fila):
+        self._indexar(EntradaPDF.from_row(fila))
+
+    def _aplicar(self, cambio):
+        self._indexar(EntradaPDF.from_row(cambio["pdf"]))
+
+    def _filas(self):
+        return (e.to_row() for e in self._por_folio.values())
+
+    def _absoluta(self, ruta):
+        return os.path.join(self.directorio, ruta)
+
+    # ---------------------------
+    # Consultas
+    # ---------------------------
+    def get(self, folio):
+        self._sincronizar()
+        return self._por_folio.get(folio)
+
+    def __len__(self):
+        self._sincronizar()
+        return len(self._por_folio)
+
+    def recientes(self, k=None):
+        """Entradas del folio más alto al más bajo (las `k` primeras)."""
+        self._sincronizar()
+        with self._lock:
+            if self._orden_cache is None:
+                self._orden_cache = sorted(self._por_folio, key=folios.clave_orden, reverse=True)
+            folios_ordenados = self._orden_cache[:k] if k else self._orden_cache
+            return [self._por_folio[f] for f in folios_ordenados]
+
+    def por_pedido(self, id_pedido):
+        self._sincronizar()
+        with self._lock:
+            return [self._por_folio[f] for f in sorted(self._por_pedido.get(id_pedido, []), key=folios.clave_orden, reverse=True)]
+
+    def por_cliente(self, nombre):
+        """Cotizaciones de un cliente (sin acentos ni mayúsculas), más recientes primero."""
+        self._sincronizar()
+        with self._lock:
+            folios_cliente = self._por_cliente.get(busqueda.normalizar(nombre), [])
+            return [self._por_folio[f] for f in sorted(folios_cliente, key=folios.clave_orden, reverse=True)]
+
+    def buscar(self, texto, k=50):
+        """Top-k entradas cuyo folio o cliente empieza con `texto` (o lo contiene)."""
+        self._sincronizar()
+        with self._lock:
+            if self._indice is None:
+                self._indice = busqueda.IndiceBusqueda()
+                for entrada in self._por_folio.values():
+                    self._indice.agregar(entrada.folio, entrada.folio, entrada.cliente)
+            return [self._por_folio[f] for f in self._indice.buscar(texto, k)]
+
+    def ruta(self, folio):
+        """Ruta del PDF en disco (.pdf, o .pdf.gz si está archivado); None si no existe."""
+        entrada = self.get(folio)
+        if entrada is None:
+            return None
+        path = self._absoluta(entrada.ruta)
+        return path if os.path.exists(path) else None
+
+    def leer(self, folio):
+        path = self.ruta(folio)
+        if path is None:
+            return None
+        with open(path, "rb") as f:
+            datos = f.read()
+        return gzip.decompress(datos) if path.endswith(".gz") else datos
+
+    # ---------------------------
+    # Escrituras
+    # ---------------------------
+    def publicar(self, folio, pdf_bytes, id_pedido=None, cliente=None, fecha=None):
+        """
+        Guarda el PDF en su subdirectorio (escritura atómica) y lo registra
+        en el índice. Si el folio ya existía (re-publicación) se conserva el
+        pedido/cliente que no se indique. Devuelve la ruta del PDF.
+        """
+        fecha = fecha or datetime.date.today()
+        ruta = _ruta_fragmento(fecha, folio)
+        path = self._absoluta(ruta)
+        persistencia.escribir_atomico(path, pdf_bytes, modo="wb")
+
+        with persistencia.bloqueo(self.file):
+            self._sincronizar()
+            anterior = self._por_folio.get(folio)
+            entrada = EntradaPDF(
+                folio=folio,
+                id_pedido=id_pedido or (anterior.id_pedido if anterior else ""),
+                cliente=cliente or (anterior.cliente if anterior else ""),
+                fecha=fecha,
+                ruta=ruta,
+                bytes=len(pdf_bytes),
+                sha256=hashlib.sha256(pdf_bytes).hexdigest()
+            )
+            if anterior is None:
+                self._anexar_fila(entrada.to_row())
+                self._sincronizar()
+            else:
+                self._anexar_cambio({"pdf": entrada.to_row()})
+                if anterior.ruta != ruta and os.path.exists(self._absoluta(anterior.ruta)):
+                    os.remove(self._absoluta(anterior.ruta))
+        return path
+
+    def archivar(self, antes_de=None):
+        """
+        Comprime con gzip los PDFs con fecha anterior a `antes_de` (por
+        defecto, hace DIAS_ARCHIVO_FRIO días). Devuelve cuántos se archivaron.
+        """
+        antes_de = antes_de or datetime.date.today() - datetime.timedelta(days=DIAS_ARCHIVO_FRIO)
+        archivados = 0
+        with persistencia.bloqueo(self.file):
+            self._sincronizar()
+            for entrada in list(self._por_folio.values()):
+                path = self._absoluta(entrada.ruta)
+                if entrada.comprimido or entrada.fecha >= antes_de or not os.path.exists(path):
+                    continue
+                with open(path, "rb") as f:
+                    persistencia.escribir_atomico(path + ".gz", gzip.compress(f.read()), modo="wb")
+                # Orden importante: primero el índice apunta al .gz, después se borra el .pdf
+                self._anexar_cambio({"pdf": {**entrada.to_row(), "ruta": entrada.ruta + ".gz", "comprimido": "1"}})
+                os.remove(path)
+                archivados += 1
+        return archivados
+
+
+# ---------------------------
+# Archivo compartido por el proceso
+# ---------------------------
+_archivos = {}
+_archivos_lock = threading.Lock()
+
+
+def obtener_archivo(directorio=PDF_DIR):
+    with _archivos_lock:
+        if directorio not in _archivos:
+            _archivos[directorio] = ArchivoPDF(directorio)
+        return _archivos[directorio]
+
+
+if __name__ == "__main__":
+    # python archivo_pdf.py archivar [dd-mm-aaaa]
+    if len(sys.argv) > 1 and sys.argv[1] == "archivar":
+        antes_de = parse_fecha(sys.argv[2]) if len(sys.argv) > 2 else None
+        print(f"[OK] {obtener_archivo().archivar(antes_de)} PDFs comprimidos")
+    else:
+        print("Uso: python archivo_pdf.py archivar [dd-mm-aaaa]")
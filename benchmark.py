@@ -0,0 +1,834 @@
+import argparse
+import csv
+import datetime
+import hashlib
+import json
+import multiprocessing
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import agenda
+import almacen_pedidos
+import analitica
+import archivo_pdf
+import busqueda
+import catalogo
+import clientes
+import compilador
+import cotizacion
+import datos_historial
+import historial
+import metricas
+import persistencia
+
+TAMANOS = [1_000, 10_000, 100_000]
+
+ITEMS_EJEMPLO = [
+    {"descripcion": "Carpa 6x12", "cantidad": "1", "precio_unitario": "1400.0"},
+    {"descripcion": "Tablon", "cantidad": "6", "precio_unitario": "100.0"},
+    {"descripcion": "Mantel", "cantidad": "6", "precio_unitario": "40.0"},
+]
+
+
+NOMBRES = ["Ángel", "María", "José", "Jesús", "Carmen", "Juan", "Lucía", "Andrés", "Sofía", "Carlos"]
+APELLIDOS = ["Pérez", "Hernández", "López", "Martínez", "Lara", "Mares", "Castro", "Núñez"]
+ARTICULOS = ["Silla", "Mesa", "Tablón", "Mantel", "Carpa", "Cubremantel", "Lona", "Calentador", "Periquera", "Brincolín"]
+VARIANTES = ["blanca", "negra", "Tiffany", "plegable", "redonda", "6x12", "10x20", "infantil", "de lujo", "vintage"]
+
+# Umbral para marcar una regresión al comparar: p50 un 25% más lento que la base
+UMBRAL_REGRESION = 0.25
+# Diferencias por debajo de esto (ms) son ruido del reloj, no regresiones
+MINIMO_MS = 0.05
+
+# Páginas de Streamlit del benchmark "arranque" (el presupuesto lo hace
+# cumplir tests/test_arranque.py)
+PAGINAS = ["ui.py", "ver_historial.py"]
+
+# Concurrencia: procesos que escriben a la vez y máximo de escrituras por archivo
+PROCESOS = int(os.environ.get("BENCH_PROCESOS", "8"))
+MAX_ESCRITURAS = 2_000
+CAMPOS_CONTADOR = ["proceso", "n"]
+
+# Generaciones simultáneas (hilos, como varias sesiones de Streamlit) y máximo por corrida
+SESIONES = 16
+MAX_GENERACIONES = 96
+
+# Cotización grande en streaming: ítems del generador
+ITEMS_STREAM = 50_000
+
+# tectonic de prueba: "compila" copiando el .tex al .pdf tras una pausa al azar
+_TECTONIC_FALSO = """#!{python}
+import os, random, sys, time
+tex = sys.argv[-1]
+time.sleep(random.uniform(0.005, 0.03))
+with open(tex, encoding="utf-8") as f:
+    fuente = f.read()
+with open(os.path.splitext(tex)[0] + ".pdf", "wb") as f:
+    f.write(b"%PDF-1.4\\n" + fuente.encode("utf-8"))
+"""
+
+RESULTADOS = []
+
+
+# =======================
+# Datos sintéticos
+# =======================
+def cliente_sintetico(rnd):
+    return {
+        "id": str(uuid.UUID(int=rnd.getrandbits(128))),
+        "cliente": f"{rnd.choice(NOMBRES)} {rnd.choice(APELLIDOS)} {rnd.choice(APELLIDOS)}",
+        "direccion": f"Calle {rnd.randrange(500)} #{rnd.randrange(3000)}",
+        "direccion_entrega": f"Salón {rnd.randrange(200)}",
+        "fecha_evento": "",
+        "telefono_cliente": f"477{rnd.randrange(10**7):07d}",
+    }
+
+
+def generar_clientes_csv(file, n, semilla=0):
+    rnd = random.Random(semilla)
+    clientes_generados = [cliente_sintetico(rnd) for _ in range(n)]
+    with open(file, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=clientes.CAMPOS)
+        writer.writeheader()
+        writer.writerows(clientes_generados)
+    return clientes_generados
+
+
+def items_sinteticos(rnd, n):
+    """`n` ítems (como los de items.csv) con descripciones variadas."""
+    return [
+        {
+            "descripcion": f"{rnd.choice(ARTICULOS)} {rnd.choice(VARIANTES)} {i % 97}",
+            "cantidad": str(rnd.randint(1, 50)),
+            "precio_unitario": f"{rnd.randint(5, 3000)}.{rnd.choice(['00', '50'])}",
+        }
+        for i in range(n)
+    ]
+
+
+def iterar_items_sinteticos(semilla, n):
+    """Como items_sinteticos pero de uno en uno: nunca hay una lista con los `n` ítems."""
+    rnd = random.Random(semilla)
+    for i in range(n):
+        yield {
+            "descripcion": f"{rnd.choice(ARTICULOS)} {rnd.choice(VARIANTES)} {i % 97}",
+            "cantidad": str(rnd.randint(1, 50)),
+            "precio_unitario": f"{rnd.randint(5, 3000)}.{rnd.choice(['00', '50'])}",
+        }
+
+
+def pedido_sintetico(rnd, cliente=None):
+    evento = datetime.date(2025, 1, 1) + datetime.timedelta(days=rnd.randrange(730))
+    items = rnd.sample(ITEMS_EJEMPLO, rnd.randint(1, len(ITEMS_EJEMPLO)))
+    total = sum(float(it["precio_unitario"]) * int(it["cantidad"]) for it in items)
+    return {
+        "id_pedido": str(uuid.UUID(int=rnd.getrandbits(128))),
+        "fecha_creacion": (evento - datetime.timedelta(days=20)).strftime("%d-%m-%Y 10:00:00"),
+        "id_cliente": cliente["id"] if cliente else str(uuid.UUID(int=rnd.getrandbits(128))),
+        "nombre_cliente": cliente["cliente"] if cliente else f"Cliente {rnd.randrange(10_000)}",
+        "fecha_evento": evento.strftime("%d-%m-%Y"),
+        "items": json.dumps(items, ensure_ascii=False),
+        "total": f"{total:.2f}",
+        "estado": rnd.choice(["cotizacion", "confirmado", "recogido"]),
+        "version": "0",
+    }
+
+
+def generar_pedidos_csv(file, n, semilla=0, clientes_base=None):
+    """pedidos.csv con `n` pedidos; si se dan `clientes_base`, cada pedido es de uno de ellos."""
+    rnd = random.Random(semilla)
+    with open(file, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=almacen_pedidos.CAMPOS)
+        writer.writeheader()
+        for _ in range(n):
+            writer.writerow(pedido_sintetico(rnd, rnd.choice(clientes_base) if clientes_base else None))
+
+
+@contextmanager
+def entorno_aislado(prefijo):
+    """
+    Corre dentro de un directorio temporal con plantilla.tex y logo.png:
+    las funciones que usan nombres fijos (pedidos.csv, catalogo.csv,
+    pdfs/...) escriben ahí y no en los datos reales. Se descartan los
+    almacenes compartidos del proceso para que no apunten al directorio
+    anterior.
+    """
+    origen = os.getcwd()
+    directorio = tempfile.mkdtemp(prefix=prefijo)
+    for recurso in ["plantilla.tex", *compilador.RECURSOS]:
+        if os.path.exists(recurso):
+            shutil.copy(recurso, directorio)
+    registros = (almacen_pedidos._stores, catalogo._catalogos, clientes._stores, archivo_pdf._archivos,
+                 datos_historial._vistas)
+    for registro in registros:
+        registro.clear()
+    os.chdir(directorio)
+    try:
+        yield directorio
+    finally:
+        os.chdir(origen)
+        for registro in registros:
+            registro.clear()
+        shutil.rmtree(directorio, ignore_errors=True)
+
+
+class _ArchivoResumen:
+    """'Archivo' que sólo calcula el sha256 de lo que se le escribe."""
+
+    def __init__(self):
+        self.sha256 = hashlib.sha256()
+
+    def write(self, texto):
+        self.sha256.update(texto.encode("utf-8"))
+
+
+@contextmanager
+def compilador_falso(segundos=0.0):
+    """Sustituye tectonic por un compilador que devuelve un PDF mínimo (sin TeX ni red)."""
+    original = compilador.compilar
+
+    def compilar(rendered_tex):
+        if segundos:
+            time.sleep(segundos)
+        resumen = _ArchivoResumen()
+        if callable(rendered_tex):   # render en streaming (cotizacion.escribir_tex)
+            rendered_tex(resumen)
+        else:
+            resumen.write(rendered_tex)
+        return f"%PDF-1.4\n% {resumen.sha256.hexdigest()}\n%%EOF\n".encode()
+
+    compilador.compilar = compilar
+    try:
+        yield
+    finally:
+        compilador.compilar = original
+
+
+# =======================
+# Utilidades de medición
+# =======================
+def medir(funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return medir_lista(tiempos)
+
+
+def medir_lista(tiempos):
+    """p50/p95 de tiempos ya tomados (ms)."""
+    tiempos = sorted(tiempos)
+    return {
+        "p50_ms": statistics.median(tiempos),
+        "p95_ms": tiempos[min(len(tiempos) - 1, int(len(tiempos) * 0.95))],
+        "n": len(tiempos),
+    }
+
+
+def repeticiones_para(n, repeticiones, base=1_000):
+    """Menos repeticiones para los tamaños grandes (al menos 3)."""
+    return max(3, min(repeticiones, repeticiones * base // max(n, 1)))
+
+
+def imprimir(nombre, tamano, resultado):
+    RESULTADOS.append({"caso": nombre, "tamano": tamano, **resultado})
+    print(f"{nombre:<32} {tamano:>8}  p50={resultado['p50_ms']:9.3f} ms  p95={resultado['p95_ms']:9.3f} ms  (n={resultado['n']})")
+
+
+def imprimir_unico(nombre, tamano, inicio):
+    """Para lo que se mide una sola vez (construcción de índices, carga inicial)."""
+    ms = (time.perf_counter() - inicio) * 1000
+    RESULTADOS.append({"caso": nombre, "tamano": tamano, "p50_ms": ms, "p95_ms": ms, "n": 1})
+    print(f"{nombre:<32} {tamano:>8}  {ms:9.1f} ms")
+
+
+# =======================
+# Benchmarks
+# =======================
+def bench_pedidos(tamanos, repeticiones):
+    """Latencia de escritura de pedidos: almacén con diario vs reescritura completa."""
+    rnd = random.Random(1)
+    directorio = tempfile.mkdtemp(prefix="bench-pedidos-")
+    try:
+        for n in tamanos:
+            file = os.path.join(directorio, f"pedidos_{n}.csv")
+            generar_pedidos_csv(file, n)
+            store = almacen_pedidos.OrderStore(file)
+            ids = [p.id_pedido for p in store.query()]
+
+            imprimir("OrderStore.add", n, medir(lambda: store.add(pedido_sintetico(rnd)), repeticiones))
+            imprimir("OrderStore.update_estado", n, medir(
+                lambda: store.update_estado(rnd.choice(ids), rnd.choice(["cotizacion", "confirmado"])), repeticiones
+            ))
+
+            def reescritura_completa():
+                with open(file, newline="", encoding="utf-8") as f:
+                    pedidos = list(csv.DictReader(f))
+                pedidos.append(pedido_sintetico(rnd))
+                with open(file, "w", newline="", encoding="utf-8") as f:
+                    writer = csv.DictWriter(f, fieldnames=almacen_pedidos.CAMPOS)
+                    writer.writeheader()
+                    writer.writerows(pedidos)
+
+            imprimir("reescritura completa (antes)", n, medir(reescritura_completa, max(3, repeticiones // 20)))
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+
+def bench_busqueda(tamanos, repeticiones):
+    """Latencia de consulta del índice de búsqueda de clientes (top-20)."""
+    rnd = random.Random(2)
+    consultas = ["angel", "her", "mar", "ez lo", "4771", "calle 12", "hernadez", "zzzz"]
+
+    for n in tamanos:
+        indice = busqueda.IndiceBusqueda()
+        inicio = time.perf_counter()
+        for i in range(n):
+            indice.agregar(
+                i,
+                f"{rnd.choice(NOMBRES)} {rnd.choice(APELLIDOS)} {rnd.choice(APELLIDOS)}",
+                f"477{rnd.randrange(10**7):07d}",
+                f"Calle {rnd.randrange(500)} #{rnd.randrange(3000)}",
+            )
+        imprimir_unico("IndiceBusqueda (construcción)", n, inicio)
+
+        imprimir("IndiceBusqueda.buscar", n, medir(lambda: indice.buscar(rnd.choice(consultas), k=20), repeticiones))
+        imprimir("IndiceBusqueda.agregar", n, medir(
+            lambda: indice.agregar(rnd.randrange(n), "Ángel Nuevo", "4770000000", "Calle 1"), repeticiones
+        ))
+
+
+def bench_analitica(tamanos, repeticiones):
+    """Agregados del dashboard con NumPy vs el ciclo de Python con defaultdict (antes)."""
+    directorio = tempfile.mkdtemp(prefix="bench-analitica-")
+    try:
+        for n in tamanos:
+            file = os.path.join(directorio, f"pedidos_{n}.csv")
+            generar_pedidos_csv(file, n)
+            store = almacen_pedidos.OrderStore(file)
+            pedidos = store.query()
+
+            inicio = time.perf_counter()
+            a = analitica.Analitica(store).actualizar()
+            a._np()
+            imprimir_unico("Analitica (construcción)", n, inicio)
+
+            desde, hasta = a.rango()
+            imprimir("Analitica.por_mes", n, medir(a.por_mes, repeticiones))
+            imprimir("Analitica.por_cliente", n, medir(a.por_cliente, repeticiones))
+            imprimir("Analitica.por_item", n, medir(a.por_item, repeticiones))
+            imprimir("Analitica.utilizacion", n, medir(lambda: a.utilizacion(desde, hasta), repeticiones))
+
+            def ciclo_python():
+                por_mes = defaultdict(float)
+                for p in pedidos:
+                    if p.estado in analitica.INGRESOS and p.fecha_evento:
+                        por_mes[p.fecha_evento.strftime("%B %Y")] += float(p.texto_total)
+                return sorted(por_mes, key=lambda m: datetime.datetime.strptime(m, "%B %Y"))
+
+            imprimir("ciclo por mes (antes)", n, medir(ciclo_python, max(3, repeticiones // 20)))
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+
+def bench_guardar_pedido(tamanos, repeticiones):
+    """Latencia de historial.guardar_pedido (catálogo + fila anexada) con pedidos.csv de n filas."""
+    rnd = random.Random(3)
+    for n in tamanos:
+        with entorno_aislado("bench-guardar-"):
+            generar_pedidos_csv(historial.PEDIDOS_FILE, n)
+            inicio = time.perf_counter()
+            almacen_pedidos.obtener_store(historial.PEDIDOS_FILE).query()
+            imprimir_unico("OrderStore (carga inicial)", n, inicio)
+
+            cliente = cliente_sintetico(rnd)
+            items = items_sinteticos(rnd, 5)
+            historial.guardar_pedido(cliente, items)   # alta de los productos en el catálogo
+            imprimir("guardar_pedido", n, medir(lambda: historial.guardar_pedido(cliente, items), repeticiones))
+            imprimir("guardar_pedido (ítems nuevos)", n, medir(
+                lambda: historial.guardar_pedido(cliente_sintetico(rnd), items_sinteticos(rnd, 5)), repeticiones
+            ))
+
+
+def bench_clientes(tamanos, repeticiones):
+    """Carga de cliente.csv y búsqueda de clientes como la hace ui.py (top-50)."""
+    rnd = random.Random(4)
+    for n in tamanos:
+        with entorno_aislado("bench-clientes-"):
+            generados = generar_clientes_csv(clientes.CLIENTE_FILE, n)
+            inicio = time.perf_counter()
+            store = clientes.ClientStore(clientes.CLIENTE_FILE)
+            store.todos()
+            imprimir_unico("ClientStore (carga)", n, inicio)
+
+            consultas = ["angel", "her", "mar", "ez lo", "477", "calle 12", "hernadez", "zzzz"]
+            consultas += [rnd.choice(generados)["cliente"] for _ in range(8)]
+            imprimir("ClientStore.buscar", n, medir(lambda: store.buscar(rnd.choice(consultas), k=50), repeticiones))
+            imprimir("ClientStore.todos (rerun)", n, medir(store.todos, repeticiones))
+
+
+def bench_historial(tamanos, repeticiones):
+    """Particiones de ver_historial.py: meses pasados, agenda de la semana y próximos eventos."""
+    rnd = random.Random(5)
+    hoy = datetime.date(2026, 1, 1)   # los pedidos sintéticos van de 2025 a 2026
+    directorio = tempfile.mkdtemp(prefix="bench-historial-")
+    try:
+        for n in tamanos:
+            file = os.path.join(directorio, f"pedidos_{n}.csv")
+            clientes_base = [cliente_sintetico(rnd) for _ in range(max(10, n // 10))]
+            generar_pedidos_csv(file, n, clientes_base=clientes_base)
+            store = almacen_pedidos.OrderStore(file)
+            store.query()
+
+            inicio = time.perf_counter()
+            vista = datos_historial.VistaHistorial(store).actualizar(hoy)
+            imprimir_unico("VistaHistorial (construcción)", n, inicio)
+            inicio = time.perf_counter()
+            eventos = agenda.Agenda(store).actualizar()
+            imprimir_unico("Agenda (construcción)", n, inicio)
+
+            meses = [m for m, _, _ in vista.meses_pasados()]
+            imprimir("VistaHistorial.meses_pasados", n, medir(vista.meses_pasados, repeticiones))
+            imprimir("VistaHistorial.pasados_del_mes", n, medir(
+                lambda: vista.pasados_del_mes(rnd.choice(meses)), repeticiones
+            ))
+            imprimir("Agenda.semana", n, medir(lambda: eventos.semana(hoy), repeticiones))
+            imprimir("Agenda.rango (próximos)", n, medir(lambda: eventos.rango(desde=hoy), repeticiones_para(n, repeticiones)))
+
+            def pedido_nuevo():
+                store.add(pedido_sintetico(rnd, rnd.choice(clientes_base)))
+                vista.actualizar(hoy)
+                eventos.actualizar()
+
+            imprimir("pedido nuevo + vistas", n, medir(pedido_nuevo, repeticiones))
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+
+@contextmanager
+def tectonic_falso():
+    """
+    Pone un tectonic de prueba al frente del PATH y un pool de compilación
+    nuevo: se ejercita el pool real (directorios de trabajo, enlaces,
+    limpieza) sin TeX ni red.
+    """
+    directorio = tempfile.mkdtemp(prefix="bench-tectonic-")
+    ejecutable = os.path.join(directorio, "tectonic")
+    with open(ejecutable, "w", encoding="utf-8") as f:
+        f.write(_TECTONIC_FALSO.format(python=sys.executable))
+    os.chmod(ejecutable, 0o755)
+    path_original, pool_original = os.environ.get("PATH", ""), compilador._pool
+    os.environ["PATH"] = directorio + os.pathsep + path_original
+    compilador._pool = compilador.CompiladorPool(workers=4, calentar=False)
+    try:
+        yield compilador._pool
+    finally:
+        compilador._pool.cerrar()
+        compilador._pool = pool_original
+        os.environ["PATH"] = path_original
+        shutil.rmtree(directorio, ignore_errors=True)
+
+
+def bench_generacion(tamanos, repeticiones):
+    """
+    Decenas de cotizaciones generadas a la vez (SESIONES hilos, pool real con
+    tectonic de prueba). Que cada PDF sea el suyo lo verifica
+    tests/test_generacion.py.
+    """
+    rnd = random.Random(7)
+    for total in sorted({min(n, MAX_GENERACIONES) for n in tamanos}):
+        with entorno_aislado("bench-generacion-"), tectonic_falso():
+            pedidos = [
+                (cliente_sintetico(rnd), items_sinteticos(rnd, rnd.randint(1, 20)), f"PED-{i:04d}")
+                for i in range(total)
+            ]
+
+            def generar(pedido):
+                cliente, items, id_pedido = pedido
+                return cotizacion.render_quote(cliente, items, id_pedido, usar_cache=False)
+
+            inicio = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=SESIONES) as sesiones:
+                list(sesiones.map(generar, pedidos))
+            segundos = time.perf_counter() - inicio
+
+            ms = segundos * 1000 / total
+            RESULTADOS.append({"caso": "render_quote concurrente", "tamano": total, "p50_ms": ms, "p95_ms": ms, "n": total})
+            print(f"{'render_quote concurrente':<32} {total:>8}  {ms:9.3f} ms/cotización  ({SESIONES} sesiones)")
+
+
+def bench_plantilla(tamanos, repeticiones):
+    """Render de plantilla.tex con n ítems, y render_quote completo con el compilador falso."""
+    rnd = random.Random(6)
+    cliente = cliente_sintetico(rnd)
+    for n in tamanos:
+        items = items_sinteticos(rnd, n)
+        normalizados = cotizacion.normalizar_items(items)
+        veces = repeticiones_para(n, repeticiones, base=100)
+        cotizacion.renderizar_tex(cotizacion.armar_datos(cliente, normalizados, "COT-001"))   # compila la plantilla
+        imprimir("plantilla.tex (render)", n, medir(
+            lambda: cotizacion.renderizar_tex(cotizacion.armar_datos(cliente, normalizados, "COT-001")), veces
+        ))
+        with entorno_aislado("bench-plantilla-"), compilador_falso():
+            imprimir("render_quote (compilador falso)", n, medir(
+                lambda: cotizacion.render_quote(cliente, items, usar_cache=False), veces
+            ))
+            imprimir("render_quote_stream (generador)", n, medir(
+                lambda: cotizacion.render_quote_stream(cliente, iter(items)), veces
+            ))
+
+
+class _ArchivoConteo:
+    """
+    'Archivo' que cuenta los renglones de ítems del LaTeX y guarda las
+    líneas de subtotal, IVA y total; sólo retiene la línea en curso.
+    """
+
+    def __init__(self):
+        self.pendiente = ""
+        self.lineas_items = 0
+        self.totales = {}
+
+    def write(self, texto):
+        *completas, self.pendiente = (self.pendiente + texto).split("\n")
+        for linea in completas:
+            if linea.startswith("\\multicolumn"):
+                for nombre in ("Subtotal", "IVA", "Total"):
+                    if nombre in linea:
+                        self.totales[nombre] = linea.rsplit("\\$ ", 1)[1].split(" ")[0].rstrip("}")
+            elif linea.count(" & ") == 3 and "\\textbf" not in linea:
+                self.lineas_items += 1
+
+
+def bench_streaming(tamanos, repeticiones):
+    """
+    render_quote_stream con ITEMS_STREAM ítems de un generador: tiempo y pico
+    de memoria (tracemalloc). Líneas, totales y techo de memoria los verifica
+    tests/test_streaming.py.
+    """
+    cliente = cliente_sintetico(random.Random(8))
+    conteo = _ArchivoConteo()
+    original = compilador.compilar
+
+    def compilar(rendered_tex):
+        rendered_tex(conteo)
+        return b"%PDF-1.4\n%%EOF\n"
+
+    with entorno_aislado("bench-streaming-"):
+        compilador.compilar = compilar
+        tracemalloc.start()
+        try:
+            inicio = time.perf_counter()
+            cotizacion.render_quote_stream(cliente, iterar_items_sinteticos(8, ITEMS_STREAM), "PED-STREAM")
+            segundos = time.perf_counter() - inicio
+            pico_mb = tracemalloc.get_traced_memory()[1] / 2**20
+        finally:
+            tracemalloc.stop()
+            compilador.compilar = original
+
+    ms = segundos * 1000
+    RESULTADOS.append({"caso": "render_quote_stream (tracemalloc)", "tamano": ITEMS_STREAM,
+                       "p50_ms": ms, "p95_ms": ms, "n": 1})
+    print(f"{'render_quote_stream (tracemalloc)':<32} {ITEMS_STREAM:>8}  {ms:9.1f} ms  pico {pico_mb:.2f} MB")
+    print(f"{'':<32} {'':>8}  {conteo.lineas_items} líneas de ítems · total {conteo.totales.get('Total')}")
+
+
+# Corre en un intérprete nuevo: ningún módulo de la app está importado todavía.
+# Importar Streamlit (AppTest) no se cuenta: es igual con o sin la app.
+_SCRIPT_ARRANQUE = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+pagina, reruns = sys.argv[1], int(sys.argv[2])
+app = AppTest.from_file(pagina, default_timeout=120)
+inicio = time.perf_counter()
+app.run()
+frio = (time.perf_counter() - inicio) * 1000
+tiempos = []
+for _ in range(reruns):
+    inicio = time.perf_counter()
+    app.run()
+    tiempos.append((time.perf_counter() - inicio) * 1000)
+errores = [str(e.value) for e in app.exception]
+print(json.dumps({"frio_ms": frio, "reruns_ms": tiempos, "errores": errores}))
+"""
+
+
+def medir_pagina(pagina, reruns):
+    """Arranque en frío y reruns de una página de Streamlit (proceso aparte, en el directorio actual)."""
+    raiz = os.path.dirname(os.path.abspath(__file__))
+    entorno = {**os.environ, "PYTHONPATH": raiz, "METRICAS_ACTIVAS": "0"}
+    salida = subprocess.run(
+        [sys.executable, "-c", _SCRIPT_ARRANQUE, os.path.join(raiz, pagina), str(reruns)],
+        capture_output=True, text=True, env=entorno, check=True
+    )
+    resultado = json.loads(salida.stdout.strip().splitlines()[-1])
+    if resultado["errores"]:
+        raise RuntimeError(f"{pagina}: {resultado['errores']}")
+    return resultado
+
+
+def bench_arranque(tamanos, repeticiones):
+    """
+    Primera corrida y reruns de ui.py y ver_historial.py (AppTest) con n
+    pedidos y n/10 clientes. El presupuesto lo hace cumplir
+    tests/test_arranque.py.
+    """
+    reruns = max(5, min(repeticiones, 30))
+    for n in tamanos:
+        with entorno_aislado("bench-arranque-"):
+            clientes_base = generar_clientes_csv(clientes.CLIENTE_FILE, max(10, n // 10))
+            generar_pedidos_csv(almacen_pedidos.PEDIDOS_FILE, n, clientes_base=clientes_base)
+            for pagina in PAGINAS:
+                resultado = medir_pagina(pagina, reruns)
+                frio = resultado["frio_ms"]
+                RESULTADOS.append({"caso": f"{pagina} (arranque)", "tamano": n, "p50_ms": frio, "p95_ms": frio, "n": 1})
+                print(f"{pagina + ' (arranque)':<32} {n:>8}  {frio:9.1f} ms")
+                rerun = medir_lista(resultado["reruns_ms"])
+                imprimir(f"{pagina} (rerun)", n, rerun)
+
+
+# ---------------------------
+# Concurrencia entre procesos
+# ---------------------------
+def _escritor_csv(file, proceso, n, listos, con_bloqueo=True):
+    listos.wait()
+    for i in range(n):
+        fila = {"proceso": proceso, "n": i}
+        if con_bloqueo:
+            persistencia.actualizar_csv(file, CAMPOS_CONTADOR, lambda filas: filas + [fila])
+        else:
+            # Lo que hacían los escribir_csv de antes: leer, truncar y escribir sin bloqueo
+            filas = persistencia.leer_csv(file) + [fila]
+            with open(file, "w", newline="", encoding="utf-8") as f:
+                f.write(persistencia.csv_a_texto(filas, CAMPOS_CONTADOR))
+
+
+def _escritor_pedidos(file, proceso, n, listos):
+    store = almacen_pedidos.OrderStore(file, compactar_cada=50)
+    rnd = random.Random(proceso)
+    listos.wait()
+    for _ in range(n):
+        pedido = store.add(pedido_sintetico(rnd))
+        store.update_estado(pedido.id_pedido, "confirmado")   # diario: fuerza compactaciones
+
+
+def _escritor_clientes(file, proceso, n, listos):
+    store = clientes.ClientStore(file, compactar_cada=50)
+    rnd = random.Random(1_000 + proceso)
+    listos.wait()
+    for _ in range(n):
+        cliente = store.guardar(cliente_sintetico(rnd))
+        store.guardar({**cliente, "direccion_entrega": f"proceso {proceso}"})
+
+
+def _lector(file, campos, detener, resultado):
+    """Lee sin bloqueo mientras otros escriben: cada lectura debe ser un archivo completo."""
+    lecturas = malas = anterior = 0
+    while not detener.is_set():
+        filas = persistencia.leer_csv(file)
+        if len(filas) < anterior or any(f.get(c) is None for f in filas for c in campos):
+            malas += 1
+        anterior = len(filas)
+        lecturas += 1
+    resultado.put((lecturas, malas))
+
+
+def en_paralelo(destino, file, por_proceso, *extra, lector_campos=None):
+    """
+    Corre `destino(file, proceso, por_proceso, listos, *extra)` en PROCESOS
+    procesos que arrancan juntos (barrera). Devuelve (segundos, procesos
+    fallidos, (lecturas, lecturas malas) o None).
+    """
+    contexto = multiprocessing.get_context("spawn")
+    listos = contexto.Barrier(PROCESOS + 1)
+    procesos = [
+        contexto.Process(target=destino, args=(file, proceso, por_proceso, listos, *extra))
+        for proceso in range(PROCESOS)
+    ]
+    for p in procesos:
+        p.start()
+
+    lector = None
+    if lector_campos:
+        detener, resultado = contexto.Event(), contexto.Queue()
+        lector = contexto.Process(target=_lector, args=(file, lector_campos, detener, resultado))
+        lector.start()
+
+    listos.wait()
+    inicio = time.perf_counter()
+    for p in procesos:
+        p.join()
+    segundos = time.perf_counter() - inicio
+
+    lecturas = None
+    if lector:
+        detener.set()
+        lecturas = resultado.get()
+        lector.join()
+    return segundos, [p.exitcode for p in procesos if p.exitcode], lecturas
+
+
+def imprimir_concurrencia(nombre, total, segundos):
+    ms = segundos * 1000 / total
+    RESULTADOS.append({"caso": nombre, "tamano": total, "p50_ms": ms, "p95_ms": ms, "n": total})
+    print(f"{nombre:<32} {total:>8}  {ms:9.3f} ms/escritura  ({total / segundos:,.0f} escrituras/s, {PROCESOS} procesos)")
+
+
+def bench_concurrencia(tamanos, repeticiones):
+    """
+    PROCESOS procesos escriben a la vez (hasta MAX_ESCRITURAS en total) en:
+    - un CSV chico con persistencia.actualizar_csv (leer-modificar-escribir)
+    - pedidos.csv con OrderStore (filas + diario, con compactaciones)
+    - cliente.csv con ClientStore
+    Para comparar, se mide también cuántas escrituras pierde
+    leer-truncar-escribir sin bloqueo. Que con bloqueo no se pierda ninguna
+    lo verifica tests/test_concurrencia.py.
+    """
+    for total in sorted({min(n, MAX_ESCRITURAS) for n in tamanos}):
+        por_proceso = max(1, total // PROCESOS)
+        total = por_proceso * PROCESOS
+        with entorno_aislado("bench-concurrencia-") as directorio:
+            file = os.path.join(directorio, "contador.csv")
+            segundos, _, (lecturas, malas) = en_paralelo(
+                _escritor_csv, file, por_proceso, lector_campos=CAMPOS_CONTADOR
+            )
+            filas = persistencia.leer_csv(file)
+            unicas = {(f["proceso"], f["n"]) for f in filas}
+            imprimir_concurrencia("actualizar_csv (con bloqueo)", total, segundos)
+            print(f"{'':<32} {'':>8}  {len(unicas)} de {total} filas · {lecturas} lecturas concurrentes, {malas} incompletas")
+
+            file = os.path.join(directorio, "sin_bloqueo.csv")
+            segundos, _, _ = en_paralelo(_escritor_csv, file, por_proceso, False)
+            perdidas = total - len({(f["proceso"], f["n"]) for f in persistencia.leer_csv(file)})
+            imprimir_concurrencia("leer-truncar-escribir (antes)", total, segundos)
+            print(f"{'':<32} {'':>8}  {perdidas} de {total} escrituras perdidas")
+
+            file = os.path.join(directorio, almacen_pedidos.PEDIDOS_FILE)
+            almacen_pedidos.OrderStore(file)   # crea/migra el archivo antes de arrancar
+            segundos, _, _ = en_paralelo(_escritor_pedidos, file, por_proceso)
+            imprimir_concurrencia("OrderStore.add + update_estado", total, segundos)
+
+            file = os.path.join(directorio, clientes.CLIENTE_FILE)
+            clientes.ClientStore(file)
+            segundos, _, _ = en_paralelo(_escritor_clientes, file, por_proceso)
+            imprimir_concurrencia("ClientStore.guardar x2", total, segundos)
+
+
+BENCHMARKS = {
+    "pedidos": bench_pedidos,
+    "busqueda": bench_busqueda,
+    "analitica": bench_analitica,
+    "guardar_pedido": bench_guardar_pedido,
+    "clientes": bench_clientes,
+    "historial": bench_historial,
+    "plantilla": bench_plantilla,
+    "generacion": bench_generacion,
+    "streaming": bench_streaming,
+    "arranque": bench_arranque,
+    "concurrencia": bench_concurrencia,
+}
+
+
+# =======================
+# Resultados y comparación
+# =======================
+def guardar_resultados(file, args):
+    documento = {
+        "fecha": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "tamanos": args.tamanos,
+        "repeticiones": args.repeticiones,
+        "resultados": RESULTADOS,
+    }
+    with open(file, "w", encoding="utf-8") as f:
+        json.dump(documento, f, ensure_ascii=False, indent=1)
+    print(f"[OK] Resultados en {file}")
+
+
+def comparar(base, actual, umbral=UMBRAL_REGRESION, minimo_ms=MINIMO_MS):
+    """
+    Compara el p50 de cada (caso, tamaño) contra la base.
+    Devuelve la lista de regresiones: más lento que base * (1 + umbral)
+    y por más de `minimo_ms` (lo demás es ruido).
+    """
+    previos = {(r["caso"], r["tamano"]): r for r in base["resultados"]}
+    regresiones = []
+    print(f"\n{'caso':<32} {'tamaño':>8}  {'base':>10}  {'actual':>10}  cambio")
+    for r in actual["resultados"]:
+        previo = previos.get((r["caso"], r["tamano"]))
+        if previo is None:
+            print(f"{r['caso']:<32} {r['tamano']:>8}  {'—':>10}  {r['p50_ms']:10.3f}  (nuevo)")
+            continue
+        antes, ahora = previo["p50_ms"], r["p50_ms"]
+        cambio = (ahora - antes) / antes if antes else 0.0
+        marca = ""
+        if ahora > antes * (1 + umbral) and ahora - antes > minimo_ms:
+            marca = "  ⚠️ REGRESIÓN"
+            regresiones.append({**r, "base_p50_ms": antes, "cambio": cambio})
+        elif ahora < antes * (1 - umbral) and antes - ahora > minimo_ms:
+            marca = "  mejora"
+        print(f"{r['caso']:<32} {r['tamano']:>8}  {antes:10.3f}  {ahora:10.3f}  {cambio:+7.1%}{marca}")
+    return regresiones
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de la app de cotizaciones")
+    parser.add_argument("benchmarks", nargs="*", help=f"cuáles correr (todos por defecto): {', '.join(BENCHMARKS)}")
+    parser.add_argument("--tamanos", type=int, nargs="+", default=TAMANOS)
+    parser.add_argument("--repeticiones", type=int, default=200)
+    parser.add_argument("--salida", help="guardar los resultados en este JSON")
+    parser.add_argument("--comparar", metavar="BASE", help="JSON de una corrida anterior: marca regresiones")
+    parser.add_argument("--actual", help="comparar este JSON contra BASE en lugar de correr los benchmarks")
+    parser.add_argument("--umbral", type=float, default=UMBRAL_REGRESION, help="fracción tolerada (0.25 = 25%% más lento)")
+    args = parser.parse_args(argv)
+    for nombre in args.benchmarks:
+        if nombre not in BENCHMARKS:
+            parser.error(f"benchmark desconocido: {nombre}")
+    if args.actual and not args.comparar:
+        parser.error("--actual requiere --comparar")
+
+    # plantilla.tex y logo.png se buscan junto a este archivo, se corra desde donde se corra
+    for opcion in ("salida", "comparar", "actual"):
+        if getattr(args, opcion):
+            setattr(args, opcion, os.path.abspath(getattr(args, opcion)))
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    # Las corridas no deben llenar metricas.jsonl de datos sintéticos
+    metricas.ACTIVAS = False
+
+    if args.actual:
+        with open(args.actual, encoding="utf-8") as f:
+            actual = json.load(f)
+    else:
+        for nombre in args.benchmarks or BENCHMARKS:
+            BENCHMARKS[nombre](args.tamanos, args.repeticiones)
+        if args.salida:
+            guardar_resultados(args.salida, args)
+        actual = {"resultados": RESULTADOS}
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            base = json.load(f)
+        regresiones = comparar(base, actual, args.umbral)
+        if regresiones:
+            print(f"\n[ERROR] {len(regresiones)} regresiones de más de {args.umbral:.0%}")
+            return 1
+        print("\n[OK] Sin regresiones")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,165 @@
+import bisect
+import heapq
+import unicodedata
+from collections import Counter, defaultdict
+from itertools import chain
+
+# Agregados pendientes de fusionar con las listas ordenadas principales
+MAX_PENDIENTES = 1024
+
+
+def normalizar(texto):
+    """Minúsculas, sin acentos y con espacios colapsados: 'Ángel  Pérez' -> 'angel perez'."""
+    texto = unicodedata.normalize("NFKD", texto or "")
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return " ".join(texto.lower().split())
+
+
+def trigramas(texto):
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+class _ListaPrefijos:
+    """
+    Lista ordenada de (texto, n) para búsquedas por prefijo con bisect.
+    Los agregados van a una cola pequeña que se ordena aparte y se fusiona
+    con la principal cuando crece; los borrados no se quitan de inmediato
+    (se descartan al consultar si `n` ya no existe) y se purgan al fusionar.
+    """
+
+    def __init__(self):
+        self.principal = []
+        self.pendientes = []
+        self._pendientes_ordenados = True
+
+    def agregar(self, elementos):
+        self.pendientes.extend(elementos)
+        self._pendientes_ordenados = False
+
+    def preparar(self, vivos):
+        if len(self.pendientes) > max(MAX_PENDIENTES, len(self.principal) // 8):
+            self.principal = sorted(e for e in self.principal + self.pendientes if e[1] in vivos)
+            self.pendientes = []
+        elif not self._pendientes_ordenados:
+            self.pendientes.sort()
+        self._pendientes_ordenados = True
+
+    def con_prefijo(self, prefijo):
+        for ordenada in (self.principal, self.pendientes):
+            i = bisect.bisect_left(ordenada, (prefijo, -1))
+            while i < len(ordenada) and ordenada[i][0].startswith(prefijo):
+                yield ordenada[i][1]
+                i += 1
+
+
+class IndiceBusqueda:
+    """
+    Índice de búsqueda incremental (agregar / eliminar por clave).
+    Para una consulta devuelve hasta k claves, en este orden de relevancia:
+      1. un campo empieza con la consulta (el campo idéntico queda primero)
+      2. alguna palabra de un campo empieza con la consulta
+      3. la consulta aparece dentro de un campo (índice de trigramas)
+      4. si no hubo nada: parecidos por trigramas compartidos (errores de dedo)
+    Todo se compara normalizado, así 'angel' encuentra 'Ángel'.
+    """
+
+    def __init__(self):
+        self._docs = {}               # clave -> (n, campos normalizados)
+        self._claves = {}             # n -> clave (sólo documentos vivos)
+        self._siguiente = 0
+        self._campos = _ListaPrefijos()
+        self._palabras = _ListaPrefijos()
+        self._trigramas = defaultdict(set)
+
+    def __len__(self):
+        return len(self._docs)
+
+    def __contains__(self, clave):
+        return clave in self._docs
+
+    # ---------------------------
+    # Actualización incremental
+    # ---------------------------
+    def agregar(self, clave, *campos):
+        """Indexa (o re-indexa) `clave` con los textos de `campos`."""
+        if clave in self._docs:
+            self.eliminar(clave)
+
+        n = self._siguiente
+        self._siguiente += 1
+        campos = tuple(c for c in (normalizar(c) for c in campos) if c)
+        self._docs[clave] = (n, campos)
+        self._claves[n] = clave
+
+        self._campos.agregar((campo, n) for campo in campos)
+        self._palabras.agregar((palabra, n) for campo in campos for palabra in set(campo.split()))
+        for campo in campos:
+            for tri in trigramas(campo):
+                self._trigramas[tri].add(n)
+
+    def eliminar(self, clave):
+        doc = self._docs.pop(clave, None)
+        if doc is None:
+            return
+        n, campos = doc
+        del self._claves[n]
+
+        for campo in campos:
+            for tri in trigramas(campo):
+                ids = self._trigramas.get(tri)
+                if ids is not None:
+                    ids.discard(n)
+                    if not ids:
+                        del self._trigramas[tri]
+
+    # ---------------------------
+    # Consulta
+    # ---------------------------
+    def buscar(self, consulta, k=10):
+        q = normalizar(consulta)
+        if not q:
+            return []
+
+        encontrados = []
+        vistos = set()
+
+        def tomar(n):
+            if n not in vistos and n in self._claves:
+                vistos.add(n)
+                encontrados.append(self._claves[n])
+            return len(encontrados) >= k
+
+        # 1 y 2: prefijos con búsqueda binaria, O(log n + k)
+        for lista in (self._campos, self._palabras):
+            lista.preparar(self._claves)
+            for n in lista.con_prefijo(q):
+                if tomar(n):
+                    return encontrados
+
+        if len(q) < 3:
+            return encontrados
+
+        # 3: subcadena; candidatos = intersección de trigramas, luego se verifica
+        conjuntos = sorted((self._trigramas.get(t, set()) for t in trigramas(q)), key=len)
+        candidatos = set(conjuntos[0]).intersection(*conjuntos[1:]) if conjuntos else set()
+        for n in candidatos - vistos:
+            if any(q in campo for campo in self._docs[self._claves[n]][1]):
+                if tomar(n):
+                    return encontrados
+
+        if encontrados:
+            return encontrados
+
+        # 4: aproximados. Se pide compartir más de la mitad de los trigramas;
+        # quien cumpla tiene que estar en alguno de los más raros, así que sólo
+        # esos se usan como candidatos y el resto se cuenta por pertenencia.
+        minimo = len(conjuntos) // 2 + 1
+        corte = len(conjuntos) - minimo + 1
+        cuentas = Counter(chain.from_iterable(conjuntos[:corte]))
+        puntajes = (
+            (cuenta + sum(n in c for c in conjuntos[corte:]), -n)
+            for n, cuenta in cuentas.items()
+        )
+        for _, menos_n in heapq.nlargest(k, (p for p in puntajes if p[0] >= minimo)):
+            tomar(-menos_n)
+        return encontrados
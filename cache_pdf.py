@@ -0,0 +1,166 @@
+import atexit
+import hashlib
+import json
+import os
+import threading
+import time
+
+import persistencia
+
+CACHE_DIR = os.environ.get("CACHE_PDF_DIR", "cache_pdf")
+
+# Tamaño máximo en disco; al pasarlo se borran las entradas menos usadas (LRU)
+MAX_BYTES = int(os.environ.get("CACHE_PDF_MAX_MB", "200")) * 1024 * 1024
+
+# Una cotización es válida 15 días: después de eso no se reutiliza
+MAX_DIAS = int(os.environ.get("CACHE_PDF_MAX_DIAS", "15"))
+
+
+
+class CachePDF:
+    """
+    Caché de PDFs direccionada por contenido: la clave es el sha256 del
+    LaTeX renderizado sin el folio (cotizacion.MARCA_FOLIO en su lugar). El
+    id del pedido y la fecha impresa sí cuentan: volver a generar el mismo
+    pedido el mismo día entrega el PDF que ya existía con su folio, y dos
+    pedidos nunca comparten folio ni PDF. Guarda el PDF en <directorio>/<clave>.pdf y un índice
+    con folio, tamaño y último uso de cada entrada, más contadores hit/miss.
+    Consultar no escribe nada: el índice se lee sin bloqueo (se reemplaza
+    atómicamente) y los contadores y últimos usos se acumulan en memoria y
+    se vuelcan al guardar una entrada (o con vaciar()).
+    """
+
+    def __init__(self, directorio=CACHE_DIR, max_bytes=MAX_BYTES, max_dias=MAX_DIAS):
+        self.directorio = directorio
+        self.max_bytes = max_bytes
+        self.max_segundos = max_dias * 24 * 3600
+        self.indice_file = os.path.join(directorio, "indice.json")
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._usados = {}   # clave -> último uso aún no escrito
+
+    # ---------------------------
+    # Índice
+    # ---------------------------
+    def _leer_indice(self):
+        if not os.path.exists(self.indice_file):
+            return {"entradas": {}, "hits": 0, "misses": 0}
+        with open(self.indice_file, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _escribir_indice(self, indice):
+        persistencia.escribir_atomico(self.indice_file, json.dumps(indice, ensure_ascii=False))
+
+    def _ruta(self, clave):
+        return os.path.join(self.directorio, f"{clave}.pdf")
+
+    # ---------------------------
+    # API
+    # ---------------------------
+    def clave(self, rendered_tex):
+        return hashlib.sha256(rendered_tex.encode("utf-8")).hexdigest()
+
+    def obtener(self, clave):
+        """Devuelve (folio, pdf_bytes) si la clave está en caché y vigente; si no, None."""
+        ahora = time.time()
+        entrada = self._leer_indice()["entradas"].get(clave)
+        try:
+            # Las vencidas se borran al desalojar (en el próximo guardar)
+            if entrada and ahora - entrada["creado"] <= self.max_segundos:
+                with open(self._ruta(clave), "rb") as f:
+                    pdf_bytes = f.read()
+                with self._lock:
+                    self._hits += 1
+                    self._usados[clave] = ahora
+                return entrada["folio"], pdf_bytes
+        except FileNotFoundError:   # otro proceso la desalojó
+            pass
+        with self._lock:
+            self._misses += 1
+        return None
+
+    def guardar(self, clave, folio, pdf_bytes):
+        ahora = time.time()
+        persistencia.escribir_atomico(self._ruta(clave), pdf_bytes, modo="wb")
+
+        with persistencia.bloqueo(self.indice_file):
+            indice = self._leer_indice()
+            self._volcar(indice)
+            indice["entradas"][clave] = {
+                "folio": folio,
+                "bytes": len(pdf_bytes),
+                "creado": ahora,
+                "usado": ahora
+            }
+            self._desalojar(indice)
+            self._escribir_indice(indice)
+
+    def _volcar(self, indice):
+        """Suma al índice los contadores y últimos usos acumulados en memoria."""
+        with self._lock:
+            indice["hits"] += self._hits
+            indice["misses"] += self._misses
+            for clave, usado in self._usados.items():
+                if clave in indice["entradas"]:
+                    indice["entradas"][clave]["usado"] = max(indice["entradas"][clave]["usado"], usado)
+            self._hits = self._misses = 0
+            self._usados = {}
+
+    def vaciar(self):
+        """Escribe los contadores pendientes (al salir del proceso)."""
+        if not (self._hits or self._misses or self._usados):
+            return
+        with persistencia.bloqueo(self.indice_file):
+            indice = self._leer_indice()
+            self._volcar(indice)
+            self._escribir_indice(indice)
+
+    def estadisticas(self):
+        indice = self._leer_indice()
+        entradas = indice["entradas"].values()
+        return {
+            "hits": indice["hits"] + self._hits,
+            "misses": indice["misses"] + self._misses,
+            "entradas": len(indice["entradas"]),
+            "bytes": sum(e["bytes"] for e in entradas)
+        }
+
+    # ---------------------------
+    # Desalojo
+    # ---------------------------
+    def _borrar(self, indice, clave):
+        indice["entradas"].pop(clave, None)
+        ruta = self._ruta(clave)
+        if os.path.exists(ruta):
+            os.remove(ruta)
+
+    def _desalojar(self, indice):
+        """Quita vencidas y luego las menos usadas hasta quedar bajo max_bytes."""
+        ahora = time.time()
+        for clave, entrada in list(indice["entradas"].items()):
+            if ahora - entrada["creado"] > self.max_segundos:
+                self._borrar(indice, clave)
+
+        total = sum(e["bytes"] for e in indice["entradas"].values())
+        for clave, entrada in sorted(indice["entradas"].items(), key=lambda kv: kv[1]["usado"]):
+            if total <= self.max_bytes:
+                break
+            total -= entrada["bytes"]
+            self._borrar(indice, clave)
+
+
+# ---------------------------
+# Caché compartida por el proceso
+# ---------------------------
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def obtener_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = CachePDF()
+            atexit.register(_cache.vaciar)
+        return _cache
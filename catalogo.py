@@ -0,0 +1,232 @@
+import sys
+import threading
+from dataclasses import replace
+from functools import partial
+
+import almacen_pedidos
+import busqueda
+import persistencia
+from modelos import Item, Producto, a_centavos, items_a_json
+
+CATALOGO_FILE = "catalogo.csv"
+
+CAMPOS = ["id", "descripcion", "precio", "activo"]
+
+
+def _clave(descripcion):
+    return busqueda.normalizar(descripcion)
+
+
+class Catalogo(persistencia.CSVConDiario):
+    """
+    Catálogo de productos (catalogo.csv): id corto, descripción, precio.
+    - un producto nuevo es una fila anexada; cambiar precio/descripción o
+      darlo de baja es una línea en catalogo.log
+    - búsqueda por prefijo (y por palabra) con busqueda.IndiceBusqueda
+    - las descripciones se comparan sin acentos ni mayúsculas, así
+      'Tablón' y 'tablon' son el mismo producto
+    Los pedidos guardan sus ítems como "id:cantidad@centavos" (codificar /
+    decodificar). El precio va siempre en el pedido: cambiar el precio del
+    catálogo no altera pedidos anteriores. La descripción de un id nunca
+    cambia: editarla da de baja ese id y crea otro (una versión nueva), así
+    las cotizaciones viejas siguen mostrando lo que se cotizó.
+    """
+
+    CAMPOS = CAMPOS
+
+    def _vaciar(self):
+        self._por_id = {}
+        self._por_clave = {}
+        self._ultimo_id = 0
+        self._indice = None  # se construye con la primera búsqueda
+
+    def _indexar(self, producto):
+        anterior = self._por_id.get(producto.id)
+        if anterior is not None and self._por_clave.get(_clave(anterior.descripcion)) == anterior.id:
+            del self._por_clave[_clave(anterior.descripcion)]
+        self._por_id[producto.id] = producto
+        # Una versión dada de baja no le quita la descripción a la vigente
+        actual = self._por_clave.get(_clave(producto.descripcion))
+        if producto.activo or actual in (None, producto.id) or not self._por_id[actual].activo:
+            self._por_clave[_clave(producto.descripcion)] = producto.id
+        if producto.id.isdigit():
+            self._ultimo_id = max(self._ultimo_id, int(producto.id))
+        if self._indice is not None:
+            self._indexar_busqueda(producto)
+
+    def _indexar_busqueda(self, producto):
+        if producto.activo:
+            self._indice.agregar(producto.id, producto.descripcion)
+        else:
+            self._indice.eliminar(producto.id)
+
+    def _cargar_fila(self, fila):
+        self._indexar(Producto.from_row(fila))
+
+    def _aplicar(self, cambio):
+        self._indexar(Producto.from_row(cambio["producto"]))
+
+    def _filas(self):
+        return (p.to_row() for p in self._por_id.values())
+
+    # ---------------------------
+    # Consultas
+    # ---------------------------
+    def get(self, id_producto):
+        self._sincronizar()
+        return self._por_id.get(id_producto)
+
+    def por_descripcion(self, descripcion):
+        self._sincronizar()
+        id_producto = self._por_clave.get(_clave(descripcion))
+        return self._por_id[id_producto] if id_producto else None
+
+    def buscar(self, texto, k=20):
+        """Top-k productos activos cuya descripción (o una palabra) empieza con `texto`."""
+        self._sincronizar()
+        with self._lock:
+            if self._indice is None:
+                self._indice = busqueda.IndiceBusqueda()
+                for producto in self._por_id.values():
+                    self._indexar_busqueda(producto)
+            return [self._por_id[i] for i in self._indice.buscar(texto, k)]
+
+    def todos(self, activos=True):
+        self._sincronizar()
+        with self._lock:
+            return [p for p in self._por_id.values() if p.activo or not activos]
+
+    def __len__(self):
+        self._sincronizar()
+        return len(self._por_id)
+
+    # ---------------------------
+    # Escrituras incrementales
+    # ---------------------------
+    def registrar(self, descripcion, precio):
+        """
+        Producto activo con esa descripción; si no existe lo da de alta con
+        `precio` (texto, float o Decimal). Sólo lo usan el editor del catálogo
+        y la migración: guardar un pedido nunca da de alta productos.
+        """
+        descripcion = " ".join(str(descripcion).split())
+        if not descripcion:
+            raise ValueError("El producto necesita una descripción")
+
+        existente = self.por_descripcion(descripcion)
+        if existente is not None and existente.activo:
+            return existente
+
+        with persistencia.bloqueo(self.file):
+            self._sincronizar()
+            existente = self._por_clave.get(_clave(descripcion))
+            if existente is not None and self._por_id[existente].activo:   # otro proceso lo dio de alta
+                return self._por_id[existente]
+            producto = self._alta(descripcion, a_centavos(precio))
+        return producto
+
+    def _alta(self, descripcion, precio_centavos, activo=True):
+        # Llamar con bloqueo(self.file) tomado
+        producto = Producto(str(self._ultimo_id + 1), descripcion, precio_centavos, activo)
+        self._anexar_fila(producto.to_row())
+        self._sincronizar()
+        return producto
+
+    def guardar(self, producto):
+        """
+        Cambia precio o activo de un producto existente. Si cambia la
+        descripción, el id anterior se da de baja y se crea uno nuevo.
+        Devuelve el producto guardado (con su id nuevo, si lo hubo).
+        """
+        with persistencia.bloqueo(self.file):
+            self._sincronizar()
+            anterior = self._por_id.get(producto.id)
+            if anterior is None:
+                raise KeyError(f"No existe el producto {producto.id}")
+            otro = self._por_clave.get(_clave(producto.descripcion))
+            if otro is not None and otro != producto.id and self._por_id[otro].activo:
+                raise ValueError(f"Ya existe un producto '{producto.descripcion}'")
+            if producto.descripcion != anterior.descripcion:
+                nuevo = self._alta(producto.descripcion, producto.precio_centavos, producto.activo)
+                self._anexar_cambio({"producto": replace(anterior, activo=False).to_row()})
+                return nuevo
+            self._anexar_cambio({"producto": producto.to_row()})
+        return producto
+
+    # ---------------------------
+    # Formato compacto de ítems en pedidos.csv
+    # ---------------------------
+    def codificar(self, items, registrar=False):
+        """
+        [Item] -> 'id:cantidad@centavos;...' si cada descripción es, tal cual,
+        la de un producto del catálogo. Si no (texto libre, ítem sin
+        descripción) el pedido se guarda en JSON con sus descripciones.
+        - registrar: dar de alta lo que falte (sólo la migración de pedidos)
+        """
+        if any(not it.descripcion.strip() for it in items):
+            return items_a_json(items)
+        partes = []
+        for it in items:
+            if registrar:
+                producto = self.registrar(it.descripcion, it.precio_centavos / 100)
+            else:
+                producto = self.por_descripcion(it.descripcion)
+            if producto is None or producto.descripcion != it.descripcion:
+                return items_a_json(items)
+            partes.append(f"{producto.id}:{it.cantidad}@{it.precio_centavos}")
+        return ";".join(partes)
+
+    def decodificar(self, texto):
+        """
+        'id:cantidad@centavos;...' -> [Item] con la descripción de ese id
+        (que no cambia). Un id que no esté en el catálogo conserva cantidad
+        y precio con una descripción genérica: el pedido no se pierde.
+        """
+        self._sincronizar()
+        items = []
+        for parte in texto.split(";"):
+            if not parte:
+                continue
+            id_producto, resto = parte.split(":", 1)
+            cantidad, centavos = resto.split("@", 1)
+            producto = self._por_id.get(id_producto)
+            items.append(Item(
+                descripcion=producto.descripcion if producto else f"Producto {id_producto}",
+                cantidad=int(cantidad),
+                precio_centavos=int(centavos),
+                id_producto=id_producto
+            ))
+        return items
+
+
+# ---------------------------
+# Catálogo compartido por el proceso
+# ---------------------------
+_catalogos = {}
+_catalogos_lock = threading.Lock()
+
+
+def obtener_catalogo(file=CATALOGO_FILE):
+    with _catalogos_lock:
+        if file not in _catalogos:
+            _catalogos[file] = Catalogo(file)
+        return _catalogos[file]
+
+
+def migrar_pedidos(file=almacen_pedidos.PEDIDOS_FILE, catalogo_file=CATALOGO_FILE):
+    """
+    Pasa los ítems JSON de pedidos.csv al formato compacto con ids del
+    catálogo (dando de alta los productos que falten). Devuelve cuántos
+    pedidos se convirtieron.
+    """
+    catalogo = obtener_catalogo(catalogo_file)
+    return almacen_pedidos.obtener_store(file).recodificar_items(partial(catalogo.codificar, registrar=True))
+
+
+if __name__ == "__main__":
+    # python catalogo.py migrar [pedidos.csv]
+    if len(sys.argv) > 1 and sys.argv[1] == "migrar":
+        archivo = sys.argv[2] if len(sys.argv) > 2 else almacen_pedidos.PEDIDOS_FILE
+        print(f"[OK] {migrar_pedidos(archivo)} pedidos convertidos al formato compacto")
+    else:
+        print("Uso: python catalogo.py migrar [pedidos.csv]")
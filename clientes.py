@@ -0,0 +1,178 @@
+import threading
+import uuid
+
+import busqueda
+import persistencia
+
+CLIENTE_FILE = "cliente.csv"
+
+CAMPOS = ["id", "cliente", "direccion", "direccion_entrega", "fecha_evento", "telefono_cliente"]
+
+# Para clientes escritos a mano sin id: id estable derivado de sus datos,
+# así no hace falta reescribir cliente.csv para normalizarlos.
+_NAMESPACE_CLIENTES = uuid.UUID("6f1d1a9e-3c1b-4d0e-9a51-0c6b8f1e2a77")
+
+
+class ClienteDuplicado(ValueError):
+    """Ya existe otro cliente con el mismo nombre y teléfono."""
+
+
+def clave(cliente):
+    """Clave de duplicados: (nombre sin mayúsculas ni espacios extremos, teléfono)."""
+    return (
+        (cliente.get("cliente") or "").strip().lower(),
+        (cliente.get("telefono_cliente") or "").strip()
+    )
+
+
+class ClientStore(persistencia.CSVConDiario):
+    """
+    Clientes de cliente.csv con índices en memoria:
+    - por id
+    - por (nombre normalizado, teléfono) para detectar duplicados
+    - por nombre exacto (búsqueda de cotizacion.py)
+    - índice de búsqueda por nombre, teléfono y dirección (busqueda.py)
+    Guardar o borrar anexa una línea a cliente.log en vez de reescribir el
+    archivo; sólo se recarga cuando cliente.csv/cliente.log cambian en disco.
+    """
+
+    CAMPOS = CAMPOS
+
+    def _vaciar(self):
+        self._por_id = {}
+        self._por_clave = {}
+        self._por_nombre = {}
+        self._indice = None  # se construye con la primera búsqueda
+
+    def _indexar(self, cliente):
+        anterior = self._por_id.get(cliente["id"])
+        if anterior is not None:
+            self._desindexar_secundarios(anterior)
+        self._por_id[cliente["id"]] = cliente  # conserva su posición original
+        self._por_clave[clave(cliente)] = cliente["id"]
+        self._por_nombre.setdefault(cliente["cliente"], []).append(cliente["id"])
+        if self._indice is not None:
+            self._indexar_busqueda(cliente)
+
+    def _desindexar(self, cliente):
+        self._por_id.pop(cliente["id"], None)
+        self._desindexar_secundarios(cliente)
+        if self._indice is not None:
+            self._indice.eliminar(cliente["id"])
+
+    def _indexar_busqueda(self, cliente):
+        self._indice.agregar(cliente["id"], cliente["cliente"], cliente["telefono_cliente"], cliente["direccion"])
+
+    def _desindexar_secundarios(self, cliente):
+        if self._por_clave.get(clave(cliente)) == cliente["id"]:
+            del self._por_clave[clave(cliente)]
+        ids = self._por_nombre.get(cliente["cliente"], [])
+        if cliente["id"] in ids:
+            ids.remove(cliente["id"])
+            if not ids:
+                del self._por_nombre[cliente["cliente"]]
+
+    def _cargar_fila(self, fila):
+        cliente = {k: fila.get(k) or "" for k in CAMPOS}
+        if not cliente["id"]:
+            cliente["id"] = str(uuid.uuid5(
+                _NAMESPACE_CLIENTES, "|".join(cliente[k] for k in CAMPOS[1:])
+            ))
+        self._indexar(cliente)
+
+    def _aplicar(self, cambio):
+        if cambio["op"] == "guardar":
+            self._indexar(dict(cambio["cliente"]))
+        elif cambio["op"] == "borrar":
+            cliente = self._por_id.get(cambio["id"])
+            if cliente is not None:
+                self._desindexar(cliente)
+
+    def _filas(self):
+        return self._por_id.values()
+
+    # ---------------------------
+    # Consultas
+    # ---------------------------
+    def get(self, id_cliente):
+        self._sincronizar()
+        cliente = self._por_id.get(id_cliente)
+        return dict(cliente) if cliente else None
+
+    def buscar_por_nombre(self, nombre):
+        self._sincronizar()
+        ids = self._por_nombre.get(nombre)
+        return self.get(ids[0]) if ids else None
+
+    def buscar(self, texto, k=20):
+        """Top-k clientes por nombre, teléfono o dirección (sin acentos ni mayúsculas)."""
+        self._sincronizar()
+        with self._lock:
+            if self._indice is None:
+                self._indice = busqueda.IndiceBusqueda()
+                for cliente in self._por_id.values():
+                    self._indexar_busqueda(cliente)
+            return [dict(self._por_id[i]) for i in self._indice.buscar(texto, k)]
+
+    def duplicado(self, cliente):
+        """Otro cliente (distinto id) con el mismo nombre y teléfono, o None."""
+        self._sincronizar()
+        id_existente = self._por_clave.get(clave(cliente))
+        if id_existente and id_existente != cliente.get("id", ""):
+            return dict(self._por_id[id_existente])
+        return None
+
+    def todos(self):
+        self._sincronizar()
+        with self._lock:
+            return [dict(c) for c in self._por_id.values()]
+
+    def __len__(self):
+        self._sincronizar()
+        return len(self._por_id)
+
+    # ---------------------------
+    # Escrituras incrementales
+    # ---------------------------
+    def guardar(self, cliente):
+        """
+        Crea o actualiza un cliente (le asigna id si no tiene).
+        Lanza ClienteDuplicado si otro cliente tiene el mismo nombre y teléfono.
+        """
+        cliente = {k: cliente.get(k) or "" for k in CAMPOS}
+        if not cliente["id"]:
+            cliente["id"] = str(uuid.uuid4())
+
+        with persistencia.bloqueo(self.file):
+            self._sincronizar()
+            if self.duplicado(cliente):
+                raise ClienteDuplicado("Ya existe un cliente con el mismo nombre y teléfono")
+
+            if self._por_id.get(cliente["id"]) == cliente:
+                return cliente   # sin cambios: no se anexa nada
+            if cliente["id"] in self._por_id:
+                self._anexar_cambio({"op": "guardar", "cliente": cliente})
+            else:
+                self._anexar_fila(cliente)
+
+        return cliente
+
+    def borrar(self, id_cliente):
+        with persistencia.bloqueo(self.file):
+            self._sincronizar()
+            if id_cliente in self._por_id:
+                self._anexar_cambio({"op": "borrar", "id": id_cliente})
+
+
+# ---------------------------
+# Almacén compartido por el proceso
+# ---------------------------
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def obtener_store(file=CLIENTE_FILE):
+    with _stores_lock:
+        if file not in _stores:
+            _stores[file] = ClientStore(file)
+        return _stores[file]
@@ -0,0 +1,253 @@
+import os
+import sys
+import threading
+import time
+import uuid
+from dataclasses import replace
+
+import cotizacion
+import metricas
+import persistencia
+from modelos import TrabajoPDF
+
+COLA_FILE = "cola_pdf.csv"
+
+CAMPOS = ["id", "estado", "creado", "id_pedido", "datos", "folio", "pdf_path",
+          "error", "tiempos", "desde_cache", "proceso"]
+
+# Hilos que generan PDFs en este proceso (tectonic ya compila en su propio pool)
+WORKERS = int(os.environ.get("COLA_PDF_WORKERS", "2"))
+
+# Cada cuánto revisa un hilo ocioso si otro proceso encoló algo
+INTERVALO = float(os.environ.get("COLA_PDF_INTERVALO", "1.0"))
+
+# Los trabajos terminados se conservan este tiempo (se descartan al compactar)
+RETENCION_HORAS = float(os.environ.get("COLA_PDF_RETENCION_HORAS", "24"))
+
+ETAPAS = ["espera", "cache", "folio", "render", "compilar", "publicar", "total"]
+
+
+def _proceso_vivo(pid):
+    try:
+        os.kill(int(pid), 0)
+    except (ValueError, ProcessLookupError):
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class ColaPDF(persistencia.CSVConDiario):
+    """
+    Cola persistente de generación de cotizaciones (cola_pdf.csv + cola_pdf.log).
+    - encolar() guarda el trabajo y devuelve su id de inmediato
+    - los hilos de iniciar() toman los pendientes en orden de llegada y
+      llaman a cotizacion.render_quote; tomar un trabajo es un cambio
+      hecho con el bloqueo del archivo, así que varios procesos (otra
+      instancia de Streamlit o `python cola_pdf.py`) pueden atender la
+      misma cola sin generar dos veces el mismo trabajo
+    - cada trabajo guarda estado, resultado, error y segundos por etapa
+    Un trabajo que quedó en_proceso en un proceso que ya no existe vuelve
+    a pendiente al iniciar los hilos y cuando un hilo ocioso lo nota.
+    El diario (cola_pdf.log) guarda sólo lo que cambia de cada trabajo
+    ({"id", "estado", ...}); cliente e ítems van una vez, en la fila.
+    """
+
+    CAMPOS = CAMPOS
+
+    def __init__(self, file=COLA_FILE, compactar_cada=500):
+        super().__init__(file, compactar_cada)
+        self._hay_trabajo = threading.Condition()
+        self._hilos = []
+
+    def _vaciar(self):
+        self._trabajos = {}
+
+    def _cargar_fila(self, fila):
+        trabajo = TrabajoPDF.from_row(fila)
+        self._trabajos[trabajo.id] = trabajo
+
+    def _aplicar(self, cambio):
+        if "trabajo" in cambio:   # diario anterior: el trabajo completo
+            self._cargar_fila(cambio["trabajo"])
+            return
+        # Sólo los campos que cambiaron: datos (cliente, ítems) no se vuelve a leer
+        trabajo = self._trabajos.get(cambio["id"])
+        if trabajo is not None:   # si no, ya se descartó al compactar
+            self._trabajos[trabajo.id] = trabajo.con_fila(cambio)
+
+    def _filas(self):
+        limite = time.time() - RETENCION_HORAS * 3600
+        return (t.to_row() for t in self._trabajos.values() if not (t.terminado and t.creado < limite))
+
+    # ---------------------------
+    # Consultas
+    # ---------------------------
+    def get(self, id_trabajo):
+        self._sincronizar()
+        return self._trabajos.get(id_trabajo)
+
+    def _en_estado(self, estado):
+        return sorted((t for t in self._trabajos.values() if t.estado == estado), key=lambda t: t.creado)
+
+    def profundidad(self):
+        """(pendientes, en_proceso)"""
+        self._sincronizar()
+        with self._lock:
+            return len(self._en_estado("pendiente")), len(self._en_estado("en_proceso"))
+
+    def posicion(self, id_trabajo):
+        """Lugar en la fila (1 = el siguiente); None si ya no está pendiente."""
+        self._sincronizar()
+        with self._lock:
+            for i, trabajo in enumerate(self._en_estado("pendiente"), 1):
+                if trabajo.id == id_trabajo:
+                    return i
+        return None
+
+    def tiempos_promedio(self, ultimos=100):
+        """Segundos promedio por etapa de los últimos trabajos terminados bien."""
+        self._sincronizar()
+        with self._lock:
+            listos = sorted((t for t in self._trabajos.values() if t.estado == "listo"),
+                            key=lambda t: t.creado)[-ultimos:]
+        promedios = {}
+        for etapa in ETAPAS:
+            valores = [t.tiempos[etapa] for t in listos if etapa in t.tiempos]
+            if valores:
+                promedios[etapa] = sum(valores) / len(valores)
+        return promedios
+
+    # ---------------------------
+    # Escrituras
+    # ---------------------------
+    def encolar(self, cliente, items, id_pedido=None):
+        trabajo = TrabajoPDF(
+            id=uuid.uuid4().hex[:12],
+            estado="pendiente",
+            creado=time.time(),
+            id_pedido=id_pedido or "",
+            datos={"cliente": dict(cliente), "items": [dict(it) for it in items]}
+        )
+        with persistencia.bloqueo(self.file):
+            self._sincronizar()
+            self._anexar_fila(trabajo.to_row())
+            self._sincronizar()
+        with self._hay_trabajo:
+            self._hay_trabajo.notify()
+        return trabajo
+
+    def _guardar(self, trabajo, **cambios):
+        """Anexa al diario sólo los campos que cambian. Llamar con bloqueo(self.file) tomado."""
+        trabajo = replace(trabajo, **cambios)
+        self._anexar_cambio(trabajo.to_row(campos=cambios))
+        return trabajo
+
+    def _tomar(self):
+        """Marca como en_proceso el pendiente más viejo y lo devuelve; None si no hay."""
+        self._sincronizar()
+        with self._lock:
+            if not self._en_estado("pendiente"):
+                return None
+        with persistencia.bloqueo(self.file):
+            self._sincronizar()
+            pendientes = self._en_estado("pendiente")
+            if not pendientes:   # otro proceso se lo llevó
+                return None
+            return self._guardar(pendientes[0], estado="en_proceso", proceso=str(os.getpid()))
+
+    def _terminar(self, trabajo, **cambios):
+        with persistencia.bloqueo(self.file):
+            self._sincronizar()
+            return self._guardar(trabajo, **cambios)
+
+    def recuperar(self):
+        """Devuelve a pendiente los trabajos en_proceso de procesos que ya no existen."""
+        with persistencia.bloqueo(self.file):
+            self._sincronizar()
+            caidos = [t for t in self._en_estado("en_proceso") if not _proceso_vivo(t.proceso)]
+            for trabajo in caidos:
+                self._guardar(trabajo, estado="pendiente", proceso="")
+        return len(caidos)
+
+    def _hay_caidos(self):
+        """Sin tomar el bloqueo: ¿algún en_proceso es de un proceso que ya no existe?"""
+        self._sincronizar()
+        with self._lock:
+            return any(not _proceso_vivo(t.proceso) for t in self._en_estado("en_proceso"))
+
+    # ---------------------------
+    # Generación
+    # ---------------------------
+    def procesar(self, trabajo):
+        inicio = time.time()
+        metricas.registrar("espera", inicio - trabajo.creado)
+        try:
+            resultado = cotizacion.render_quote(
+                trabajo.datos.get("cliente", {}), trabajo.datos.get("items", []), trabajo.id_pedido or None
+            )
+        except cotizacion.CotizacionError as e:
+            return self._terminar(trabajo, estado="error", error=f"{e}\n{e.stderr}".strip(),
+                                  tiempos={"espera": inicio - trabajo.creado, "total": time.time() - trabajo.creado})
+        except Exception as e:   # datos inválidos, disco lleno...: el hilo sigue atendiendo la cola
+            return self._terminar(trabajo, estado="error", error=f"{type(e).__name__}: {e}",
+                                  tiempos={"espera": inicio - trabajo.creado, "total": time.time() - trabajo.creado})
+
+        tiempos = {"espera": inicio - trabajo.creado, **resultado.tiempos, "total": time.time() - trabajo.creado}
+        metricas.registrar("total", tiempos["total"], cache=resultado.desde_cache)
+        return self._terminar(trabajo, estado="listo", folio=resultado.folio, pdf_path=resultado.pdf_path,
+                              desde_cache=resultado.desde_cache, tiempos=tiempos)
+
+    def atender(self, detener=None):
+        """Bucle de un hilo: toma y procesa trabajos hasta que `detener` (Event) se active."""
+        while detener is None or not detener.is_set():
+            trabajo = self._tomar()
+            if trabajo is None:
+                # Ocioso: si otro proceso murió a medio trabajo, se recupera aquí
+                if self._hay_caidos() and self.recuperar():
+                    continue
+                with self._hay_trabajo:
+                    self._hay_trabajo.wait(INTERVALO)
+                continue
+            self.procesar(trabajo)
+
+    def iniciar(self, workers=WORKERS):
+        """Arranca los hilos de este proceso (una sola vez)."""
+        with self._lock:
+            if self._hilos:
+                return self
+            self.recuperar()
+            for n in range(workers):
+                hilo = threading.Thread(target=self.atender, name=f"cola-pdf-{n}", daemon=True)
+                hilo.start()
+                self._hilos.append(hilo)
+        return self
+
+
+# ---------------------------
+# Cola compartida por el proceso (los hilos sobreviven a los reruns de Streamlit)
+# ---------------------------
+_colas = {}
+_colas_lock = threading.Lock()
+
+
+def obtener_cola(file=COLA_FILE, workers=WORKERS):
+    with _colas_lock:
+        if file not in _colas:
+            _colas[file] = ColaPDF(file)
+        cola = _colas[file]
+    return cola.iniciar(workers)
+
+
+if __name__ == "__main__":
+    # python cola_pdf.py [workers]   -> atiende la cola en primer plano (otro proceso)
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else WORKERS
+    cola = obtener_cola(workers=workers)
+    print(f"[OK] Atendiendo {COLA_FILE} con {workers} hilos (Ctrl+C para salir)")
+    try:
+        while True:
+            pendientes, en_proceso = cola.profundidad()
+            print(f"[INFO] pendientes={pendientes} en_proceso={en_proceso}")
+            time.sleep(10)
+    except KeyboardInterrupt:
+        pass
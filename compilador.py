@@ -0,0 +1,232 @@
+import asyncio
+import atexit
+import os
+import queue
+import shutil
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import persistencia
+
+# Número de workers por defecto (se puede cambiar con la variable de entorno)
+WORKERS = int(os.environ.get("COMPILADOR_WORKERS", min(4, os.cpu_count() or 1)))
+
+# Carpeta donde cada worker guarda su caché de tectonic (formatos y bundle).
+# Es persistente para que el calentamiento sólo sea lento la primera vez.
+# Varios procesos comparten worker-0, worker-1...: cada compilación toma el
+# bloqueo de su caché (persistencia.bloqueo) mientras corre tectonic. Costo:
+# cada número de worker es un solo lugar entre todos los procesos; dos
+# procesos con WORKERS=4 no compilan más de 4 PDFs a la vez entre los dos.
+# A cambio, tectonic nunca escribe la misma caché dos veces a la vez y la
+# caché sigue siendo la misma de una corrida a otra.
+CACHE_DIR = os.environ.get(
+    "COMPILADOR_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "cotizacion_app", "tectonic")
+)
+
+# Archivos que plantilla.tex necesita junto al .tex (\includegraphics{logo.png})
+RECURSOS = ["logo.png"]
+
+# Documento mínimo con los mismos paquetes que plantilla.tex: compilarlo
+# descarga el bundle y genera el formato antes de la primera cotización real.
+TEX_CALENTAMIENTO = r"""\documentclass[12pt]{article}
+\usepackage[utf8]{inputenc}
+\usepackage{geometry}
+\usepackage{graphicx}
+\usepackage{longtable}
+\usepackage{booktabs}
+\usepackage{array}
+\usepackage[table]{xcolor}
+\usepackage{helvet}
+\usepackage{fancyhdr}
+\begin{document}
+Cotización
+\end{document}
+"""
+
+
+class ErrorCompilacion(Exception):
+    """Tectonic falló: trae la salida completa para poder mostrarla."""
+
+    def __init__(self, mensaje, stdout="", stderr="", codigo=None):
+        super().__init__(mensaje)
+        self.stdout = stdout
+        self.stderr = stderr
+        self.codigo = codigo
+
+
+def _enlazar(origen, destino):
+    """Hard link si se puede (mismo disco), copia si no."""
+    try:
+        os.link(origen, destino)
+    except OSError:
+        shutil.copy2(origen, destino)
+
+
+class _Worker:
+    """Un directorio de trabajo propio + una caché de tectonic propia."""
+
+    def __init__(self, numero, recursos_dir, timeout):
+        self.numero = numero
+        self.timeout = timeout
+        self.scratch = tempfile.mkdtemp(prefix=f"cotizacion-worker{numero}-")
+        self.cache = os.path.join(CACHE_DIR, f"worker-{numero}")
+        os.makedirs(self.cache, exist_ok=True)
+
+        self.env = dict(os.environ, TECTONIC_CACHE_DIR=self.cache)
+
+        self.recursos = []
+        for nombre in RECURSOS:
+            origen = os.path.join(recursos_dir, nombre)
+            if os.path.exists(origen):
+                copia = os.path.join(self.scratch, nombre)
+                shutil.copy2(origen, copia)
+                self.recursos.append(copia)
+
+    def compilar(self, rendered_tex, nombre="cotizacion"):
+        # Cada compilación usa su propio subdirectorio temporal dentro del
+        # scratch del worker, y se borra completo (tex, pdf, logs) al terminar.
+        # `rendered_tex` es el LaTeX (str) o una función que lo escribe en el
+        # archivo abierto que recibe (render en streaming, sin armar el str).
+        trabajo = tempfile.mkdtemp(prefix="job-", dir=self.scratch)
+        tex_path = os.path.join(trabajo, f"{nombre}.tex")
+        pdf_path = os.path.join(trabajo, f"{nombre}.pdf")
+
+        try:
+            for recurso in self.recursos:
+                _enlazar(recurso, os.path.join(trabajo, os.path.basename(recurso)))
+
+            with open(tex_path, "w", encoding="utf-8") as f:
+                if callable(rendered_tex):
+                    rendered_tex(f)
+                else:
+                    f.write(rendered_tex)
+
+            try:
+                with persistencia.bloqueo(self.cache):
+                    result = subprocess.run(
+                        ["tectonic", f"{nombre}.tex"],
+                        cwd=trabajo,
+                        env=self.env,
+                        capture_output=True,
+                        text=True,
+                        timeout=self.timeout
+                    )
+            except FileNotFoundError:
+                raise ErrorCompilacion("No se encontró el ejecutable 'tectonic'")
+            if result.returncode != 0:
+                raise ErrorCompilacion("Error al compilar LaTeX", result.stdout, result.stderr, result.returncode)
+            if not os.path.exists(pdf_path):
+                raise ErrorCompilacion("No se generó el PDF esperado", result.stdout, result.stderr, result.returncode)
+
+            with open(pdf_path, "rb") as f:
+                return f.read()
+        except subprocess.TimeoutExpired as e:
+            raise ErrorCompilacion(f"tectonic excedió {self.timeout}s", e.stdout or "", e.stderr or "")
+        finally:
+            shutil.rmtree(trabajo, ignore_errors=True)
+
+    def calentar(self):
+        try:
+            self.compilar(TEX_CALENTAMIENTO, nombre="calentamiento")
+        except ErrorCompilacion:
+            # Si no hay red o tectonic falla aquí, el error real aparecerá
+            # en la primera cotización; no detenemos el arranque del pool.
+            pass
+
+    def cerrar(self):
+        shutil.rmtree(self.scratch, ignore_errors=True)
+
+
+class CompiladorPool:
+    """
+    Pool de workers de tectonic de larga vida.
+    - compilar(tex) -> bytes del PDF (bloqueante)
+    - await compilar_async(tex) -> bytes del PDF
+    - enviar(tex) -> concurrent.futures.Future
+    Los errores se lanzan como ErrorCompilacion.
+    """
+
+    def __init__(self, workers=None, recursos_dir=".", timeout=120, calentar=True):
+        self.workers = workers or WORKERS
+        self._libres = queue.Queue()
+        self._todos = []
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="tectonic")
+        self._cerrado = False
+
+        recursos_dir = os.path.abspath(recursos_dir)
+        for numero in range(self.workers):
+            worker = _Worker(numero, recursos_dir, timeout)
+            self._todos.append(worker)
+            if calentar:
+                # El worker entra a la cola de libres cuando termina de calentarse
+                threading.Thread(target=self._calentar, args=(worker,), daemon=True).start()
+            else:
+                self._libres.put(worker)
+
+    def _calentar(self, worker):
+        # Pase lo que pase al calentar, el worker debe quedar libre:
+        # si no, _ejecutar esperaría para siempre en self._libres.get()
+        try:
+            worker.calentar()
+        finally:
+            self._libres.put(worker)
+
+    def _ejecutar(self, rendered_tex):
+        worker = self._libres.get()
+        try:
+            return worker.compilar(rendered_tex)
+        finally:
+            self._libres.put(worker)
+
+    def enviar(self, rendered_tex):
+        if self._cerrado:
+            raise RuntimeError("El pool de compilación ya está cerrado")
+        return self._executor.submit(self._ejecutar, rendered_tex)
+
+    def compilar(self, rendered_tex):
+        return self.enviar(rendered_tex).result()
+
+    async def compilar_async(self, rendered_tex):
+        return await asyncio.wrap_future(self.enviar(rendered_tex))
+
+    def cerrar(self):
+        if self._cerrado:
+            return
+        self._cerrado = True
+        self._executor.shutdown(wait=True)
+        for worker in self._todos:
+            worker.cerrar()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+
+# ---------------------------
+# Pool compartido por el proceso
+# ---------------------------
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def obtener_pool(**opciones):
+    """Pool del proceso; las opciones sólo aplican la primera vez que se crea."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = CompiladorPool(**opciones)
+            atexit.register(_pool.cerrar)
+        return _pool
+
+
+def compilar(rendered_tex):
+    return obtener_pool().compilar(rendered_tex)
+
+
+async def compilar_async(rendered_tex):
+    return await obtener_pool().compilar_async(rendered_tex)
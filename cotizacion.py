@@ -1,13 +1,34 @@
 from jinja2 import Environment, FileSystemLoader
-import subprocess
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from functools import partial
 import csv
 import os
 import sys
+import time
 from datetime import datetime
+import archivo_pdf
+import cache_pdf
+import clientes
+import compilador
+import folios
+import metricas
+
+
+ITEMS_FILE = "items.csv"
+CLIENTE_FILE = clientes.CLIENTE_FILE
+FOLIO_FILE = folios.FOLIO_FILE
+PDF_DIR = "pdfs"
+# A partir de cuántos ítems render_quote escribe el LaTeX en streaming
+ITEMS_STREAMING = int(os.environ.get("COTIZACION_ITEMS_STREAMING", "2000"))
+CONDICIONES = "Cotización válida por 15 días. Se requiere anticipo del 50%."
+# Va en lugar del folio en el primer render (si aparece más de una vez, p. ej.
+# porque venía en los datos, se vuelve a renderizar con el folio)
+MARCA_FOLIO = "\x00FOLIO\x00"
 
 
 # ---------------------------
-# Configurar Jinja2
+# Configurar Jinja2 (una sola vez por proceso)
 # ---------------------------
 env = Environment(
     loader=FileSystemLoader("."),
@@ -19,127 +40,307 @@ env = Environment(
     comment_end_string="#)"
 )
 
-template = env.get_template("plantilla.tex")
+_template = None
 
-# ---------------------------
-# Leer ítems desde items.csv
-# ---------------------------
-items = []
-with open("items.csv", newline="", encoding="utf-8") as csvfile:
-    reader = csv.DictReader(csvfile)
-    for row in reader:
-        cantidad = int(row["cantidad"])
-        precio_unitario = float(row["precio_unitario"])
-        items.append({
-            "descripcion": row["descripcion"],
-            "cantidad": cantidad,
-            "precio_unitario": precio_unitario
-        })
 
-# ---------------------------
-# Calcular totales
-# ---------------------------
-subtotal = sum(item["cantidad"] * item["precio_unitario"] for item in items)
-iva = subtotal * 0.16
-total = subtotal + iva
+def obtener_template():
+    """Devuelve plantilla.tex compilada, cacheada a nivel de módulo."""
+    global _template
+    if _template is None:
+        _template = env.get_template("plantilla.tex")
+    return _template
+
+
+class CotizacionError(Exception):
+    """Error al generar una cotización (cliente inexistente, fallo de LaTeX, etc.)."""
+
+    def __init__(self, mensaje, stdout="", stderr=""):
+        super().__init__(mensaje)
+        self.stdout = stdout
+        self.stderr = stderr
+
+
+@dataclass
+class QuoteResult:
+    folio: str
+    pdf_path: str
+    pdf_bytes: bytes
+    id_pedido: str = None
+    desde_cache: bool = False
+    tiempos: dict = field(default_factory=dict)
 
-# ---------------------------
-# Generar fecha actual
-# ---------------------------
-fecha_hoy = datetime.today().strftime("%d/%m/%Y")
 
 # ---------------------------
-# Manejo de folio automático
+# Lectura de datos
 # ---------------------------
-folio_file = "folio.txt"
+def iterar_items(items):
+    """Como normalizar_items pero de uno en uno: `items` puede ser un generador."""
+    for it in items:
+        yield {
+            "descripcion": it["descripcion"],
+            "cantidad": int(it["cantidad"]),
+            "precio_unitario": float(it["precio_unitario"])
+        }
 
-if not os.path.exists(folio_file):
-    last_folio = 0
-else:
-    with open(folio_file, "r") as f:
-        last_folio = int(f.read().strip())
 
-new_folio = last_folio + 1
+def normalizar_items(items):
+    """Convierte cantidades y precios (que pueden venir como texto) a números."""
+    return list(iterar_items(items))
 
-# Guardar nuevo folio
-with open(folio_file, "w") as f:
-    f.write(str(new_folio))
 
-folio_str = f"COT-{new_folio:03d}"  # -> COT-001, COT-002, etc.
+def leer_items(file=ITEMS_FILE):
+    with open(file, newline="", encoding="utf-8") as csvfile:
+        return normalizar_items(csv.DictReader(csvfile))
 
 
-# ---------------------------
-# Leer datos del cliente desde cliente.csv
-# ---------------------------
-cliente_nombre = sys.argv[1] if len(sys.argv) > 1 else None
-cliente_data = None
-id_pedido = sys.argv[2] if len(sys.argv) > 2 else None
+def iterar_items_csv(file=ITEMS_FILE):
+    """Ítems de items.csv uno por uno, sin cargar el archivo completo."""
+    with open(file, newline="", encoding="utf-8") as csvfile:
+        yield from iterar_items(csv.DictReader(csvfile))
 
-with open("cliente.csv", newline="", encoding="utf-8") as csvfile:
-    reader = csv.DictReader(csvfile)
-    for row in reader:
-        if cliente_nombre and row["cliente"] == cliente_nombre:
-            cliente_data = row
-            break
 
-if not cliente_data:
-    print("[ERROR] Cliente no encontrado en cliente.csv")
-    sys.exit(1)
+def buscar_cliente(nombre, file=CLIENTE_FILE):
+    """Busca un cliente por nombre en cliente.csv. Devuelve None si no existe."""
+    if not nombre:
+        return None
+    return clientes.obtener_store(file).buscar_por_nombre(nombre)
+
 
 # ---------------------------
-# Datos de la cotización
+# Manejo de folio automático
 # ---------------------------
-datos = {
-    "folio": folio_str,
-    "fecha": fecha_hoy,
-    "cliente": cliente_data.get("cliente", ""),
-    "direccion": cliente_data.get("direccion", ""),
-    "direccion_entrega": cliente_data.get("direccion_entrega", ""),
-    "fecha_evento": cliente_data.get("fecha_evento", ""),
-    "items": items,
-    "subtotal": subtotal,
-    "iva": iva,
-    "total": total,
-    "condiciones": "Cotización válida por 15 días. Se requiere anticipo del 50%.",
-    "telefono_cliente": cliente_data.get("telefono_cliente", ""),
-    "id_pedido": id_pedido
-}
+def siguiente_folio():
+    return folios.siguiente(FOLIO_FILE)
+
+
+def formatear_folio(numero):
+    return folios.formatear(numero)  # -> COT-001, COT-002, ..., COT-1000
+
 
 # ---------------------------
-# Renderizar LaTeX
+# Renderizado
 # ---------------------------
-rendered_tex = template.render(datos)
+def armar_datos(cliente, items, folio, id_pedido=None, fecha=None):
+    """Arma el diccionario que consume plantilla.tex."""
+    subtotal = sum(item["cantidad"] * item["precio_unitario"] for item in items)
+    iva = subtotal * 0.16
+    total = subtotal + iva
+    return _datos(cliente, items, folio, id_pedido, fecha, subtotal, iva, total)
+
+
+def _datos(cliente, items, folio, id_pedido, fecha, subtotal, iva, total):
+    return {
+        "folio": folio,
+        "fecha": fecha or datetime.today().strftime("%d/%m/%Y"),
+        "cliente": cliente.get("cliente", ""),
+        "direccion": cliente.get("direccion", ""),
+        "direccion_entrega": cliente.get("direccion_entrega", ""),
+        "fecha_evento": cliente.get("fecha_evento", ""),
+        "items": items,
+        "subtotal": subtotal,
+        "iva": iva,
+        "total": total,
+        "condiciones": CONDICIONES,
+        "telefono_cliente": cliente.get("telefono_cliente", ""),
+        "id_pedido": id_pedido
+    }
+
+
+class ItemsConTotales:
+    """
+    Recorre los ítems una sola vez (pueden venir de un generador) y va
+    sumando el subtotal mientras la plantilla los escribe.
+    """
+
+    def __init__(self, items):
+        self._items = items
+        self.subtotal = 0.0
+        self.lineas = 0
+
+    def __iter__(self):
+        for item in self._items:
+            self.subtotal += item["cantidad"] * item["precio_unitario"]
+            self.lineas += 1
+            yield item
+
+
+class _Diferido:
+    """Número que se calcula al formatearlo ("%.2f"|format en la plantilla), después de la tabla."""
+
+    def __init__(self, calcular):
+        self._calcular = calcular
+
+    def __float__(self):
+        return float(self._calcular())
 
-tex_file = "cotizacion.tex"
-with open(tex_file, "w", encoding="utf-8") as f:
-    f.write(rendered_tex)
+
+def armar_datos_streaming(cliente, items, folio, id_pedido=None, fecha=None):
+    """
+    Como armar_datos, pero `items` se recorre al renderizar: subtotal, IVA
+    y total se acumulan en esa misma pasada (la plantilla los usa después
+    de la tabla). Los datos sirven para un solo render.
+    """
+    acumulado = ItemsConTotales(items)
+    return _datos(
+        cliente, acumulado, folio, id_pedido, fecha,
+        _Diferido(lambda: acumulado.subtotal),
+        _Diferido(lambda: acumulado.subtotal * 0.16),
+        _Diferido(lambda: acumulado.subtotal + acumulado.subtotal * 0.16)
+    )
+
+
+def renderizar_tex(datos):
+    return obtener_template().render(datos)
+
+
+def escribir_tex(datos, f):
+    """Escribe el LaTeX en `f` a medida que Jinja2 lo genera (template.generate, sin armar el str)."""
+    for trozo in obtener_template().generate(datos):
+        f.write(trozo)
+
+
+def compilar_tex(rendered_tex):
+    """
+    Compila en el pool de tectonic ya calentado y devuelve los bytes del PDF.
+    `rendered_tex` es el LaTeX o una función que lo escribe en un archivo (escribir_tex).
+    """
+    try:
+        return compilador.compilar(rendered_tex)
+    except compilador.ErrorCompilacion as e:
+        raise CotizacionError(str(e), e.stdout, e.stderr)
+
+
+def publicar_pdf(folio, pdf_bytes, id_pedido=None, cliente=None):
+    """Guarda el PDF en el archivo de pdfs/ (atómico: nunca queda un PDF a medias) y lo indexa."""
+    return archivo_pdf.obtener_archivo(PDF_DIR).publicar(folio, pdf_bytes, id_pedido, cliente)
+
+
+@contextmanager
+def _etapa(tiempos, nombre):
+    """Suma los segundos del bloque a tiempos[nombre] y los registra en metricas."""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        segundos = time.perf_counter() - inicio
+        tiempos[nombre] = tiempos.get(nombre, 0.0) + segundos
+        metricas.registrar(nombre, segundos)
+
+
+def render_quote(cliente, items, id_pedido=None, usar_cache=True):
+    """
+    Genera la cotización en PDF sin lanzar un proceso nuevo.
+    - cliente: dict con datos del cliente (mismas columnas que cliente.csv)
+    - items: lista de dicts con descripcion, cantidad, precio_unitario
+    - id_pedido: id del pedido guardado en pedidos.csv
+    - usar_cache: consultar cache_pdf antes de compilar con tectonic
+    Devuelve un QuoteResult con la ruta, los bytes del PDF y los segundos
+    de cada etapa (cache, folio, render, compilar, publicar).
+    Con un generador o ITEMS_STREAMING ítems o más se usa render_quote_stream,
+    que no consulta la caché (usar_cache no aplica).
+    """
+    if not isinstance(items, (list, tuple)) or len(items) >= ITEMS_STREAMING:
+        return render_quote_stream(cliente, items, id_pedido)
+
+    tiempos = {}
+    etapa = partial(_etapa, tiempos)
+    items = normalizar_items(items)
+    cache = cache_pdf.obtener_cache() if usar_cache else None
+
+    # Un solo render, con una marca en lugar del folio: el mismo texto sirve
+    # de clave de caché (sin folio) y, con el folio puesto, para compilar
+    with etapa("render"):
+        fecha = datetime.today().strftime("%d/%m/%Y")
+        tex_sin_folio = renderizar_tex(armar_datos(cliente, items, MARCA_FOLIO, id_pedido, fecha))
+
+    if cache:
+        # Mismo pedido, mismos datos y mismo día: se entrega ese PDF con su folio
+        with etapa("cache"):
+            clave = cache.clave(tex_sin_folio)
+            encontrado = cache.obtener(clave)
+        if encontrado:
+            folio, pdf_bytes = encontrado
+            with etapa("publicar"):
+                pdf_path = archivo_pdf.obtener_archivo(PDF_DIR).ruta(folio)
+                if pdf_path is None:
+                    pdf_path = publicar_pdf(folio, pdf_bytes, id_pedido, cliente.get("cliente"))
+            return QuoteResult(folio=folio, pdf_path=pdf_path, pdf_bytes=pdf_bytes,
+                               id_pedido=id_pedido, desde_cache=True, tiempos=tiempos)
+
+    with etapa("folio"):
+        folio = formatear_folio(siguiente_folio())
+    with etapa("render"):
+        if tex_sin_folio.count(MARCA_FOLIO) == 1:
+            rendered_tex = tex_sin_folio.replace(MARCA_FOLIO, folio)
+        else:
+            rendered_tex = renderizar_tex(armar_datos(cliente, items, folio, id_pedido, fecha))
+
+    with etapa("compilar"):
+        pdf_bytes = compilar_tex(rendered_tex)
+    with etapa("publicar"):
+        pdf_path = publicar_pdf(folio, pdf_bytes, id_pedido, cliente.get("cliente"))
+        if cache:
+            cache.guardar(clave, folio, pdf_bytes)
+
+    return QuoteResult(folio=folio, pdf_path=pdf_path, pdf_bytes=pdf_bytes, id_pedido=id_pedido,
+                       tiempos=tiempos)
+
+
+def render_quote_stream(cliente, items, id_pedido=None):
+    """
+    render_quote para cotizaciones grandes, con memoria acotada sin importar
+    cuántos ítems haya:
+    - items puede ser un generador (iterar_items_csv) y se recorre una vez
+    - el LaTeX va de template.generate() directo al .tex del worker
+    - subtotal, IVA y total se suman en esa misma pasada
+    Sin caché de PDFs: la clave exigiría recorrer los ítems dos veces.
+    El render ocurre dentro de la etapa "compilar".
+    """
+    tiempos = {}
+    etapa = partial(_etapa, tiempos)
+
+    with etapa("folio"):
+        folio = formatear_folio(siguiente_folio())
+    with etapa("render"):
+        datos = armar_datos_streaming(cliente, iterar_items(items), folio, id_pedido)
+    with etapa("compilar"):
+        pdf_bytes = compilar_tex(partial(escribir_tex, datos))
+    with etapa("publicar"):
+        pdf_path = publicar_pdf(folio, pdf_bytes, id_pedido, cliente.get("cliente"))
+
+    return QuoteResult(folio=folio, pdf_path=pdf_path, pdf_bytes=pdf_bytes, id_pedido=id_pedido,
+                       tiempos=tiempos)
 
 
 # ---------------------------
-# Compilar con tectonic
+# Uso por línea de comandos:
+#   python cotizacion.py "Nombre Cliente" [id_pedido]
 # ---------------------------
-try:
-    result = subprocess.run(
-        ["tectonic", tex_file],
-        check=True,
-        capture_output=True,
-        text=True
-    )
-    print("[INFO] STDOUT:\n", result.stdout)
-    print("[INFO] STDERR:\n", result.stderr)
-
-    if os.path.exists("cotizacion.pdf"):
-        os.makedirs("pdfs", exist_ok=True)  # 📂 Asegurar carpeta pdfs
-        pdf_name = f"COT-{new_folio:03d}.pdf"
-        pdf_path = os.path.join("pdfs", pdf_name)
-        os.rename("cotizacion.pdf", pdf_path)
-        print(f"[OK] PDF generado: {pdf_path}")
-    else:
-        print("[ERROR] No se generó el PDF esperado")
-
-except subprocess.CalledProcessError as e:
-    print("[ERROR] Error al compilar LaTeX")
-    print("----- STDOUT -----")
-    print(e.stdout)
-    print("----- STDERR -----")
-    print(e.stderr)
+def main(argv):
+    cliente_nombre = argv[1] if len(argv) > 1 else None
+    id_pedido = argv[2] if len(argv) > 2 else None
+
+    cliente_data = buscar_cliente(cliente_nombre)
+    if not cliente_data:
+        print("[ERROR] Cliente no encontrado en cliente.csv")
+        return 1
+
+    # Una sola cotización: no vale la pena calentar varios workers
+    compilador.obtener_pool(workers=1, calentar=False)
+
+    try:
+        resultado = render_quote(cliente_data, leer_items(), id_pedido)
+    except CotizacionError as e:
+        print(f"[ERROR] {e}")
+        print("----- STDOUT -----")
+        print(e.stdout)
+        print("----- STDERR -----")
+        print(e.stderr)
+        return 1
+
+    print(f"[OK] PDF generado: {resultado.pdf_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,148 @@
+import datetime
+import threading
+
+import almacen_pedidos
+
+PEDIDOS_FILE = almacen_pedidos.PEDIDOS_FILE
+
+
+class VistaHistorial:
+    """
+    Pedidos (modelos.Order) para ver_historial.py, con los eventos pasados
+    (confirmados/recogidos con evento antes de hoy) ya agrupados por mes.
+    Las vistas por fecha (semana, futuros) las resuelve agenda.Agenda.
+    actualizar() pide al almacén sólo los pedidos que cambiaron y mueve cada
+    uno entre vistas; sólo reconstruye todo si pedidos.csv se recargó
+    completo o si cambió el día. Los totales por mes se llevan en centavos.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._lock = threading.RLock()
+        self._generacion = None
+        self._hoy = None
+        self._registros = {}
+        self._seq = {}            # id_pedido -> orden de llegada
+        self._siguiente_seq = 0
+
+    # ---------------------------
+    # Mantenimiento
+    # ---------------------------
+    def actualizar(self, hoy=None):
+        hoy = hoy or datetime.date.today()
+        with self._lock:
+            generacion, cambiados = self.store.cambios_desde(self._generacion)
+
+            if cambiados is None or hoy != self._hoy:
+                self._reconstruir(hoy)
+            else:
+                for id_pedido in cambiados:
+                    self._quitar_de_vistas(id_pedido)
+                    pedido = self.store.get(id_pedido)
+                    if pedido is None:
+                        self._registros.pop(id_pedido, None)
+                        self._seq.pop(id_pedido, None)
+                        continue
+                    if id_pedido not in self._seq:
+                        self._seq[id_pedido] = self._nuevo_seq()
+                    self._registros[id_pedido] = pedido
+                    self._agregar_a_vistas(pedido)
+                if cambiados:
+                    self._orden_cache = {}
+
+            self._generacion = generacion
+        return self
+
+    def _nuevo_seq(self):
+        self._siguiente_seq += 1
+        return self._siguiente_seq
+
+    def _reconstruir(self, hoy):
+        self._hoy = hoy
+        self._orden_cache = {}    # listas ya ordenadas por vista (se vacía con cada cambio)
+
+        self._pasados = {}        # (año, mes) -> {id_pedido: pedido}
+        self._totales_mes = {}    # (año, mes) -> total en centavos
+
+        self._registros = {}
+        self._seq = {}
+        self._siguiente_seq = 0
+        for pedido in self.store.query():
+            self._registros[pedido.id_pedido] = pedido
+            self._seq[pedido.id_pedido] = self._nuevo_seq()
+            self._agregar_a_vistas(pedido)
+
+    def _agregar_a_vistas(self, p):
+        fecha = p.fecha_evento
+        if fecha is None:
+            return
+
+        if p.estado in ["confirmado", "recogido"] and fecha < self._hoy:
+            mes = (fecha.year, fecha.month)
+            self._pasados.setdefault(mes, {})[p.id_pedido] = p
+            self._totales_mes[mes] = self._totales_mes.get(mes, 0) + p.total_centavos
+
+    def _quitar_de_vistas(self, id_pedido):
+        p = self._registros.get(id_pedido)
+        if p is None:
+            return
+        if p.fecha_evento:
+            mes = (p.fecha_evento.year, p.fecha_evento.month)
+            if self._pasados.get(mes, {}).pop(id_pedido, None) is not None:
+                self._totales_mes[mes] -= p.total_centavos
+                if not self._pasados[mes]:
+                    del self._pasados[mes]
+                    del self._totales_mes[mes]
+
+    # ---------------------------
+    # Consultas
+    # ---------------------------
+    def _ordenados(self, registros, nombre=None):
+        if nombre is not None and nombre in self._orden_cache:
+            return self._orden_cache[nombre]
+        ordenados = sorted(registros, key=lambda p: self._seq[p.id_pedido])
+        if nombre is not None:
+            self._orden_cache[nombre] = ordenados
+        return ordenados
+
+    def __len__(self):
+        return len(self._registros)
+
+    def pedidos(self):
+        return self._ordenados(self._registros.values())
+
+    def get(self, id_pedido):
+        return self._registros.get(id_pedido)
+
+    def meses_pasados(self):
+        """[(fecha del primer día del mes, total en centavos, número de pedidos)] sin recorrer los pedidos."""
+        return [
+            (datetime.date(anio, mes, 1), self._totales_mes[(anio, mes)], len(self._pasados[(anio, mes)]))
+            for anio, mes in sorted(self._pasados, reverse=True)
+        ]
+
+    def pasados_del_mes(self, inicio_mes):
+        mes = (inicio_mes.year, inicio_mes.month)
+        return self._ordenados(self._pasados.get(mes, {}).values(), mes)
+
+    def pasados_por_mes(self):
+        """[(fecha del primer día del mes, total en centavos, [pedidos])] del mes más reciente al más antiguo."""
+        return [
+            (datetime.date(anio, mes, 1), self._totales_mes[(anio, mes)], self._ordenados(self._pasados[(anio, mes)].values()))
+            for anio, mes in sorted(self._pasados, reverse=True)
+        ]
+
+
+# ---------------------------
+# Vista compartida por el proceso (sobrevive a los reruns de Streamlit)
+# ---------------------------
+_vistas = {}
+_vistas_lock = threading.Lock()
+
+
+def obtener_vista(file=PEDIDOS_FILE, hoy=None):
+    with _vistas_lock:
+        if file not in _vistas:
+            _vistas[file] = VistaHistorial(almacen_pedidos.obtener_store(file))
+        vista = _vistas[file]
+    return vista.actualizar(hoy)
@@ -0,0 +1,59 @@
+import os
+import re
+
+import persistencia
+
+FOLIO_FILE = "folio.txt"
+PREFIJO = "COT-"
+
+_PATRON = re.compile(r"COT-(\d+)")
+
+
+def _leer(file):
+    if not os.path.exists(file):
+        return 0
+    with open(file, "r") as f:
+        contenido = f.read().strip()
+    return int(contenido) if contenido else 0
+
+
+def reservar(n=1, file=FOLIO_FILE):
+    """
+    Reserva `n` folios consecutivos en una sola operación.
+    El contador se actualiza con bloqueo + reemplazo atómico, así que dos
+    procesos nunca reciben el mismo folio. Devuelve un range de números.
+    """
+    if n < 1:
+        raise ValueError("Hay que reservar al menos un folio")
+
+    with persistencia.bloqueo(file):
+        ultimo = _leer(file)
+        persistencia.escribir_atomico(file, str(ultimo + n))
+
+    return range(ultimo + 1, ultimo + n + 1)
+
+
+def siguiente(file=FOLIO_FILE):
+    return reservar(1, file)[0]
+
+
+def ultimo(file=FOLIO_FILE):
+    """Último folio entregado (sin reservar uno nuevo)."""
+    return _leer(file)
+
+
+def formatear(numero):
+    # COT-001 ... COT-999, COT-1000, ... (mínimo 3 dígitos, sin truncar)
+    return f"{PREFIJO}{numero:03d}"
+
+
+def numero(nombre):
+    """Número de folio a partir de 'COT-0042' o 'pdfs/COT-1000.pdf'. None si no es folio."""
+    match = _PATRON.search(os.path.basename(nombre))
+    return int(match.group(1)) if match else None
+
+
+def clave_orden(nombre):
+    """Clave para ordenar nombres de PDF por número de folio y no alfabéticamente."""
+    n = numero(nombre)
+    return (n is None, n if n is not None else 0, nombre)
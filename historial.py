@@ -1,54 +1,37 @@
-import csv
-import os
 import uuid
-import datetime
-import json
+import almacen_pedidos
+import catalogo
+import metricas
+import persistencia
+from modelos import Order
 
 PEDIDOS_FILE = "pedidos.csv"
 
 def leer_csv(file, fieldnames=None):
-    if not os.path.exists(file):
-        if fieldnames:
-            with open(file, "w", newline="", encoding="utf-8") as f:
-                writer = csv.DictWriter(f, fieldnames=fieldnames)
-                writer.writeheader()
-        return []
-    with open(file, newline="", encoding="utf-8") as f:
-        return list(csv.DictReader(f))
+    """Lectura de persistencia (versión completa del archivo); lo crea vacío si se dan columnas."""
+    filas = persistencia.leer_csv(file)
+    if not filas and fieldnames:
+        persistencia.escribir_csv(file, [], fieldnames)
+    return filas
 
 def escribir_csv(file, data, fieldnames):
-    with open(file, "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(data)
+    """Con bloqueo y reemplazo atómico (persistencia); devuelve si el archivo cambió."""
+    return persistencia.escribir_csv(file, data, fieldnames)
 
 def guardar_pedido(cliente, items):
     """
-    Guarda un pedido en pedidos.csv
+    Guarda un pedido en pedidos.csv (se anexa una fila, no se reescribe el archivo)
     - cliente: dict con datos del cliente
     - items: lista de ítems (dicts con descripcion, cantidad, precio_unitario)
+    El total se suma en centavos enteros (sin errores de redondeo de float).
+    Los ítems se guardan como ids del catálogo ("id:cantidad@centavos");
+    si alguno no está en el catálogo, en JSON con su descripción (no se dan
+    de alta productos aquí: eso sólo desde el editor del catálogo).
+    Devuelve el modelos.Order guardado.
     """
 
-    pedidos = leer_csv(PEDIDOS_FILE, fieldnames=[
-        "id_pedido","fecha_creacion","id_cliente","nombre_cliente","fecha_evento","items","total","estado"
-    ])
-
-    total = sum(float(it["precio_unitario"]) * int(it["cantidad"]) for it in items)
-
-    pedido = {
-        "id_pedido": str(uuid.uuid4()),
-        "fecha_creacion": datetime.datetime.now().strftime("%d-%m-%Y %H:%M:%S"),
-        "id_cliente": cliente.get("id",""),
-        "nombre_cliente": cliente.get("cliente",""),
-        "fecha_evento": cliente.get("fecha_evento",""),
-        "items": json.dumps(items, ensure_ascii=False),
-        "total": f"{total:.2f}",
-        "estado": "cotizacion"   # 👈 Siempre arranca como cotización
-    }
-
-    pedidos.append(pedido)
-    escribir_csv(PEDIDOS_FILE, pedidos, fieldnames=[
-        "id_pedido","fecha_creacion","id_cliente","nombre_cliente","fecha_evento","items","total","estado"
-    ])
-
-    return pedido
+    with metricas.medir("guardar_pedido"):
+        pedido = Order.nuevo(   # 👈 Siempre arranca como cotización
+            str(uuid.uuid4()), cliente, items, codificar=catalogo.obtener_catalogo().codificar
+        )
+        return almacen_pedidos.obtener_store(PEDIDOS_FILE).add(pedido)
@@ -0,0 +1,236 @@
+import csv
+import datetime
+import os
+import threading
+from collections import Counter, defaultdict
+
+import almacen_pedidos
+import busqueda
+import persistencia
+
+INVENTARIO_FILE = "inventario.csv"
+PEDIDOS_FILE = almacen_pedidos.PEDIDOS_FILE
+
+CAMPOS = ["descripcion", "stock"]
+
+# Estados que apartan el equipo en la fecha del evento
+RESERVAN = ("confirmado", "recogido")
+
+
+class SinDisponibilidad(ValueError):
+    """Confirmar el pedido dejaría algún artículo sobrevendido en su fecha."""
+
+    def __init__(self, mensaje, faltantes):
+        super().__init__(mensaje)
+        self.faltantes = faltantes
+
+
+def _clave(descripcion):
+    return busqueda.normalizar(descripcion)
+
+
+# =======================
+# Niveles de stock (inventario.csv)
+# =======================
+_stocks = {}   # ruta absoluta -> ((mtime, tamaño), stock)
+_stocks_lock = threading.Lock()
+
+
+def leer_stock(file=INVENTARIO_FILE):
+    """
+    {descripcion: unidades}. Un artículo que no aparece no se controla (sin límite).
+    Se lee de nuevo sólo si inventario.csv cambió en disco (mtime, tamaño):
+    los reruns de Streamlit no lo vuelven a parsear.
+    """
+    try:
+        st = os.stat(file)
+    except FileNotFoundError:
+        return {}
+    firma = (st.st_mtime_ns, st.st_size)
+    with _stocks_lock:
+        guardado = _stocks.get(os.path.abspath(file))
+    if guardado is not None and guardado[0] == firma:
+        return dict(guardado[1])
+
+    stock = {}
+    with open(file, newline="", encoding="utf-8") as f:
+        for fila in csv.DictReader(f):
+            try:
+                stock[fila["descripcion"].strip()] = int(fila["stock"])
+            except (KeyError, TypeError, ValueError, AttributeError):
+                continue
+    with _stocks_lock:
+        _stocks[os.path.abspath(file)] = (firma, stock)
+    return dict(stock)
+
+
+def guardar_stock(stock, file=INVENTARIO_FILE):
+    filas = [{"descripcion": d, "stock": str(int(n))} for d, n in sorted(stock.items()) if d.strip()]
+    return persistencia.escribir_csv(file, filas, CAMPOS)
+
+
+# =======================
+# Motor de disponibilidad
+# =======================
+class Disponibilidad:
+    """
+    Unidades apartadas por artículo y por día, a partir de los pedidos
+    confirmados (y recogidos) de pedidos.csv:
+        reservado[artículo][ordinal de fecha] = unidades
+    Se calcula una vez y después actualizar() sólo resta/suma lo que aporta
+    cada pedido que cambió de estado, así que consultar la disponibilidad de
+    una fecha no recorre los pedidos. Los artículos se comparan sin acentos
+    ni mayúsculas ('Tablón' == 'tablon').
+    """
+
+    def __init__(self, store, file=INVENTARIO_FILE):
+        self.store = store
+        self.file = file
+        self._lock = threading.RLock()
+        self._generacion = None
+        self._aportes = {}                      # id_pedido -> [(artículo, ordinal, unidades)]
+        self._reservado = defaultdict(Counter)  # artículo -> {ordinal: unidades}
+        self._stock = {}
+        self._stock_mtime = None
+
+    # ---------------------------
+    # Mantenimiento
+    # ---------------------------
+    def actualizar(self):
+        with self._lock:
+            self._cargar_stock()
+            generacion, cambiados = self.store.cambios_desde(self._generacion)
+            if cambiados is None:
+                # Reconstrucción completa: una sola consulta, sin un get por pedido
+                self._aportes = {}
+                self._reservado = defaultdict(Counter)
+                for pedido in self.store.query():
+                    self._poner(pedido)
+                cambiados = []
+            for id_pedido in cambiados:
+                self._quitar(id_pedido)
+                pedido = self.store.get(id_pedido)
+                if pedido is not None:
+                    self._poner(pedido)
+            self._generacion = generacion
+        return self
+
+    def _cargar_stock(self):
+        mtime = os.stat(self.file).st_mtime_ns if os.path.exists(self.file) else None
+        if mtime != self._stock_mtime:
+            self._stock = {_clave(d): (d, n) for d, n in leer_stock(self.file).items()}
+            self._stock_mtime = mtime
+
+    def _poner(self, pedido):
+        if pedido.estado not in RESERVAN or pedido.fecha_evento is None:
+            return
+        dia = pedido.fecha_evento.toordinal()
+        aportes = [(_clave(it.descripcion), dia, it.cantidad) for it in pedido.items or []]
+        for articulo, dia, unidades in aportes:
+            self._reservado[articulo][dia] += unidades
+        self._aportes[pedido.id_pedido] = aportes
+
+    def _quitar(self, id_pedido):
+        for articulo, dia, unidades in self._aportes.pop(id_pedido, []):
+            reservados = self._reservado[articulo]
+            reservados[dia] -= unidades
+            if reservados[dia] <= 0:
+                del reservados[dia]
+
+    # ---------------------------
+    # Consultas
+    # ---------------------------
+    def stock(self, descripcion):
+        """Unidades totales del artículo; None si no se controla."""
+        fila = self._stock.get(_clave(descripcion))
+        return fila[1] if fila else None
+
+    def articulos(self):
+        """{descripcion: stock} de los artículos controlados."""
+        return dict(self._stock.values())
+
+    def reservado(self, descripcion, fecha, excluir=None):
+        """Unidades apartadas ese día por otros pedidos (sin contar `excluir`)."""
+        articulo = _clave(descripcion)
+        dia = fecha.toordinal()
+        with self._lock:
+            total = self._reservado.get(articulo, {}).get(dia, 0)
+            for a, d, unidades in self._aportes.get(excluir, []):
+                if a == articulo and d == dia:
+                    total -= unidades
+        return total
+
+    def disponible(self, descripcion, fecha, excluir=None):
+        """Unidades libres ese día (puede ser negativo si ya hay sobreventa); None si no se controla."""
+        stock = self.stock(descripcion)
+        if stock is None:
+            return None
+        return stock - self.reservado(descripcion, fecha, excluir)
+
+    def faltantes(self, items, fecha, excluir=None):
+        """
+        Artículos de `items` (modelos.Item o dicts) que no alcanzan ese día.
+        [{descripcion, pedida, disponible, stock}]; vacío si todo alcanza.
+        """
+        pedidas = Counter()
+        nombres = {}
+        for it in items:
+            descripcion = it.descripcion if hasattr(it, "descripcion") else it.get("descripcion", "")
+            cantidad = it.cantidad if hasattr(it, "cantidad") else int(float(it.get("cantidad") or 0))
+            pedidas[_clave(descripcion)] += cantidad
+            nombres.setdefault(_clave(descripcion), descripcion)
+
+        resultado = []
+        for articulo, pedida in pedidas.items():
+            disponible = self.disponible(nombres[articulo], fecha, excluir)
+            if disponible is not None and pedida > disponible:
+                resultado.append({
+                    "descripcion": nombres[articulo],
+                    "pedida": pedida,
+                    "disponible": max(disponible, 0),
+                    "stock": self.stock(nombres[articulo])
+                })
+        return resultado
+
+    def verificar(self, pedido):
+        """Lanza SinDisponibilidad si confirmar `pedido` sobrevendería algo (para OrderStore.confirm)."""
+        self.actualizar()
+        if pedido.fecha_evento is None:
+            return
+        faltantes = self.faltantes(pedido.items or [], pedido.fecha_evento, excluir=pedido.id_pedido)
+        if faltantes:
+            detalle = ", ".join(f"{f['descripcion']} (pide {f['pedida']}, quedan {f['disponible']})" for f in faltantes)
+            raise SinDisponibilidad(f"Sin disponibilidad el {pedido.texto_fecha_evento}: {detalle}", faltantes)
+
+    def sobrevendidos(self, desde=None, hasta=None):
+        """[{fecha, descripcion, reservado, stock}] de los días en que lo apartado pasa el stock."""
+        inicio = desde.toordinal() if desde else 0
+        fin = hasta.toordinal() if hasta else float("inf")
+        resultado = []
+        with self._lock:
+            for articulo, (descripcion, stock) in self._stock.items():
+                for dia, unidades in self._reservado.get(articulo, {}).items():
+                    if unidades > stock and inicio <= dia <= fin:
+                        resultado.append({
+                            "fecha": datetime.date.fromordinal(dia),
+                            "descripcion": descripcion,
+                            "reservado": unidades,
+                            "stock": stock
+                        })
+        return sorted(resultado, key=lambda r: (r["fecha"], r["descripcion"]))
+
+
+# ---------------------------
+# Motor compartido por el proceso (sobrevive a los reruns de Streamlit)
+# ---------------------------
+_motores = {}
+_motores_lock = threading.Lock()
+
+
+def obtener_disponibilidad(file=PEDIDOS_FILE, inventario_file=INVENTARIO_FILE):
+    with _motores_lock:
+        clave = (file, inventario_file)
+        if clave not in _motores:
+            _motores[clave] = Disponibilidad(almacen_pedidos.obtener_store(file), inventario_file)
+        motor = _motores[clave]
+    return motor.actualizar()
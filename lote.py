@@ -0,0 +1,187 @@
+import argparse
+import sys
+import time
+from concurrent.futures import as_completed
+from dataclasses import dataclass, field
+
+import almacen_pedidos
+import clientes
+import compilador
+import cotizacion
+import folios
+import historial
+import modelos
+
+
+@dataclass
+class ResultadoPedido:
+    id_pedido: str
+    folio: str = None
+    pdf_path: str = None
+    error: str = None
+    segundos: float = 0.0
+
+
+@dataclass
+class ResumenLote:
+    resultados: list = field(default_factory=list)
+    segundos: float = 0.0
+
+    @property
+    def exitosos(self):
+        return [r for r in self.resultados if not r.error]
+
+    @property
+    def fallidos(self):
+        return [r for r in self.resultados if r.error]
+
+    @property
+    def folios_sin_usar(self):
+        """Folios reservados que no terminaron en un PDF (falló la compilación o la publicación)."""
+        return [r.folio for r in self.resultados if r.error and r.folio]
+
+    @property
+    def por_segundo(self):
+        return len(self.exitosos) / self.segundos if self.segundos else 0.0
+
+
+# =======================
+# Selección de pedidos
+# =======================
+def _fecha(texto):
+    fecha = modelos.parse_fecha(texto)
+    if fecha is None:
+        raise argparse.ArgumentTypeError(f"fecha inválida (dd-mm-aaaa): {texto}")
+    return fecha
+
+
+def seleccionar_pedidos(ids=None, estado=None, desde=None, hasta=None, file=None):
+    """
+    Filtra pedidos.csv por id_pedido, estado y/o rango de fecha_evento (fechas date, inclusivas).
+    Sin filtros devuelve todos los pedidos.
+    """
+    pedidos = almacen_pedidos.obtener_store(file or historial.PEDIDOS_FILE).query(estado=estado)
+    ids = set(ids) if ids else None
+
+    seleccionados = []
+    for p in pedidos:
+        if ids is not None and p.id_pedido not in ids:
+            continue
+        if desde or hasta:
+            fecha = p.fecha_evento
+            if not fecha or (desde and fecha < desde) or (hasta and fecha > hasta):
+                continue
+        seleccionados.append(p)
+    return seleccionados
+
+
+def cliente_de_pedido(pedido, store):
+    """Datos del cliente para la plantilla; la fecha del evento es la del pedido."""
+    cliente = store.get(pedido.id_cliente) or {}
+    cliente.setdefault("cliente", pedido.nombre_cliente)
+    cliente["fecha_evento"] = pedido.texto_fecha_evento
+    return cliente
+
+
+# =======================
+# Generación en lote
+# =======================
+def generar_lote(pedidos, workers=None):
+    """
+    Re-emite las cotizaciones de `pedidos`: renderiza las plantillas en este
+    proceso y compila en paralelo en un pool de tectonic propio.
+    - los folios se reservan después de validar: un pedido con datos
+      inválidos no gasta folio
+    - un error en un pedido (de datos, de tectonic o al publicar) queda en
+      su resultado y el lote sigue; los folios que se gastaron sin PDF
+      quedan en ResumenLote.folios_sin_usar
+    Devuelve un ResumenLote con el resultado de cada pedido.
+    """
+    resumen = ResumenLote()
+    if not pedidos:
+        return resumen
+
+    inicio = time.perf_counter()
+    store = clientes.obtener_store(cotizacion.CLIENTE_FILE)
+
+    validos = []
+    for pedido in pedidos:
+        resultado = ResultadoPedido(id_pedido=pedido.id_pedido)
+        resumen.resultados.append(resultado)
+        try:
+            if pedido.items is None:
+                raise ValueError("los ítems guardados no son JSON válido")
+            items = cotizacion.normalizar_items([it.to_dict() for it in pedido.items])
+            cliente = cliente_de_pedido(pedido, store)
+        except Exception as e:
+            resultado.error = f"Datos inválidos: {e}"
+            continue
+        validos.append((resultado, pedido, cliente, items))
+
+    numeros = folios.reservar(len(validos)) if validos else []
+
+    with compilador.CompiladorPool(workers=workers) as pool:
+        pendientes = {}
+        for (resultado, pedido, cliente, items), numero in zip(validos, numeros):
+            resultado.folio = folios.formatear(numero)
+            try:
+                datos = cotizacion.armar_datos(cliente, items, resultado.folio, pedido.id_pedido)
+                futuro = pool.enviar(cotizacion.renderizar_tex(datos))
+            except Exception as e:
+                resultado.error = f"Error al renderizar: {e}"
+                continue
+            pendientes[futuro] = (resultado, pedido, time.perf_counter())
+
+        for futuro in as_completed(pendientes):
+            resultado, pedido, enviado = pendientes[futuro]
+            try:
+                resultado.pdf_path = cotizacion.publicar_pdf(
+                    resultado.folio, futuro.result(), pedido.id_pedido, pedido.nombre_cliente
+                )
+            except compilador.ErrorCompilacion as e:
+                resultado.error = f"{e}\n{e.stderr}".strip()
+            except Exception as e:
+                resultado.error = f"{type(e).__name__}: {e}"
+            resultado.segundos = time.perf_counter() - enviado
+
+    resumen.segundos = time.perf_counter() - inicio
+    return resumen
+
+
+# =======================
+# Uso por línea de comandos
+# =======================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-emitir cotizaciones de pedidos.csv en lote")
+    parser.add_argument("ids", nargs="*", help="id_pedido a re-emitir (vacío = todos los que pasen los filtros)")
+    parser.add_argument("--estado", choices=["cotizacion", "confirmado", "recogido"])
+    parser.add_argument("--desde", type=_fecha, help="fecha_evento mínima (dd-mm-aaaa)")
+    parser.add_argument("--hasta", type=_fecha, help="fecha_evento máxima (dd-mm-aaaa)")
+    parser.add_argument("--workers", type=int, default=None, help="workers de tectonic en paralelo")
+    args = parser.parse_args(argv)
+
+    pedidos = seleccionar_pedidos(args.ids, args.estado, args.desde, args.hasta)
+    if not pedidos:
+        print("[INFO] Ningún pedido coincide con los filtros")
+        return 0
+
+    print(f"[INFO] Generando {len(pedidos)} cotizaciones...")
+    resumen = generar_lote(pedidos, workers=args.workers)
+
+    for r in resumen.resultados:
+        if r.error:
+            print(f"[ERROR] {r.id_pedido} ({r.folio or 'sin folio'}): {r.error}")
+        else:
+            print(f"[OK] {r.id_pedido} -> {r.pdf_path} ({r.segundos:.2f}s)")
+
+    print(
+        f"[INFO] {len(resumen.exitosos)} generadas, {len(resumen.fallidos)} con error "
+        f"en {resumen.segundos:.2f}s ({resumen.por_segundo:.2f} cotizaciones/s)"
+    )
+    if resumen.folios_sin_usar:
+        print(f"[INFO] Folios reservados sin PDF: {', '.join(resumen.folios_sin_usar)}")
+    return 1 if resumen.fallidos else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
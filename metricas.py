@@ -0,0 +1,157 @@
+import atexit
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+import persistencia
+
+METRICAS_FILE = os.environ.get("METRICAS_FILE", "metricas.jsonl")
+
+# "0" apaga la instrumentación (medir() queda en un perf_counter y nada más)
+ACTIVAS = os.environ.get("METRICAS_ACTIVAS", "1") != "0"
+
+# Se escribe en bloque cada tantas mediciones o cada tantos segundos
+LOTE = 50
+CADA_SEGUNDOS = 2.0
+
+# Al pasar este tamaño el archivo se rota a metricas.jsonl.1 (se conserva una copia)
+MAX_BYTES = int(os.environ.get("METRICAS_MAX_MB", "20")) * 1024 * 1024
+
+PERCENTILES = (50, 95, 99)
+
+# Etapas del flujo de una cotización, en el orden en que ocurren
+ETAPAS = [
+    "csv_items",        # ui: leer items.csv
+    "clientes",         # ui: cargar / buscar clientes
+    "guardar_pedido",   # historial.guardar_pedido
+    "espera",           # tiempo en la cola de generación
+    "cache",            # clave + consulta de cache_pdf
+    "folio",            # reservar el folio (bloqueo de folio.txt)
+    "render",           # plantilla Jinja2
+    "compilar",         # tectonic
+    "publicar",         # mover el PDF al archivo de pdfs/
+    "total",            # de encolar a PDF listo
+    "pdf_ui",           # ui: preparar el PDF para el visor
+]
+
+
+# =======================
+# Registro
+# =======================
+class Registro:
+    """
+    Mediciones en memoria que se anexan a METRICAS_FILE como líneas JSON
+    {"t": epoch, "etapa": ..., "ms": ..., "pid": ..., etiquetas...}.
+    Se escribe en bloque (un write con O_APPEND cada LOTE mediciones o
+    CADA_SEGUNDOS), así medir una etapa no agrega E/S al camino crítico;
+    varios procesos pueden anexar al mismo archivo sin mezclar líneas.
+    """
+
+    def __init__(self, file=METRICAS_FILE):
+        self.file = file
+        self._lock = threading.Lock()
+        self._pendientes = []
+        self._ultimo = time.monotonic()
+
+    def registrar(self, etapa, segundos, **etiquetas):
+        linea = {"t": round(time.time(), 3), "etapa": etapa, "ms": round(segundos * 1000, 3), "pid": os.getpid()}
+        linea.update(etiquetas)
+        with self._lock:
+            self._pendientes.append(json.dumps(linea, ensure_ascii=False))
+            if len(self._pendientes) < LOTE and time.monotonic() - self._ultimo < CADA_SEGUNDOS:
+                return
+            lineas, self._pendientes = self._pendientes, []
+            self._ultimo = time.monotonic()
+        self._escribir(lineas)
+
+    def vaciar(self):
+        with self._lock:
+            lineas, self._pendientes = self._pendientes, []
+            self._ultimo = time.monotonic()
+        self._escribir(lineas)
+
+    def _escribir(self, lineas):
+        if not lineas:
+            return
+        try:
+            if os.path.exists(self.file) and os.path.getsize(self.file) > MAX_BYTES:
+                # Con bloqueo y volviendo a medir: si dos procesos rotan a la
+                # vez, el segundo no debe pisar la copia .1 con el archivo nuevo
+                with persistencia.bloqueo(self.file):
+                    if os.path.exists(self.file) and os.path.getsize(self.file) > MAX_BYTES:
+                        os.replace(self.file, self.file + ".1")
+            with open(self.file, "a", encoding="utf-8") as f:
+                f.write("\n".join(lineas) + "\n")
+        except OSError:
+            pass   # las métricas nunca tumban una cotización
+
+
+_registro = Registro()
+atexit.register(_registro.vaciar)
+
+
+def registrar(etapa, segundos, **etiquetas):
+    if ACTIVAS:
+        _registro.registrar(etapa, segundos, **etiquetas)
+
+
+def vaciar():
+    _registro.vaciar()
+
+
+@contextmanager
+def medir(etapa, **etiquetas):
+    """with medir("compilar"): ...  -> una línea en METRICAS_FILE con los ms de la etapa."""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        registrar(etapa, time.perf_counter() - inicio, **etiquetas)
+
+
+# =======================
+# Lectura y percentiles
+# =======================
+def leer(file=METRICAS_FILE, desde=None):
+    """Mediciones del archivo (y de su rotación .1), opcionalmente desde un epoch."""
+    registros = []
+    for path in (file + ".1", file):
+        if not os.path.exists(path):
+            continue
+        with open(path, encoding="utf-8") as f:
+            for linea in f:
+                try:
+                    registro = json.loads(linea)
+                except ValueError:
+                    continue   # línea cortada por un proceso que murió escribiendo
+                if desde is None or registro.get("t", 0) >= desde:
+                    registros.append(registro)
+    return registros
+
+
+def resumen(registros):
+    """
+    {etapa: {n, p50, p95, p99, max, promedio}} en milisegundos.
+    Las etapas conocidas van en el orden del flujo; las demás al final.
+    """
+    import numpy as np   # sólo la página de métricas lo necesita
+
+    por_etapa = defaultdict(list)
+    for r in registros:
+        por_etapa[r["etapa"]].append(r["ms"])
+
+    orden = [e for e in ETAPAS if e in por_etapa] + sorted(e for e in por_etapa if e not in ETAPAS)
+    resultado = {}
+    for etapa in orden:
+        valores = np.asarray(por_etapa[etapa], dtype=np.float64)
+        p = np.percentile(valores, PERCENTILES)
+        resultado[etapa] = {
+            "n": len(valores),
+            **{f"p{q}": float(v) for q, v in zip(PERCENTILES, p)},
+            "max": float(valores.max()),
+            "promedio": float(valores.mean())
+        }
+    return resultado
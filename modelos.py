@@ -0,0 +1,452 @@
+import datetime
+import json
+from array import array
+from dataclasses import dataclass, field, replace
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+FORMATO_FECHA = "%d-%m-%Y"
+FORMATO_FECHA_HORA = "%d-%m-%Y %H:%M:%S"
+
+ESTADOS = ["cotizacion", "confirmado", "recogido"]
+
+
+# =======================
+# Dinero en centavos (enteros: sin errores de redondeo al sumar)
+# =======================
+def a_centavos(valor):
+    """'420.00', '100.0', 99.5 o Decimal -> centavos (int). Inválido -> 0."""
+    try:
+        return int((Decimal(str(valor)) * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+    except (InvalidOperation, ValueError, TypeError):
+        return 0
+
+
+def formatear_centavos(centavos):
+    """42000 -> '420.00'"""
+    signo = "-" if centavos < 0 else ""
+    centavos = abs(centavos)
+    return f"{signo}{centavos // 100}.{centavos % 100:02d}"
+
+
+# =======================
+# Fechas dd-mm-aaaa
+# =======================
+def parse_fecha(texto):
+    """
+    'dd-mm-aaaa' -> date; None si no es válida.
+    El caso normal se corta a mano (strptime es ~10x más lento); también
+    acepta espacios alrededor, día/mes de un dígito y '/' como separador
+    ('5-9-2025', '05/09/2025'), que aparecen en filas capturadas a mano.
+    """
+    try:
+        if len(texto) == 10 and texto[2] == "-" and texto[5] == "-":
+            return datetime.date(int(texto[6:10]), int(texto[3:5]), int(texto[0:2]))
+        partes = texto.strip().replace("/", "-").split("-")
+        if len(partes) != 3 or len(partes[2]) != 4:
+            return None
+        dia, mes, anio = (int(x) for x in partes)
+        return datetime.date(anio, mes, dia)
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+def parse_fecha_hora(texto):
+    """'dd-mm-aaaa HH:MM:SS' -> datetime; None si no es válida."""
+    try:
+        if len(texto) != 19 or texto[2] != "-" or texto[5] != "-":
+            return None
+        return datetime.datetime(
+            int(texto[6:10]), int(texto[3:5]), int(texto[0:2]),
+            int(texto[11:13]), int(texto[14:16]), int(texto[17:19])
+        )
+    except (TypeError, ValueError):
+        return None
+
+
+# Nombres fijos: no dependen del locale del servidor
+MESES = [
+    "enero", "febrero", "marzo", "abril", "mayo", "junio",
+    "julio", "agosto", "septiembre", "octubre", "noviembre", "diciembre"
+]
+
+
+def nombre_mes(fecha):
+    """date(2025, 9, 1) -> 'Septiembre 2025'"""
+    return f"{MESES[fecha.month - 1].capitalize()} {fecha.year}"
+
+
+# =======================
+# Modelos
+# =======================
+@dataclass(frozen=True, slots=True)
+class Item:
+    descripcion: str
+    cantidad: int
+    precio_centavos: int
+    id_producto: str = ""
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(
+            descripcion=d.get("descripcion", ""),
+            cantidad=int(float(d.get("cantidad") or 0)),
+            precio_centavos=a_centavos(d.get("precio_unitario") or 0)
+        )
+
+    def to_dict(self):
+        """Mismo formato de siempre en el JSON de pedidos.csv (valores como texto)."""
+        return {
+            "descripcion": self.descripcion,
+            "cantidad": str(self.cantidad),
+            "precio_unitario": formatear_centavos(self.precio_centavos)
+        }
+
+    @property
+    def precio_unitario(self):
+        return Decimal(self.precio_centavos) / 100
+
+    @property
+    def importe_centavos(self):
+        return self.cantidad * self.precio_centavos
+
+
+@dataclass(frozen=True, slots=True)
+class Producto:
+    id: str
+    descripcion: str
+    precio_centavos: int
+    activo: bool = True
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(
+            id=row["id"],
+            descripcion=row.get("descripcion") or "",
+            precio_centavos=a_centavos(row.get("precio") or 0),
+            activo=(row.get("activo") or "1") != "0"
+        )
+
+    def to_row(self):
+        return {
+            "id": self.id,
+            "descripcion": self.descripcion,
+            "precio": formatear_centavos(self.precio_centavos),
+            "activo": "1" if self.activo else "0"
+        }
+
+
+@dataclass(frozen=True, slots=True)
+class EntradaPDF:
+    """Fila del índice de PDFs (pdfs/indice.csv). `ruta` es relativa a pdfs/."""
+    folio: str
+    id_pedido: str
+    cliente: str
+    fecha: datetime.date
+    ruta: str
+    bytes: int
+    sha256: str
+    comprimido: bool = False
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(
+            folio=row["folio"],
+            id_pedido=row.get("id_pedido") or "",
+            cliente=row.get("cliente") or "",
+            fecha=parse_fecha(row.get("fecha") or "") or datetime.date.min,
+            ruta=row.get("ruta") or "",
+            bytes=int(row.get("bytes") or 0),
+            sha256=row.get("sha256") or "",
+            comprimido=(row.get("comprimido") or "0") == "1"
+        )
+
+    def to_row(self):
+        return {
+            "folio": self.folio,
+            "id_pedido": self.id_pedido,
+            "cliente": self.cliente,
+            "fecha": self.fecha.strftime(FORMATO_FECHA),
+            "ruta": self.ruta,
+            "bytes": str(self.bytes),
+            "sha256": self.sha256,
+            "comprimido": "1" if self.comprimido else "0"
+        }
+
+
+ESTADOS_TRABAJO = ["pendiente", "en_proceso", "listo", "error"]
+
+
+# Columna de cola_pdf.csv -> valor del campo de TrabajoPDF
+_LECTORES_TRABAJO = {
+    "estado": lambda v: v or "pendiente",
+    "creado": lambda v: float(v or 0),
+    "id_pedido": lambda v: v or "",
+    "datos": lambda v: json.loads(v or "{}"),
+    "folio": lambda v: v or "",
+    "pdf_path": lambda v: v or "",
+    "error": lambda v: v or "",
+    "tiempos": lambda v: json.loads(v or "{}"),
+    "desde_cache": lambda v: v == "1",
+    "proceso": lambda v: v or "",
+}
+
+
+@dataclass(frozen=True, slots=True)
+class TrabajoPDF:
+    """
+    Trabajo de la cola de generación (cola_pdf.csv).
+    - creado: segundos epoch (para medir la espera en cola)
+    - datos: {"cliente": {...}, "items": [...]} tal como los recibe render_quote
+    - tiempos: segundos por etapa (espera, cache, render, compilar, publicar, total)
+    - proceso: pid que lo está generando (para recuperar trabajos de un proceso caído)
+    """
+    id: str
+    estado: str
+    creado: float
+    id_pedido: str
+    datos: dict
+    folio: str = ""
+    pdf_path: str = ""
+    error: str = ""
+    tiempos: dict = field(default_factory=dict)
+    desde_cache: bool = False
+    proceso: str = ""
+
+    @property
+    def terminado(self):
+        return self.estado in ("listo", "error")
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(id=row["id"], **{campo: leer(row.get(campo)) for campo, leer in _LECTORES_TRABAJO.items()})
+
+    def con_fila(self, fila):
+        """Trabajo con las columnas de `fila` (parcial, como en el diario) aplicadas; el resto no se toca."""
+        return replace(self, **{campo: _LECTORES_TRABAJO[campo](valor)
+                                for campo, valor in fila.items() if campo in _LECTORES_TRABAJO})
+
+    def to_row(self, campos=None):
+        """Fila de cola_pdf.csv; con `campos`, sólo el id y esas columnas (datos no se serializa si no se pide)."""
+        fila = {
+            "id": self.id,
+            "estado": self.estado,
+            "creado": f"{self.creado:.3f}",
+            "id_pedido": self.id_pedido,
+            "folio": self.folio,
+            "pdf_path": self.pdf_path,
+            "error": self.error,
+            "tiempos": json.dumps({k: round(v, 4) for k, v in self.tiempos.items()}),
+            "desde_cache": "1" if self.desde_cache else "0",
+            "proceso": self.proceso
+        }
+        if campos is None or "datos" in campos:
+            fila["datos"] = json.dumps(self.datos, ensure_ascii=False)
+        if campos is None:
+            return fila
+        return {campo: fila[campo] for campo in ("id", *campos)}
+
+
+# ---------------------------
+# Columna `items` de pedidos.csv
+# ---------------------------
+# Dos formatos:
+# - JSON (pedidos viejos): [{"descripcion": ..., "cantidad": ..., "precio_unitario": ...}]
+# - compacto con ids del catálogo: "id:cantidad@centavos;id:cantidad@centavos"
+def items_a_json(items):
+    return json.dumps([it.to_dict() for it in items], ensure_ascii=False)
+
+
+def decodificar_items(texto):
+    """Texto de la columna items -> [Item]. El formato compacto se resuelve con el catálogo."""
+    if not texto or texto.lstrip().startswith("["):
+        return [Item.from_dict(d) for d in json.loads(texto or "[]")]
+    import catalogo  # sólo hace falta con el formato compacto (y catalogo importa este módulo)
+    return catalogo.obtener_catalogo().decodificar(texto)
+
+
+@dataclass(frozen=True, slots=True)
+class Order:
+    """
+    Pedido de pedidos.csv ya tipado: fechas parseadas, total en centavos y
+    los ítems decodificados una sola vez (la primera vez que se piden).
+    Es inmutable: un cambio de estado produce un Order nuevo (con_estado).
+    """
+    id_pedido: str
+    fecha_creacion: datetime.datetime
+    id_cliente: str
+    nombre_cliente: str
+    fecha_evento: datetime.date
+    items_texto: str
+    total_centavos: int
+    estado: str = "cotizacion"
+    version: int = 0
+    _items: list = field(default=None, repr=False, compare=False)
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(
+            id_pedido=row["id_pedido"],
+            fecha_creacion=parse_fecha_hora(row.get("fecha_creacion")),
+            id_cliente=row.get("id_cliente") or "",
+            nombre_cliente=row.get("nombre_cliente") or "",
+            fecha_evento=parse_fecha(row.get("fecha_evento")),
+            items_texto=row.get("items") or "[]",
+            total_centavos=a_centavos(row.get("total") or 0),
+            estado=row.get("estado") or "cotizacion",
+            version=int(row.get("version") or 0)
+        )
+
+    @classmethod
+    def nuevo(cls, id_pedido, cliente, items, creado=None, codificar=None):
+        """
+        Pedido nuevo a partir de un cliente (dict) y sus ítems (dicts o Item).
+        - codificar: función(items) -> texto de la columna items
+          (p. ej. catalogo.Catalogo.codificar); por defecto JSON
+        """
+        items = [it if isinstance(it, Item) else Item.from_dict(it) for it in items]
+        return cls(
+            id_pedido=id_pedido,
+            fecha_creacion=(creado or datetime.datetime.now()).replace(microsecond=0),
+            id_cliente=cliente.get("id", ""),
+            nombre_cliente=cliente.get("cliente", ""),
+            fecha_evento=parse_fecha(cliente.get("fecha_evento", "")),
+            items_texto=(codificar or items_a_json)(items),
+            total_centavos=sum(it.importe_centavos for it in items),
+            _items=items
+        )
+
+    def to_row(self):
+        return {
+            "id_pedido": self.id_pedido,
+            "fecha_creacion": self.texto_fecha_creacion,
+            "id_cliente": self.id_cliente,
+            "nombre_cliente": self.nombre_cliente,
+            "fecha_evento": self.texto_fecha_evento,
+            "items": self.items_texto,
+            "total": self.texto_total,
+            "estado": self.estado,
+            "version": str(self.version)
+        }
+
+    def con_estado(self, estado, version):
+        return replace(self, estado=estado, version=version, _items=self._items)
+
+    @property
+    def items(self):
+        """Lista de Item (decodificada una vez); None si el texto guardado no es válido."""
+        if self._items is None:
+            try:
+                items = decodificar_items(self.items_texto)
+            except (TypeError, ValueError, AttributeError, KeyError):
+                items = False
+            object.__setattr__(self, "_items", items)
+        return self._items if self._items is not False else None
+
+    @property
+    def total(self):
+        return Decimal(self.total_centavos) / 100
+
+    @property
+    def texto_total(self):
+        return formatear_centavos(self.total_centavos)
+
+    @property
+    def texto_fecha_evento(self):
+        return self.fecha_evento.strftime(FORMATO_FECHA) if self.fecha_evento else ""
+
+    @property
+    def texto_fecha_creacion(self):
+        return self.fecha_creacion.strftime(FORMATO_FECHA_HORA) if self.fecha_creacion else ""
+
+
+# =======================
+# Representación columnar para agregaciones
+# =======================
+class ColumnasPedidos:
+    """
+    Pedidos en columnas de `array` (8 bytes por valor en vez de un objeto):
+    - evento:  ordinal de fecha_evento (0 si no tiene)
+    - total:   centavos
+    - estado:  índice en ESTADOS
+    - cliente: índice en la lista `clientes`
+    y sus ítems en columnas aparte (fila del pedido, índice en `descripciones`,
+    cantidad, importe en centavos).
+    Pensado para sumar/agrupar muchos pedidos (y para pasarlo a NumPy).
+    agregar() con un id ya cargado sólo actualiza sus columnas: los ítems de
+    un pedido no cambian después de guardarlo.
+    """
+
+    def __init__(self):
+        self.ids = []
+        self.evento = array("q")
+        self.total = array("q")
+        self.estado = array("b")
+        self.cliente = array("l")
+        self.clientes = []
+        self._cliente_idx = {}
+        self._fila = {}
+
+        self.item_fila = array("l")
+        self.item_codigo = array("l")
+        self.item_cantidad = array("q")
+        self.item_importe = array("q")
+        self.descripciones = []
+        self._descripcion_idx = {}
+
+    @classmethod
+    def desde(cls, pedidos):
+        columnas = cls()
+        for pedido in pedidos:
+            columnas.agregar(pedido)
+        return columnas
+
+    def __len__(self):
+        return len(self.ids)
+
+    @staticmethod
+    def _codigo(valor, lista, indice):
+        idx = indice.get(valor)
+        if idx is None:
+            idx = indice[valor] = len(lista)
+            lista.append(valor)
+        return idx
+
+    def agregar(self, pedido):
+        evento = pedido.fecha_evento.toordinal() if pedido.fecha_evento else 0
+        estado = ESTADOS.index(pedido.estado) if pedido.estado in ESTADOS else -1
+        cliente = self._codigo(pedido.nombre_cliente, self.clientes, self._cliente_idx)
+
+        fila = self._fila.get(pedido.id_pedido)
+        if fila is not None:
+            self.evento[fila] = evento
+            self.total[fila] = pedido.total_centavos
+            self.estado[fila] = estado
+            self.cliente[fila] = cliente
+            return
+
+        fila = self._fila[pedido.id_pedido] = len(self.ids)
+        self.ids.append(pedido.id_pedido)
+        self.evento.append(evento)
+        self.total.append(pedido.total_centavos)
+        self.estado.append(estado)
+        self.cliente.append(cliente)
+
+        for item in pedido.items or []:
+            self.item_fila.append(fila)
+            self.item_codigo.append(self._codigo(item.descripcion, self.descripciones, self._descripcion_idx))
+            self.item_cantidad.append(item.cantidad)
+            self.item_importe.append(item.importe_centavos)
+
+    def totales_por_mes(self, estados=("confirmado", "recogido"), antes_de=None):
+        """{(año, mes): (centavos, cantidad)} de los pedidos en `estados` con evento antes de `antes_de`."""
+        codigos = {ESTADOS.index(e) for e in estados}
+        limite = antes_de.toordinal() if antes_de else None
+        resultado = {}
+        for evento, total, estado in zip(self.evento, self.total, self.estado):
+            if not evento or estado not in codigos or (limite is not None and evento >= limite):
+                continue
+            fecha = datetime.date.fromordinal(evento)
+            mes = (fecha.year, fecha.month)
+            centavos, cantidad = resultado.get(mes, (0, 0))
+            resultado[mes] = (centavos + total, cantidad + 1)
+        return resultado
@@ -0,0 +1,277 @@
+import csv
+import io
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+# =======================
+# Bloqueo de archivos (advisory)
+# =======================
+@contextmanager
+def bloqueo(file):
+    """
+    Bloqueo exclusivo entre procesos sobre `file`.
+    Se bloquea un archivo hermano `<file>.lock` para que el archivo real
+    se pueda reemplazar con os.replace mientras se tiene el bloqueo.
+    """
+    lock_path = f"{file}.lock"
+    directorio = os.path.dirname(lock_path)
+    if directorio:
+        os.makedirs(directorio, exist_ok=True)
+
+    with open(lock_path, "a+") as lock:
+        if fcntl:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+        else:
+            lock.seek(0)
+            msvcrt.locking(lock.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+            else:
+                lock.seek(0)
+                msvcrt.locking(lock.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+# =======================
+# Escritura atómica
+# =======================
+def escribir_atomico(file, contenido, modo="w", encoding="utf-8", newline=None):
+    """
+    Escribe en un temporal del mismo directorio y lo renombra sobre `file`.
+    Un lector ve el archivo viejo o el nuevo completo, nunca uno a medias.
+    """
+    directorio = os.path.dirname(os.path.abspath(file))
+    os.makedirs(directorio, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(dir=directorio, prefix=f".{os.path.basename(file)}.", suffix=".tmp")
+    try:
+        if "b" in modo:
+            f = os.fdopen(fd, modo)
+        else:
+            f = os.fdopen(fd, modo, encoding=encoding, newline=newline)
+        with f:
+            f.write(contenido)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, file)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+# =======================
+# CSV base + diario de cambios
+# =======================
+def csv_a_texto(filas, campos):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=campos, extrasaction="ignore")
+    writer.writeheader()
+    writer.writerows(filas)
+    return buffer.getvalue()
+
+
+def _leer_cola(file, offset):
+    """Lee desde `offset` hasta el último salto de línea completo."""
+    with open(file, "rb") as f:
+        f.seek(offset)
+        datos = f.read()
+    fin = datos.rfind(b"\n") + 1
+    return datos[:fin].decode("utf-8"), offset + fin
+
+
+class CSVConDiario:
+    """
+    Base para almacenes de sólo-anexar sobre un CSV.
+    - Un registro nuevo es una fila anexada al CSV.
+    - Una modificación es una línea JSON anexada a `<archivo>.log`.
+    - Cada `compactar_cada` cambios el diario se aplica sobre el CSV
+      (reescritura atómica) y se vacía.
+    La lectura es incremental: con (inodo, tamaño, mtime) se decide si no
+    hay nada nuevo, si sólo hay que leer lo anexado o si hay que recargar.
+
+    Las subclases definen CAMPOS y los ganchos _vaciar, _cargar_fila,
+    _aplicar y _filas.
+    """
+
+    CAMPOS = []
+
+    def __init__(self, file, compactar_cada=1000):
+        self.file = file
+        self.journal = os.path.splitext(file)[0] + ".log"
+        self.compactar_cada = compactar_cada
+        self._lock = threading.RLock()
+        self._preparar()
+        self._reiniciar()
+
+    # ---------------------------
+    # Ganchos
+    # ---------------------------
+    def _preparar(self):
+        """Crea el CSV si no existe (las subclases pueden migrar aquí)."""
+        with bloqueo(self.file):
+            if not os.path.exists(self.file):
+                escribir_atomico(self.file, csv_a_texto([], self.CAMPOS), newline="")
+
+    def _vaciar(self):
+        raise NotImplementedError
+
+    def _cargar_fila(self, fila):
+        raise NotImplementedError
+
+    def _aplicar(self, cambio):
+        raise NotImplementedError
+
+    def _filas(self):
+        raise NotImplementedError
+
+    # ---------------------------
+    # Lectura incremental
+    # ---------------------------
+    def _reiniciar(self):
+        self._campos = None
+        self._pos_csv = (None, 0, None)
+        self._pos_log = (None, 0, None)
+        self._cambios_log = 0
+        self._vaciar()
+
+    @staticmethod
+    def _hay_que_recargar(st, posicion):
+        ino, offset, mtime = posicion
+        if ino is None:
+            return False
+        if ino != st.st_ino or st.st_size < offset:
+            return True
+        # Mismo tamaño pero otra mtime: alguien lo editó en su lugar
+        return st.st_size == offset and st.st_mtime_ns != mtime
+
+    def _sincronizar(self):
+        with self._lock:
+            st_csv = os.stat(self.file)
+            if self._hay_que_recargar(st_csv, self._pos_csv):
+                self._reiniciar()
+
+            offset_csv = self._pos_csv[1]
+            if st_csv.st_size > offset_csv:
+                texto, offset_csv = _leer_cola(self.file, offset_csv)
+                filas = csv.reader(io.StringIO(texto, newline=""))
+                if self._campos is None:
+                    self._campos = next(filas, None) or self.CAMPOS
+                for fila in filas:
+                    if fila:
+                        self._cargar_fila(dict(zip(self._campos, fila)))
+            self._pos_csv = (st_csv.st_ino, offset_csv, st_csv.st_mtime_ns)
+
+            if not os.path.exists(self.journal):
+                return
+            st_log = os.stat(self.journal)
+            if self._hay_que_recargar(st_log, self._pos_log):
+                # Otro proceso compactó: el diario se vació
+                self._reiniciar()
+                return self._sincronizar()
+
+            offset_log = self._pos_log[1]
+            if st_log.st_size > offset_log:
+                texto, offset_log = _leer_cola(self.journal, offset_log)
+                for linea in texto.splitlines():
+                    if linea.strip():
+                        self._aplicar(json.loads(linea))
+                        self._cambios_log += 1
+            self._pos_log = (st_log.st_ino, offset_log, st_log.st_mtime_ns)
+
+    # ---------------------------
+    # Escritura (llamar con bloqueo(self.file) tomado)
+    # ---------------------------
+    def _anexar_fila(self, fila):
+        buffer = io.StringIO()
+        csv.DictWriter(buffer, fieldnames=self._campos or self.CAMPOS, extrasaction="ignore").writerow(fila)
+        _anexar(self.file, buffer.getvalue())
+
+    def _anexar_cambio(self, cambio):
+        _anexar(self.journal, json.dumps(cambio, ensure_ascii=False) + "\n")
+        self._sincronizar()
+        if self._cambios_log >= self.compactar_cada:
+            self._compactar()
+
+    def compactar(self):
+        with bloqueo(self.file):
+            self._sincronizar()
+            self._compactar()
+
+    def _compactar(self):
+        # Orden importante: primero el csv nuevo, después vaciar el diario.
+        # Los cambios del diario son absolutos: re-aplicarlos es inofensivo.
+        # Todo con el lock del proceso: otro hilo no debe ver el diario vacío
+        # con el estado en memoria todavía sin recargar.
+        with self._lock:
+            escribir_atomico(self.file, csv_a_texto(self._filas(), self._campos or self.CAMPOS), newline="")
+            escribir_atomico(self.journal, "")
+            self._reiniciar()
+            self._sincronizar()
+
+
+def _anexar(file, texto):
+    with open(file, "a", newline="", encoding="utf-8") as f:
+        f.write(texto)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+# =======================
+# CSV chicos que se reescriben enteros (items.csv, inventario.csv...)
+# =======================
+def _leer_texto(file):
+    try:
+        with open(file, newline="", encoding="utf-8") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def leer_csv(file):
+    """
+    Filas de `file` como dicts ([] si no existe), de una sola lectura.
+    Como todos los escritores reemplazan el archivo con os.replace, lo
+    leído es una versión completa (la anterior o la nueva), sin bloqueo.
+    """
+    texto = _leer_texto(file)
+    return list(csv.DictReader(io.StringIO(texto))) if texto else []
+
+
+def escribir_csv(file, filas, campos):
+    """
+    Reescribe `file` con bloqueo y reemplazo atómico, sólo si el contenido
+    cambió. Devuelve si lo escribió.
+    """
+    contenido = csv_a_texto(filas, campos)
+    with bloqueo(file):
+        if _leer_texto(file) == contenido:
+            return False
+        escribir_atomico(file, contenido, newline="")
+    return True
+
+
+def actualizar_csv(file, campos, funcion):
+    """
+    Leer-modificar-escribir con el bloqueo tomado: `funcion(filas)` recibe
+    las filas actuales y devuelve las nuevas. Dos procesos que actualizan
+    a la vez no se pisan: el segundo parte de lo que escribió el primero.
+    """
+    with bloqueo(file):
+        filas = funcion(leer_csv(file))
+        contenido = csv_a_texto(filas, campos)
+        if _leer_texto(file) != contenido:
+            escribir_atomico(file, contenido, newline="")
+    return filas
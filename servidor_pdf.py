@@ -0,0 +1,231 @@
+import base64
+import gzip
+import hashlib
+import os
+import re
+import shutil
+import threading
+from collections import OrderedDict
+
+# Carpeta que Streamlit sirve tal cual en <base>/app/static/ (server.enableStaticServing)
+ESTATICO_DIR = "static"
+RUTA_ESTATICA = "app/static"
+
+# Memoria máxima para PDFs leídos; al pasarla se sueltan los menos usados (LRU)
+MAX_BYTES = int(os.environ.get("SERVIDOR_PDF_MAX_MB", "32")) * 1024 * 1024
+# Espacio máximo de static/pdfs/; al pasarlo se borran los menos usados (LRU)
+MAX_BYTES_ESTATICO = int(os.environ.get("SERVIDOR_PDF_ESTATICO_MB", "256")) * 1024 * 1024
+# Nombres en static/pdfs/: sha256 del contenido (no se adivinan a partir del folio)
+NOMBRE_ESTATICO = re.compile(r"^[0-9a-f]{64}\.pdf$")
+# Cuántos sha256 de PDFs (por ruta y versión) se recuerdan
+MAX_RESUMENES = 10_000
+
+
+def _firma(path):
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+# =======================
+# LRU por tamaño
+# =======================
+class LRU:
+    """
+    Entradas con su tamaño en bytes; al pasar max_bytes se sueltan las
+    menos usadas, avisando a al_soltar(clave, valor) (p. ej. para borrar
+    el archivo).
+    """
+
+    def __init__(self, max_bytes, al_soltar=None):
+        self.max_bytes = max_bytes
+        self.al_soltar = al_soltar
+        self._lock = threading.Lock()
+        self._entradas = OrderedDict()   # clave -> (valor, tamaño)
+        self._bytes = 0
+
+    def get(self, clave):
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None:
+                return None
+            self._entradas.move_to_end(clave)
+            return entrada[0]
+
+    def poner(self, clave, valor, tamano):
+        soltados = []
+        with self._lock:
+            anterior = self._entradas.pop(clave, None)
+            if anterior is not None:
+                self._bytes -= anterior[1]
+                soltados.append((clave, anterior[0]))
+            if tamano <= self.max_bytes:
+                self._entradas[clave] = (valor, tamano)
+                self._bytes += tamano
+            while self._bytes > self.max_bytes:
+                viejo, (valor_viejo, tamano_viejo) = self._entradas.popitem(last=False)
+                self._bytes -= tamano_viejo
+                soltados.append((viejo, valor_viejo))
+        if self.al_soltar:
+            for clave_soltada, valor_soltado in soltados:
+                if valor_soltado != valor:
+                    self.al_soltar(clave_soltada, valor_soltado)
+
+    def __len__(self):
+        return len(self._entradas)
+
+
+# =======================
+# Lecturas en caché
+# =======================
+class CacheLecturas:
+    """
+    Bytes de los PDFs leídos, por ruta y validados con (mtime, tamaño):
+    un rerun de Streamlit no vuelve a leer el archivo, y si el PDF se
+    regenera con el mismo nombre la firma cambia y se lee otra vez.
+    """
+
+    def __init__(self, max_bytes=MAX_BYTES):
+        self._lru = LRU(max_bytes)
+
+    def leer(self, path):
+        firma = _firma(path)
+        entrada = self._lru.get(path)
+        if entrada is not None and entrada[0] == firma:
+            return entrada[1]
+
+        with open(path, "rb") as f:
+            datos = f.read()
+        if path.endswith(".gz"):   # PDF del archivo frío (archivo_pdf.archivar)
+            datos = gzip.decompress(datos)
+
+        self._lru.poner(path, (firma, datos), len(datos))
+        return datos
+
+    def __len__(self):
+        return len(self._lru)
+
+
+_cache = CacheLecturas()
+
+
+def leer(path):
+    return _cache.leer(path)
+
+
+def nombre(path):
+    """Nombre de descarga: 'pdfs/2025/09/COT-042.pdf.gz' -> 'COT-042.pdf'."""
+    base = os.path.basename(path)
+    return base[:-3] if base.endswith(".gz") else base
+
+
+def descargador(path):
+    """Callable para st.download_button: los bytes se leen sólo al hacer clic."""
+    return lambda: leer(path)
+
+
+# =======================
+# Ruta estática
+# =======================
+class CarpetaEstatica:
+    """
+    static/pdfs/ acotada: lo publicado entra a un LRU por tamaño y al pasar
+    max_bytes se borran los archivos menos usados. Lo que ya estaba en la
+    carpeta (de corridas anteriores) entra primero, del más viejo al más
+    nuevo; los nombres que no son un sha256 (esquema anterior, con el
+    folio) se borran.
+    """
+
+    def __init__(self, directorio=ESTATICO_DIR, max_bytes=MAX_BYTES_ESTATICO):
+        self.directorio = directorio
+        self._archivos = LRU(max_bytes, al_soltar=self._borrar)   # relativa -> relativa
+        self._resumenes = LRU(MAX_RESUMENES)                      # path -> (firma, relativa)
+        self._lock = threading.Lock()
+        self._revisada = False
+
+    def _borrar(self, relativa, _):
+        try:
+            os.remove(os.path.join(self.directorio, relativa))
+        except FileNotFoundError:
+            pass
+
+    def _revisar(self):
+        carpeta = os.path.join(self.directorio, "pdfs")
+        try:
+            entradas = list(os.scandir(carpeta))
+        except FileNotFoundError:
+            return
+        existentes = []
+        for e in entradas:
+            if NOMBRE_ESTATICO.match(e.name):
+                st = e.stat()
+                existentes.append((st.st_mtime_ns, e.name, st.st_size))
+            elif e.is_file():
+                try:
+                    os.remove(e.path)
+                except FileNotFoundError:
+                    pass
+        for _, nombre_archivo, tamano in sorted(existentes):
+            relativa = os.path.join("pdfs", nombre_archivo)
+            self._archivos.poner(relativa, relativa, tamano)
+
+    def publicar(self, path):
+        """
+        Deja el PDF en static/pdfs/<sha256>.pdf (enlace duro; copia si el
+        sistema de archivos no lo permite) y devuelve la ruta relativa a
+        static/. El sha256 se calcula una vez por versión del archivo.
+        """
+        with self._lock:
+            if not self._revisada:
+                self._revisar()
+                self._revisada = True
+
+        firma = _firma(path)
+        entrada = self._resumenes.get(path)
+        if entrada is not None and entrada[0] == firma:
+            relativa = entrada[1]
+        else:
+            with open(path, "rb") as f:
+                relativa = os.path.join("pdfs", f"{hashlib.file_digest(f, 'sha256').hexdigest()}.pdf")
+            self._resumenes.poner(path, (firma, relativa), 1)
+
+        # Otro proceso pudo haberlo borrado al desalojar: se vuelve a poner
+        destino = os.path.join(self.directorio, relativa)
+        if not os.path.exists(destino):
+            os.makedirs(os.path.dirname(destino), exist_ok=True)
+            tmp = f"{destino}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                os.link(path, tmp)
+            except OSError:
+                shutil.copy2(path, tmp)
+            os.replace(tmp, destino)
+        self._archivos.poner(relativa, relativa, firma[1])
+        return relativa
+
+
+_estatica = CarpetaEstatica()
+
+
+def publicar_estatico(path):
+    return _estatica.publicar(path)
+
+
+def url(path, base_url=""):
+    """
+    URL con la que el navegador pide el PDF directamente a Streamlit.
+    None para los PDFs del archivo frío (.gz): esos se muestran con
+    iframe_base64, sin dejar copias descomprimidas en static/.
+    """
+    if path.endswith(".gz"):
+        return None
+    relativa = publicar_estatico(path).replace(os.sep, "/")
+    base = "/" + base_url.strip("/") if base_url.strip("/") else ""
+    return f"{base}/{RUTA_ESTATICA}/{relativa}"
+
+
+def iframe_base64(pdf_bytes, height=600):
+    """Visor con el PDF incrustado (data URI); sólo si no hay ruta estática."""
+    base64_pdf = base64.b64encode(pdf_bytes).decode("utf-8")
+    return f"""
+            <iframe src="data:application/pdf;base64,{base64_pdf}"
+                    width="100%" height="{height}" type="application/pdf"></iframe>
+        """
@@ -0,0 +1,30 @@
+import os
+import sys
+
+import pytest
+
+# La app no es un paquete: los módulos se importan desde la raíz del repositorio
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+
+import benchmark  # noqa: E402  (datos sintéticos, entorno aislado, tectonic de prueba)
+import metricas  # noqa: E402
+
+# Las pruebas no deben llenar metricas.jsonl de datos sintéticos
+metricas.ACTIVAS = False
+
+
+@pytest.fixture
+def entorno(monkeypatch):
+    """Directorio temporal con plantilla.tex y logo.png (benchmark.entorno_aislado); devuelve su ruta."""
+    monkeypatch.chdir(RAIZ)
+    with benchmark.entorno_aislado("prueba-") as directorio:
+        yield directorio
+
+
+@pytest.fixture
+def tectonic(entorno):
+    """Pool de compilación real con un tectonic de prueba al frente del PATH."""
+    with benchmark.tectonic_falso() as pool:
+        yield pool
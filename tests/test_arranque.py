@@ -0,0 +1,24 @@
+import os
+import pytest
+
+import almacen_pedidos
+import benchmark
+import clientes
+
+# Presupuesto de las páginas de Streamlit (user-024) con una instalación real
+# de PEDIDOS pedidos: primera corrida en un proceso nuevo y rerun (p95), en ms
+PEDIDOS = 10_000
+PRESUPUESTO_FRIO_MS = float(os.environ.get("PRUEBA_PRESUPUESTO_FRIO_MS", "1000"))
+PRESUPUESTO_RERUN_MS = float(os.environ.get("PRUEBA_PRESUPUESTO_RERUN_MS", "200"))
+RERUNS = 10
+
+
+@pytest.mark.parametrize("pagina", benchmark.PAGINAS)
+def test_arranque_dentro_del_presupuesto(entorno, pagina):
+    clientes_base = benchmark.generar_clientes_csv(clientes.CLIENTE_FILE, PEDIDOS // 10)
+    benchmark.generar_pedidos_csv(almacen_pedidos.PEDIDOS_FILE, PEDIDOS, clientes_base=clientes_base)
+
+    resultado = benchmark.medir_pagina(pagina, RERUNS)
+
+    assert resultado["frio_ms"] <= PRESUPUESTO_FRIO_MS
+    assert benchmark.medir_lista(resultado["reruns_ms"])["p95_ms"] <= PRESUPUESTO_RERUN_MS
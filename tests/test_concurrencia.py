@@ -0,0 +1,44 @@
+import os
+
+import almacen_pedidos
+import benchmark
+import clientes
+import persistencia
+
+# Escrituras por proceso (benchmark.PROCESOS procesos a la vez)
+POR_PROCESO = 50
+
+
+def test_actualizar_csv_no_pierde_escrituras(entorno):
+    """Leer-modificar-escribir con bloqueo (user-025): ninguna fila perdida, ninguna lectura a medias."""
+    file = os.path.join(entorno, "contador.csv")
+    _, fallidos, (lecturas, malas) = benchmark.en_paralelo(
+        benchmark._escritor_csv, file, POR_PROCESO, lector_campos=benchmark.CAMPOS_CONTADOR
+    )
+    filas = persistencia.leer_csv(file)
+    total = POR_PROCESO * benchmark.PROCESOS
+    assert fallidos == []
+    assert len(filas) == total
+    assert len({(f["proceso"], f["n"]) for f in filas}) == total
+    assert lecturas > 0 and malas == 0
+
+
+def test_order_store_entre_procesos(entorno):
+    """OrderStore.add + update_estado desde varios procesos, con compactaciones."""
+    file = os.path.join(entorno, almacen_pedidos.PEDIDOS_FILE)
+    almacen_pedidos.OrderStore(file)   # crea/migra el archivo antes de arrancar
+    _, fallidos, _ = benchmark.en_paralelo(benchmark._escritor_pedidos, file, POR_PROCESO)
+    pedidos = almacen_pedidos.OrderStore(file).query()
+    assert fallidos == []
+    assert len(pedidos) == POR_PROCESO * benchmark.PROCESOS
+    assert all(p.estado == "confirmado" and p.version == 1 for p in pedidos)
+
+
+def test_client_store_entre_procesos(entorno):
+    file = os.path.join(entorno, clientes.CLIENTE_FILE)
+    clientes.ClientStore(file)
+    _, fallidos, _ = benchmark.en_paralelo(benchmark._escritor_clientes, file, POR_PROCESO)
+    todos = clientes.ClientStore(file).todos()
+    assert fallidos == []
+    assert len(todos) == POR_PROCESO * benchmark.PROCESOS
+    assert all(c["direccion_entrega"].startswith("proceso ") for c in todos)
@@ -0,0 +1,43 @@
+import os
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+import archivo_pdf
+import benchmark
+import cotizacion
+
+GENERACIONES = 64
+
+
+def test_generacion_concurrente_cada_pdf_es_suyo(tectonic):
+    """
+    Decenas de cotizaciones a la vez (user-004): cada PDF trae su propio
+    folio, cliente e id de pedido, el archivado es idéntico, los folios no
+    se repiten y no quedan intermedios en los workers ni en el directorio.
+    """
+    rnd = random.Random(7)
+    pedidos = [
+        (benchmark.cliente_sintetico(rnd), benchmark.items_sinteticos(rnd, rnd.randint(1, 20)), f"PED-{i:04d}")
+        for i in range(GENERACIONES)
+    ]
+
+    def generar(pedido):
+        cliente, items, id_pedido = pedido
+        return cotizacion.render_quote(cliente, items, id_pedido, usar_cache=False)
+
+    with ThreadPoolExecutor(max_workers=benchmark.SESIONES) as sesiones:
+        resultados = list(sesiones.map(generar, pedidos))
+
+    archivo = archivo_pdf.obtener_archivo(cotizacion.PDF_DIR)
+    for (cliente, _, id_pedido), r in zip(pedidos, resultados):
+        texto = r.pdf_bytes.decode("utf-8")
+        assert f"Folio: {r.folio}" in texto
+        assert cliente["cliente"] in texto
+        assert f"Id interno: {id_pedido}" in texto
+        assert r.id_pedido == id_pedido
+        assert archivo.leer(r.folio) == r.pdf_bytes
+
+    assert len({r.folio for r in resultados}) == GENERACIONES
+    sobrantes = [n for w in tectonic._todos for n in os.listdir(w.scratch) if n.startswith("job-")]
+    assert sobrantes == []
+    assert [f for f in os.listdir(".") if f.startswith("cotizacion.")] == []
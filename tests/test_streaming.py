@@ -0,0 +1,44 @@
+import os
+import random
+import tracemalloc
+
+import benchmark
+import compilador
+import cotizacion
+
+# Pico de memoria permitido al renderizar benchmark.ITEMS_STREAM ítems en
+# streaming (la versión con lista llega a ~28 MB)
+TECHO_MB = float(os.environ.get("PRUEBA_TECHO_STREAM_MB", "4"))
+
+
+def test_render_quote_stream_50k_items(entorno, monkeypatch):
+    """
+    render_quote_stream con 50k ítems de un generador (user-023): todas las
+    líneas en la tabla, subtotal/IVA/total iguales a una suma aparte y
+    memoria acotada (tracemalloc).
+    """
+    n = benchmark.ITEMS_STREAM
+    cliente = benchmark.cliente_sintetico(random.Random(8))
+    subtotal = sum(int(it["cantidad"]) * float(it["precio_unitario"])
+                   for it in benchmark.iterar_items_sinteticos(8, n))
+    conteo = benchmark._ArchivoConteo()
+
+    def compilar(rendered_tex):
+        rendered_tex(conteo)
+        return b"%PDF-1.4\n%%EOF\n"
+
+    monkeypatch.setattr(compilador, "compilar", compilar)
+    tracemalloc.start()
+    try:
+        cotizacion.render_quote_stream(cliente, benchmark.iterar_items_sinteticos(8, n), "PED-STREAM")
+        pico_mb = tracemalloc.get_traced_memory()[1] / 2**20
+    finally:
+        tracemalloc.stop()
+
+    assert conteo.lineas_items == n
+    assert conteo.totales == {
+        "Subtotal": f"{subtotal:.2f}",
+        "IVA": f"{subtotal * 0.16:.2f}",
+        "Total": f"{subtotal + subtotal * 0.16:.2f}",
+    }
+    assert pico_mb <= TECHO_MB, f"pico {pico_mb:.2f} MB > {TECHO_MB} MB"
@@ -1,34 +1,81 @@
 import streamlit as st
-import csv
-import subprocess
 import os
 import datetime
-import uuid
-import historial 
+import json
+import time
+import clientes
+import archivo_pdf
+import catalogo
+import inventario
+import metricas
+import modelos
+import persistencia
+import servidor_pdf
 
 
 ITEMS_FILE = "items.csv"
+ITEMS_CAMPOS = ["descripcion", "cantidad", "precio_unitario"]
 CLIENTE_FILE = "cliente.csv"
+MAX_RESULTADOS = 50
+
+# Una sección a la vez: cada rerun sólo carga los datos de la sección elegida
+SECCIONES = ["🧾 Nueva cotización", "🗂️ Historial de cotizaciones", "📚 Catálogo e inventario"]
+
+# Claves (prefijos) de los widgets del formulario de "Nueva cotización" que
+# se conservan al ir a otra sección y volver
+CLAVES_FORMULARIO = ("cliente_", "desc_", "cant_", "precio_")
 
 
 # -------------------------
 # Funciones utilitarias
 # -------------------------
-def leer_csv(file, fieldnames=None):
-    if not os.path.exists(file):
-        if fieldnames:
-            with open(file, "w", newline="", encoding="utf-8") as f:
-                writer = csv.DictWriter(f, fieldnames=fieldnames)
-                writer.writeheader()
-        return []
-    with open(file, newline="", encoding="utf-8") as f:
-        return list(csv.DictReader(f))
-
-def escribir_csv(file, data, fieldnames):
-    with open(file, "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(data)
+def leer_items():
+    """
+    items.csv guardado en la sesión junto con su (mtime, tamaño):
+    un rerun no vuelve a leer el archivo si no cambió en disco.
+    """
+    try:
+        estado = os.stat(ITEMS_FILE)
+        firma = (estado.st_mtime_ns, estado.st_size)
+    except FileNotFoundError:
+        firma = None
+    guardado = st.session_state.get("items_csv")
+    if guardado is None or guardado[0] != firma:
+        with metricas.medir("csv_items"):
+            guardado = (firma, persistencia.leer_csv(ITEMS_FILE))
+        st.session_state["items_csv"] = guardado
+    return guardado[1]
+
+
+def mostrar_pdf(pdf_path, etiqueta="⬇️ Descargar PDF"):
+    """
+    Descarga + visor del PDF.
+    - el navegador pide el PDF a la ruta estática de Streamlit (sin data URI);
+      los del archivo frío (.gz) van incrustados
+    - la descarga lee el archivo sólo al hacer clic (bytes en caché por mtime)
+    """
+    st.download_button(
+        label=etiqueta,
+        data=servidor_pdf.descargador(pdf_path),
+        file_name=servidor_pdf.nombre(pdf_path),
+        mime="application/pdf"
+    )
+
+    with metricas.medir("pdf_ui"):
+        url = None
+        if st.get_option("server.enableStaticServing"):
+            url = servidor_pdf.url(pdf_path, st.get_option("server.baseUrlPath"))
+        if url:
+            st.iframe(url, height=600)
+        else:   # sin ruta estática, o PDF comprimido del archivo frío
+            import streamlit.components.v1 as components
+            components.html(servidor_pdf.iframe_base64(servidor_pdf.leer(pdf_path)), height=600)
+
+
+def valor_inicial(clave, valor):
+    """Valor por defecto de un widget con clave, sólo si la sesión todavía no tiene uno."""
+    if clave not in st.session_state:
+        st.session_state[clave] = valor
 
 
 # -------------------------
@@ -36,297 +83,386 @@ def escribir_csv(file, data, fieldnames):
 # -------------------------
 st.title("Cotizaciones")
 
+# Streamlit borra el valor de un widget que no se dibujó en el rerun (al
+# cambiar de sección). Reasignarlo lo desliga del widget y así se conserva.
+for clave in list(st.session_state):
+    if isinstance(clave, str) and clave.startswith(CLAVES_FORMULARIO):
+        st.session_state[clave] = st.session_state[clave]
+
+seccion = st.sidebar.radio("Sección", SECCIONES, key="seccion")
+
 
 # =======================
-# Sección Cliente
+# Nueva cotización: cliente, ítems y exportar
 # =======================
-st.header("📌 Datos del Cliente")
-
-# Cargar clientes (con ID incluido)
-clientes = leer_csv(
-    CLIENTE_FILE,
-    fieldnames=["id", "cliente", "direccion", "direccion_entrega", "fecha_evento", "telefono_cliente"]
-)
-
-# 🔧 Normalizar: asegurar que todos los clientes tengan un ID
-for c in clientes:
-    if not c.get("id"):  
-        c["id"] = str(uuid.uuid4())
-
-# Reescribir archivo para que quede limpio y consistente
-if clientes:
-    escribir_csv(CLIENTE_FILE, clientes, fieldnames=["id", "cliente", "direccion", "direccion_entrega", "fecha_evento", "telefono_cliente"])
-
-nombres_clientes = [c["cliente"] for c in clientes] if clientes else []
-
-# Cliente vacío por defecto
-cliente = {
-    "id": "",
-    "cliente": "",
-    "direccion": "",
-    "direccion_entrega": "",
-    "fecha_evento": "",
-    "telefono_cliente": ""
-}
-
-# Selección de modo
-modo = st.radio("¿Qué quieres hacer?", ["➕ Nuevo cliente", "✏️ Editar cliente existente"])
-
-if modo == "✏️ Editar cliente existente" and nombres_clientes:
-    # Campo de búsqueda
-    busqueda = st.text_input("🔍 Buscar cliente (nombre, teléfono o dirección)")
-
-    if busqueda:
-        resultados = [
-            c for c in clientes
-            if busqueda.lower() in c["cliente"].lower()
-            or busqueda.lower() in c["telefono_cliente"].lower()
-            or busqueda.lower() in c["direccion"].lower()
-        ]
-    else:
-        resultados = clientes
-
-    if resultados:
-        # Crear etiquetas descriptivas seguras con .get()
-        opciones = {
-            f'{c.get("cliente","")} - {c.get("telefono_cliente","")} - {c.get("direccion","")} (ID: {c.get("id","N/A")})': c
-            for c in resultados
-        }
-        seleccionado = st.selectbox("Selecciona cliente", list(opciones.keys()))
-        cliente = opciones[seleccionado]
-    else:
-        st.warning("⚠️ No se encontraron clientes con ese criterio")
+if seccion == SECCIONES[0]:
+    # =======================
+    # Sección Cliente
+    # =======================
+    st.header("📌 Datos del Cliente")
+
+    # Cargar clientes (índices en memoria; sólo se recarga si cliente.csv cambió)
+    with metricas.medir("clientes", operacion="cargar"):
+        clientes_store = clientes.obtener_store(CLIENTE_FILE)
+        clientes_lista = clientes_store.todos()
+
+    nombres_clientes = [c["cliente"] for c in clientes_lista] if clientes_lista else []
+
+    # Cliente vacío por defecto
+    cliente = {
+        "id": "",
+        "cliente": "",
+        "direccion": "",
+        "direccion_entrega": "",
+        "fecha_evento": "",
+        "telefono_cliente": ""
+    }
+
+    # Selección de modo
+    modo = st.radio("¿Qué quieres hacer?", ["➕ Nuevo cliente", "✏️ Editar cliente existente"], key="cliente_modo")
+
+    if modo == "✏️ Editar cliente existente" and nombres_clientes:
+        # Campo de búsqueda
+        busqueda = st.text_input("🔍 Buscar cliente (nombre, teléfono o dirección)", key="cliente_busqueda")
+
+        if busqueda:
+            # Índice prearmado: sin acentos, ordenado por relevancia y limitado a los mejores
+            with metricas.medir("clientes", operacion="buscar"):
+                resultados = clientes_store.buscar(busqueda, k=MAX_RESULTADOS)
+        else:
+            resultados = clientes_lista
+
+        if resultados:
+            # Crear etiquetas descriptivas seguras con .get()
+            opciones = {
+                f'{c.get("cliente","")} - {c.get("telefono_cliente","")} - {c.get("direccion","")} (ID: {c.get("id","N/A")})': c
+                for c in resultados
+            }
+            seleccionado = st.selectbox("Selecciona cliente", list(opciones.keys()), key="cliente_seleccionado")
+            cliente = opciones[seleccionado]
+        else:
+            st.warning("⚠️ No se encontraron clientes con ese criterio")
+
+    # Campos de entrada: se llenan con el cliente elegido sólo cuando cambia
+    # la elección; si no, conservan lo que se escribió (también al volver de
+    # otra sección)
+    if st.session_state.get("cliente_cargado") != cliente.get("id", ""):
+        st.session_state["cliente_cargado"] = cliente.get("id", "")
+        st.session_state["cliente_nombre"] = cliente.get("cliente", "")
+        st.session_state["cliente_direccion"] = cliente.get("direccion", "")
+        st.session_state["cliente_fecha_evento"] = modelos.parse_fecha(cliente.get("fecha_evento")) or datetime.date.today()
+        st.session_state["cliente_telefono"] = cliente.get("telefono_cliente", "")
+    valor_inicial("cliente_nombre", "")
+    valor_inicial("cliente_direccion", "")
+    valor_inicial("cliente_fecha_evento", datetime.date.today())
+    valor_inicial("cliente_telefono", "")
+
+    cliente["cliente"] = st.text_input("Nombre del cliente", key="cliente_nombre")
+    cliente["direccion"] = st.text_input("Dirección", key="cliente_direccion")
+
+    # Fecha del evento
+    fecha_evento = st.date_input("📅 Fecha del evento", key="cliente_fecha_evento")
+    cliente["fecha_evento"] = fecha_evento.strftime("%d-%m-%Y")
+
+    # Mostrar también en formato largo (ejemplo: viernes 29 agosto 2025)
+    fecha_larga = fecha_evento.strftime("%A %d %B %Y").capitalize()
+    st.caption(f"📌 Fecha seleccionada: {fecha_larga}")
+
+    cliente["telefono_cliente"] = st.text_input("Teléfono", key="cliente_telefono")
+
+    # Guardar cliente
+    if st.button("💾 Guardar cliente"):
+        # Validar duplicados (nombre + teléfono), ignorando al cliente que estamos editando
+        try:
+            cliente = clientes_store.guardar(cliente)
+        except clientes.ClienteDuplicado:
+            st.error("⚠️ Ya existe un cliente con el mismo nombre y teléfono. No se puede duplicar.")
+        else:
+            st.success("✅ Cliente guardado/actualizado")
 
-# Campos de entrada
-cliente["cliente"] = st.text_input("Nombre del cliente", cliente.get("cliente", ""))
-cliente["direccion"] = st.text_input("Dirección", cliente.get("direccion", ""))
 
-# Fecha del evento
-if cliente.get("fecha_evento"):
-    try:
-        fecha_guardada = datetime.datetime.strptime(cliente["fecha_evento"], "%d-%m-%Y").date()
-    except:
-        fecha_guardada = datetime.date.today()
-else:
-    fecha_guardada = datetime.date.today()
-
-fecha_evento = st.date_input("📅 Fecha del evento", value=fecha_guardada)
-cliente["fecha_evento"] = fecha_evento.strftime("%d-%m-%Y")
-
-# Mostrar también en formato largo (ejemplo: viernes 29 agosto 2025)
-fecha_larga = fecha_evento.strftime("%A %d %B %Y").capitalize()
-st.caption(f"📌 Fecha seleccionada: {fecha_larga}")
-
-cliente["telefono_cliente"] = st.text_input("Teléfono", cliente.get("telefono_cliente", ""))
-
-# Guardar cliente
-if st.button("💾 Guardar cliente"):
-    # Validar duplicados (nombre + teléfono)
-    duplicado = next(
-        (c for c in clientes if c["cliente"].strip().lower() == cliente["cliente"].strip().lower()
-         and c["telefono_cliente"].strip() == cliente["telefono_cliente"].strip()
-         and c["id"] != cliente.get("id", "")),  # Ignora si es el mismo cliente que estamos editando
-        None
-    )
 
-    if duplicado:
-        st.error("⚠️ Ya existe un cliente con el mismo nombre y teléfono. No se puede duplicar.")
-    else:
-        if not cliente.get("id"):  
-            # Asignar UUID en lugar de secuencial (más robusto)
-            import uuid
-            cliente["id"] = str(uuid.uuid4())
-
-        existe = False
-        for i, c in enumerate(clientes):
-            if c["id"] == cliente["id"]:
-                clientes[i] = cliente
-                existe = True
-                break
-        if not existe:
-            clientes.append(cliente)
-
-        escribir_csv(
-            CLIENTE_FILE,
-            clientes,
-            fieldnames=["id", "cliente", "direccion", "direccion_entrega", "fecha_evento", "telefono_cliente"]
-        )
-        st.success("✅ Cliente guardado/actualizado")
+    # Botón para borrar cliente con confirmación
+    # Estado para manejar confirmación
+    if "confirmar_borrado" not in st.session_state:
+        st.session_state.confirmar_borrado = False
+    if "cliente_borrado" not in st.session_state:
+        st.session_state.cliente_borrado = None
 
+    # Botón inicial para borrar cliente
+    if modo == "✏️ Editar cliente existente" and cliente.get("id"):
+        st.subheader("⚠️ Eliminar cliente")
 
+        if not st.session_state.confirmar_borrado:
+            if st.button("🗑️ Borrar cliente"):
+                st.session_state.confirmar_borrado = True
+                st.rerun()
+        else:
+            st.error(f"¿Seguro que quieres borrar el cliente '{cliente['cliente']}'?")
+
+            col1, col2 = st.columns(2)
+            with col1:
+                if st.button("✅ Sí, borrar"):
+                    clientes_store.borrar(cliente["id"])
+                    # Guardamos quién fue borrado para mostrar feedback después
+                    st.session_state.cliente_borrado = cliente['cliente']
+                    st.session_state.confirmar_borrado = False
+                    st.rerun()
+
+            with col2:
+                if st.button("❌ No, cancelar"):
+                    st.info("Operación cancelada.")
+                    st.session_state.confirmar_borrado = False
+                    st.rerun()
+
+    # Mostrar feedback si alguien fue borrado
+    if st.session_state.cliente_borrado:
+        st.success(f"✅ Cliente eliminado: {st.session_state.cliente_borrado}")
+        # Limpiamos el mensaje para que no se muestre en el siguiente run
+        st.session_state.cliente_borrado = None
+
+
+
+    # =======================
+    # Sección Ítems
+    # =======================
+    st.header("📋 Ítems de la cotización")
+
+    # Cargar ítems (sólo se relee items.csv si cambió)
+    items = leer_items()
+
+    if not items:  # aseguramos que haya al menos 1
+        items = [{"descripcion": "", "cantidad": "1", "precio_unitario": "0"}]
+
+    # Guardamos número dinámico de ítems en sesión
+    if "num_items" not in st.session_state:
+        st.session_state.num_items = len(items)
+
+    # Botones de control
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("➕ Agregar ítem"):
+            st.session_state.num_items += 1
+    with col2:
+        if st.button("➖ Quitar ítem") and st.session_state.num_items > 1:
+            st.session_state.num_items -= 1
+
+    # Disponibilidad precalculada: consultar una fecha no recorre los pedidos.
+    # Si no hay inventario que controlar no se arma (ni se cargan los pedidos).
+    disponibilidad = inventario.obtener_disponibilidad() if inventario.leer_stock() else None
+
+    # Catálogo de productos: se elige de la lista o se escribe texto libre
+    # (no se da de alta: los productos nuevos se agregan en "📚 Catálogo e inventario")
+    catalogo_productos = catalogo.obtener_catalogo()
+    productos = [p.descripcion for p in catalogo_productos.todos()]
+
+    new_items = []
+    for i in range(st.session_state.num_items):
+        st.subheader(f"Ítem {i+1}")
+        if i < len(items):
+            item = items[i]
+        else:
+            item = {"descripcion": "", "cantidad": "1", "precio_unitario": "0"}
+
+        valor_inicial(f"desc_{i}", item["descripcion"] or None)
+        valor_inicial(f"cant_{i}", int(item["cantidad"]))
+        elegida = st.session_state[f"desc_{i}"]
+        opciones = productos if elegida in productos or not elegida else [elegida] + productos
+        descripcion = st.selectbox(
+            "Descripción",
+            opciones,
+            accept_new_options=True,
+            placeholder="Escribe para buscar en el catálogo o escribe otra descripción",
+            key=f"desc_{i}"
+        ) or ""
+        cantidad = st.number_input("Cantidad", min_value=1, key=f"cant_{i}")
+
+        # Precio sugerido: el guardado en items.csv para esta línea, si no el del catálogo
+        producto = catalogo_productos.por_descripcion(descripcion) if descripcion else None
+        if descripcion == item["descripcion"]:
+            precio_sugerido = float(item["precio_unitario"])
+        else:
+            precio_sugerido = producto.precio_centavos / 100 if producto else 0.0
+        clave_precio = f"precio_{i}_{producto.id if producto else descripcion}"
+        valor_inicial(clave_precio, precio_sugerido)
+        precio = st.number_input("Precio unitario", min_value=0.0, key=clave_precio)
+
+        libres = disponibilidad.disponible(descripcion, fecha_evento) if disponibilidad and descripcion else None
+        if libres is not None:
+            stock = disponibilidad.stock(descripcion)
+            if cantidad > libres:
+                st.error(f"⚠️ Sólo quedan {max(libres, 0)} de {stock} disponibles el {cliente['fecha_evento']}")
+            else:
+                st.caption(f"📦 Disponibles el {cliente['fecha_evento']}: {libres} de {stock}")
 
-# Botón para borrar cliente con confirmación
-# Estado para manejar confirmación
-if "confirmar_borrado" not in st.session_state:
-    st.session_state.confirmar_borrado = False
-if "cliente_borrado" not in st.session_state:
-    st.session_state.cliente_borrado = None
+        new_items.append({
+            "descripcion": descripcion,
+            "cantidad": str(cantidad),
+            "precio_unitario": str(precio)
+        })
 
-# Botón inicial para borrar cliente
-if modo == "✏️ Editar cliente existente" and cliente.get("id"):
-    st.subheader("⚠️ Eliminar cliente")
+    if st.button("💾 Guardar ítems"):
+        if persistencia.escribir_csv(ITEMS_FILE, new_items, ITEMS_CAMPOS):
+            st.success("✅ Ítems actualizados")
+        else:
+            st.info("Los ítems no cambiaron.")
+
+    # Mismo artículo en varias líneas: se revisa la suma
+    faltantes = disponibilidad.faltantes(new_items, fecha_evento) if disponibilidad else []
+    if faltantes:
+        st.warning(
+            "⚠️ No alcanza el inventario para esta fecha: "
+            + ", ".join(f"{f['descripcion']} (pides {f['pedida']}, quedan {f['disponible']})" for f in faltantes)
+            + ". La cotización se puede generar, pero no se podrá confirmar así."
+        )
 
-    if not st.session_state.confirmar_borrado:
-        if st.button("🗑️ Borrar cliente"):
-            st.session_state.confirmar_borrado = True
-            st.rerun()
-    else:
-        st.error(f"¿Seguro que quieres borrar el cliente '{cliente['cliente']}'?")
-
-        col1, col2 = st.columns(2)
-        with col1:
-            if st.button("✅ Sí, borrar"):
-                clientes = [c for c in clientes if c["id"] != cliente["id"]]
-                escribir_csv(
-                    CLIENTE_FILE,
-                    clientes,
-                    fieldnames=["id", "cliente", "direccion", "direccion_entrega", "fecha_evento", "telefono_cliente"]
-                )
-                # Guardamos quién fue borrado para mostrar feedback después
-                st.session_state.cliente_borrado = cliente['cliente']
-                st.session_state.confirmar_borrado = False
-                st.rerun()
 
-        with col2:
-            if st.button("❌ No, cancelar"):
-                st.info("Operación cancelada.")
-                st.session_state.confirmar_borrado = False
+    # =======================
+    # Generar PDF
+    # =======================
+    st.header("⚙️ Exportar")
+
+    if st.button("📄 Generar PDF"):
+        # La cola (y con ella Jinja2 y tectonic) se carga al pedir el primer PDF
+        import almacen_pedidos
+        import cola_pdf
+        import historial
+        # Volver a generar sin cambios (mismo cliente e ítems) reutiliza el
+        # pedido ya guardado: mismo id, así la caché entrega el mismo PDF y folio
+        firma = json.dumps([cliente, new_items], sort_keys=True, ensure_ascii=False)
+        anterior = st.session_state.get("ultimo_pedido")
+        if anterior and anterior[0] == firma and almacen_pedidos.obtener_store(historial.PEDIDOS_FILE).get(anterior[1]):
+            id_pedido = anterior[1]
+            st.info(f"📌 Mismo pedido que el anterior (ID: {id_pedido})")
+        else:
+            id_pedido = historial.guardar_pedido(cliente, new_items).id_pedido
+            st.session_state["ultimo_pedido"] = (firma, id_pedido)
+            st.success(f"📌 Pedido guardado (ID: {id_pedido})")
+        trabajo = cola_pdf.obtener_cola().encolar(cliente, new_items, id_pedido)
+        st.session_state["trabajo_pdf"] = trabajo.id
+
+    id_trabajo = st.session_state.get("trabajo_pdf")
+    if id_trabajo:
+        import cola_pdf
+        cola = cola_pdf.obtener_cola()
+
+        @st.fragment(run_every=1)
+        def progreso_trabajo(id_trabajo):
+            """Se vuelve a dibujar cada segundo (sólo este bloque) hasta que el PDF está listo."""
+            trabajo = cola.get(id_trabajo)
+            if trabajo is None or trabajo.terminado:
                 st.rerun()
+            pendientes, en_proceso = cola.profundidad()
+            if trabajo.estado == "pendiente":
+                st.info(f"⏳ En cola: lugar {cola.posicion(id_trabajo) or 1} de {pendientes} ({en_proceso} generándose)")
+            else:
+                st.info(f"⚙️ Generando PDF... ({pendientes} más en cola)")
+            st.caption(f"{time.time() - trabajo.creado:.0f} s desde que se pidió")
+
+        trabajo = cola.get(id_trabajo)
+        if trabajo is not None and not trabajo.terminado:
+            progreso_trabajo(trabajo.id)
+        elif trabajo is not None and trabajo.estado == "error":
+            st.error(f"❌ Error: {trabajo.error}")
+        elif trabajo is not None:
+            st.success(f"✅ Cotización {trabajo.folio} generada")
+            if trabajo.desde_cache:
+                st.info(f"♻️ Cotización idéntica a {trabajo.folio}: se reutilizó sin volver a compilar")
+            etapas = " · ".join(f"{e} {trabajo.tiempos[e]:.2f}s" for e in cola_pdf.ETAPAS if e in trabajo.tiempos)
+            st.caption(f"⏱️ {etapas}")
+
+            st.subheader("📄 Último PDF generado")
+            pdf_path = archivo_pdf.obtener_archivo(archivo_pdf.PDF_DIR).ruta(trabajo.folio)
+            if pdf_path:
+                mostrar_pdf(pdf_path)
+            else:
+                st.warning(f"⚠️ El PDF de {trabajo.folio} ya no está en {archivo_pdf.PDF_DIR}/")
 
-# Mostrar feedback si alguien fue borrado
-if st.session_state.cliente_borrado:
-    st.success(f"✅ Cliente eliminado: {st.session_state.cliente_borrado}")
-    # Limpiamos el mensaje para que no se muestre en el siguiente run
-    st.session_state.cliente_borrado = None
-
+        pendientes, en_proceso = cola.profundidad()
+        if pendientes or en_proceso:
+            st.caption(f"📬 Cola de generación: {pendientes} pendientes, {en_proceso} generándose")
+        promedios = cola.tiempos_promedio()
+        if promedios:
+            st.caption("⏱️ Promedio reciente: " + " · ".join(f"{e} {s:.2f}s" for e, s in promedios.items()))
 
 
 # =======================
-# Sección Ítems
+# Historial de PDFs
 # =======================
-st.header("📋 Ítems de la cotización")
-
-# Cargar ítems
-items = leer_csv(ITEMS_FILE, fieldnames=["descripcion", "cantidad", "precio_unitario"])
-
-if not items:  # aseguramos que haya al menos 1
-    items = [{"descripcion": "", "cantidad": "1", "precio_unitario": "0"}]
-
-# Guardamos número dinámico de ítems en sesión
-if "num_items" not in st.session_state:
-    st.session_state.num_items = len(items)
-
-# Botones de control
-col1, col2 = st.columns(2)
-with col1:
-    if st.button("➕ Agregar ítem"):
-        st.session_state.num_items += 1
-with col2:
-    if st.button("➖ Quitar ítem") and st.session_state.num_items > 1:
-        st.session_state.num_items -= 1
-
-new_items = []
-for i in range(st.session_state.num_items):
-    st.subheader(f"Ítem {i+1}")
-    if i < len(items):
-        item = items[i]
-    else:
-        item = {"descripcion": "", "cantidad": "1", "precio_unitario": "0"}
-
-    descripcion = st.text_input("Descripción", item["descripcion"], key=f"desc_{i}")
-    cantidad = st.number_input("Cantidad", min_value=1, value=int(item["cantidad"]), key=f"cant_{i}")
-    precio = st.number_input("Precio unitario", min_value=0.0, value=float(item["precio_unitario"]), key=f"precio_{i}")
-
-    new_items.append({
-        "descripcion": descripcion,
-        "cantidad": str(cantidad),
-        "precio_unitario": str(precio)
-    })
-
-if st.button("💾 Guardar ítems"):
-    escribir_csv(ITEMS_FILE, new_items, fieldnames=["descripcion", "cantidad", "precio_unitario"])
-    st.success("✅ Ítems actualizados")
+elif seccion == SECCIONES[1]:
+    st.header("🗂️ Historial de Cotizaciones")
 
+    archivo = archivo_pdf.obtener_archivo(archivo_pdf.PDF_DIR)
+    filtro_pdf = st.text_input("🔍 Buscar por folio o cliente", key="filtro_pdfs")
+    if filtro_pdf.strip():
+        entradas = archivo.buscar(filtro_pdf, k=MAX_RESULTADOS)
+    else:
+        entradas = archivo.recientes(MAX_RESULTADOS)  # últimos primero
+
+    if entradas:
+        por_folio = {e.folio: e for e in entradas}
+        seleccionado = st.selectbox(
+            "Selecciona un PDF para ver:",
+            list(por_folio),
+            format_func=lambda f: f"{f} · {por_folio[f].cliente or 'sin cliente'} · {por_folio[f].fecha.strftime('%d/%m/%Y')}"
+        )
+        pdf_path = archivo.ruta(seleccionado) if seleccionado else None
+        if pdf_path:
+            mostrar_pdf(pdf_path, etiqueta="⬇️ Descargar este PDF")
+        elif seleccionado:
+            st.warning(f"⚠️ El PDF de {seleccionado} ya no está en {archivo_pdf.PDF_DIR}/")
+    elif filtro_pdf.strip():
+        st.info("Ninguna cotización coincide con la búsqueda.")
+    else:
+        st.info("No hay cotizaciones guardadas todavía.")
 
-import re, base64, glob
-import streamlit.components.v1 as components
 
 # =======================
-# Generar PDF
+# Catálogo e inventario
 # =======================
-st.header("⚙️ Exportar")
-if st.button("📄 Generar PDF"):
-    pedido = historial.guardar_pedido(cliente, new_items)
-
-    result = subprocess.run(
-        ["python", "cotizacion.py", cliente["cliente"], pedido["id_pedido"]],
-        capture_output=True, text=True
+elif seccion == SECCIONES[2]:
+    catalogo_productos = catalogo.obtener_catalogo()
+
+    st.header("📚 Catálogo de productos")
+    st.caption("Cambiar una descripción crea un id nuevo: las cotizaciones anteriores conservan la suya.")
+    filas_catalogo = st.data_editor(
+        [{"id": p.id, "descripcion": p.descripcion, "precio": p.precio_centavos / 100, "activo": p.activo}
+         for p in catalogo_productos.todos(activos=False)],
+        disabled=["id"],
+        num_rows="dynamic",
+        key="editor_catalogo"
     )
-    
-    if result.returncode == 0:
-        st.success("✅ Cotización generada")
-        st.success(f"📌 Pedido guardado (ID: {pedido['id_pedido']})")
-
-        # Buscar en stdout el PDF generado (dentro de pdfs/)
-        match = re.search(r"PDF generado:\s+(.*COT-\d+\.pdf)", result.stdout)
-
-        if match:
-            pdf_path = match.group(1)
-
-            if os.path.exists(pdf_path):
-                with open(pdf_path, "rb") as f:
-                    pdf_bytes = f.read()
-
-                st.subheader("📄 Último PDF generado")
-
-                # Botón de descarga
-                st.download_button(
-                    label="⬇️ Descargar PDF",
-                    data=pdf_bytes,
-                    file_name=os.path.basename(pdf_path),
-                    mime="application/pdf"
+    if st.button("💾 Guardar catálogo"):
+        try:
+            for fila in filas_catalogo:
+                if not fila.get("id"):   # renglón nuevo
+                    if fila.get("descripcion"):
+                        catalogo_productos.registrar(fila["descripcion"], fila["precio"] or 0)
+                    continue
+                nuevo = modelos.Producto(
+                    fila["id"], str(fila["descripcion"]).strip(), modelos.a_centavos(fila["precio"] or 0), bool(fila["activo"])
                 )
-
-                # Visor embebido
-                base64_pdf = base64.b64encode(pdf_bytes).decode("utf-8")
-                pdf_display = f"""
-                    <iframe src="data:application/pdf;base64,{base64_pdf}" 
-                            width="100%" height="600" type="application/pdf"></iframe>
-                """
-                components.html(pdf_display, height=600)
-            else:
-                st.error(f"❌ No se encontró el PDF generado: {pdf_path}")
+                if nuevo != catalogo_productos.get(fila["id"]):
+                    catalogo_productos.guardar(nuevo)
+        except ValueError as e:
+            st.error(f"⚠️ {e}")
+        except KeyError as e:   # otra sesión lo cambió mientras se editaba: se recarga la tabla
+            st.error(f"⚠️ {e.args[0]}. Recarga la página para ver el catálogo actual.")
         else:
-            st.error("⚠️ No se pudo detectar el nombre del PDF generado.")
-    else:
-        st.error(f"❌ Error: {result.stderr}")
-
-
-# =======================
-# Historial de PDFs
-# =======================
-st.header("🗂️ Historial de Cotizaciones")
-
-pdf_files = sorted(glob.glob("pdfs/COT-*.pdf"))
-
-if pdf_files:
-    seleccionado = st.selectbox("Selecciona un PDF para ver:", pdf_files[::-1])  # mostrar últimos primero
-    if seleccionado:
-        with open(seleccionado, "rb") as f:
-            pdf_bytes = f.read()
-
-        st.download_button(
-            label="⬇️ Descargar este PDF",
-            data=pdf_bytes,
-            file_name=os.path.basename(seleccionado),
-            mime="application/pdf"
-        )
-
-        base64_pdf = base64.b64encode(pdf_bytes).decode("utf-8")
-        pdf_display = f"""
-            <iframe src="data:application/pdf;base64,{base64_pdf}" 
-                    width="100%" height="600" type="application/pdf"></iframe>
-        """
-        components.html(pdf_display, height=600)
-else:
-    st.info("No hay cotizaciones guardadas todavía.")
+            st.success("✅ Catálogo actualizado")
+            st.rerun()
+    st.header("📦 Inventario (unidades por artículo)")
+    st.caption("Los artículos que no estén aquí no se controlan.")
+    filas_stock = st.data_editor(
+        [{"descripcion": d, "stock": n} for d, n in sorted(inventario.leer_stock().items())]
+        or [{"descripcion": "", "stock": 0}],
+        num_rows="dynamic",
+        key="editor_stock"
+    )
+    if st.button("💾 Guardar inventario"):
+        inventario.guardar_stock({
+            str(f["descripcion"]).strip(): int(f["stock"] or 0)
+            for f in filas_stock if f.get("descripcion")
+        })
+        st.success("✅ Inventario actualizado")
+        st.rerun()
@@ -1,281 +1,313 @@
 import streamlit as st
-import csv
-import os
-import json
 import datetime
-from collections import defaultdict
+import os
+import agenda
+import almacen_pedidos
+import archivo_pdf
+import datos_historial
+import inventario
+import modelos
 
 PEDIDOS_FILE = "pedidos.csv"
-
-# =======================
-# Funciones auxiliares
-# =======================
-def leer_csv(file, fieldnames=None):
-    if not os.path.exists(file):
-        return []
-    with open(file, newline="", encoding="utf-8") as f:
-        return list(csv.DictReader(f))
-
-def guardar_csv(file, data, fieldnames):
-    with open(file, "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        for row in data:
-            clean_row = {k: row.get(k, "") for k in fieldnames}
-            writer.writerow(clean_row)
+MAX_RESULTADOS = 50
+TAMANO_PAGINA = int(os.environ.get("HISTORIAL_TAMANO_PAGINA", "20"))
+OPCIONES_PAGINA = sorted({10, 20, 50, 100, TAMANO_PAGINA})
+
+# Una sección a la vez: cada rerun sólo arma las vistas de la sección elegida
+SECCIONES = [
+    "📅 Eventos de esta semana",
+    "📊 Resumen por mes",
+    "📈 Análisis de ingresos",
+    "🚀 Eventos futuros",
+    "🔍 Buscar cliente",
+    "🔎 Buscar por ID de pedido",
+]
 
 # =======================
 # Interfaz Streamlit
 # =======================
 st.title("📜 Historial y Agenda de Pedidos")
 
-# Leer pedidos
-pedidos = leer_csv(PEDIDOS_FILE, fieldnames=[
-    "id_pedido","fecha_creacion","id_cliente","nombre_cliente","fecha_evento","items","total","estado"
-])
-
-# Si faltan estados, se asignan como "cotizacion"
-for p in pedidos:
-    if "estado" not in p or not p["estado"]:
-        p["estado"] = "cotizacion"
+# Leer pedidos: el almacén se carga una vez por proceso y luego sólo lee lo anexado
+store = almacen_pedidos.obtener_store(PEDIDOS_FILE)
 
-if not pedidos:
+if len(store) == 0:
     st.warning("⚠️ No hay pedidos registrados todavía.")
     st.stop()
 
-# Convertir fechas
-for p in pedidos:
-    try:
-        p["fecha_creacion_dt"] = datetime.datetime.strptime(p["fecha_creacion"], "%d-%m-%Y %H:%M:%S")
-    except:
-        p["fecha_creacion_dt"] = None
+seccion = st.sidebar.radio("Sección", SECCIONES, key="seccion")
+tamano_pagina = st.sidebar.selectbox(
+    "Pedidos por página", OPCIONES_PAGINA, index=OPCIONES_PAGINA.index(TAMANO_PAGINA), key="tamano_pagina"
+)
 
-    try:
-        p["fecha_evento_dt"] = datetime.datetime.strptime(p["fecha_evento"], "%d-%m-%Y")
-    except:
-        p["fecha_evento_dt"] = None
+
+def paginar(pedidos, clave):
+    """Sólo los pedidos de la página elegida; el selector aparece si hay más de una página."""
+    paginas = max(1, -(-len(pedidos) // tamano_pagina))
+    if paginas == 1:
+        return pedidos
+
+    clave = f"pagina_{clave}"
+    if st.session_state.get(clave, 1) > paginas:   # la lista se achicó
+        st.session_state[clave] = paginas
+    pagina = st.number_input(f"Página (de {paginas})", min_value=1, max_value=paginas, value=1, step=1, key=clave)
+    inicio = (pagina - 1) * tamano_pagina
+    st.caption(f"Mostrando {inicio + 1}–{min(inicio + tamano_pagina, len(pedidos))} de {len(pedidos)}")
+    return pedidos[inicio:inicio + tamano_pagina]
+
+
+def mostrar_detalle(p, clave):
+    """Datos del pedido; la tabla de ítems sólo se decodifica y dibuja si se pide."""
+    st.write(f"📅 Creado: {p.texto_fecha_creacion}")
+    st.write(f"💰 Total: **${p.texto_total}**")
+    st.write(f"📌 Estado: **{p.estado}**")
+    cotizaciones = archivo_pdf.obtener_archivo().por_pedido(p.id_pedido)
+    if cotizaciones:
+        st.write("📄 Cotizaciones: " + ", ".join(f"{e.folio} ({e.fecha.strftime('%d/%m/%Y')})" for e in cotizaciones))
+    if st.checkbox("🧾 Ver ítems", key=f"items_{clave}_{p.id_pedido}"):
+        items = p.items
+        if items is not None:
+            st.table([it.to_dict() for it in items])
+        else:
+            st.text(p.items_texto)
+
+
+def acciones_pedido(p, clave):
+    """
+    Botones de cambio de estado válidos para el pedido (cotizacion -> confirmado -> recogido).
+    Se envía la versión leída: si otra pestaña lo cambió antes, no se pisa su cambio.
+    """
+    if p.estado == "recogido":
+        st.success("📦 Este pedido ya fue recogido. No se puede cancelar ni modificar.")
+        return
+
+    acciones = []
+    if p.estado == "cotizacion":
+        acciones.append(("confirm", f"✅ Confirmar pedido {p.id_pedido}", "ha sido confirmado como evento 🎉"))
+    elif p.estado == "confirmado":
+        acciones.append(("cancel", f"❌ Cancelar evento {p.id_pedido}", "ha sido regresado a cotización ⚠️"))
+        if p.fecha_evento and p.fecha_evento <= hoy:
+            acciones.append(("mark_picked_up", f"📦 Marcar como recogido {p.id_pedido}", "ha sido marcado como recogido 📦✅"))
+
+    for columna, (accion, etiqueta, mensaje) in zip(st.columns(len(acciones) or 1), acciones):
+        with columna:
+            if st.button(etiqueta, key=f"{accion}_{clave}_{p.id_pedido}"):
+                try:
+                    # Al confirmar se revisa el inventario con el bloqueo tomado: dos
+                    # pestañas no pueden apartar a la vez las últimas unidades
+                    validar = inventario.obtener_disponibilidad(PEDIDOS_FILE).verificar if accion == "confirm" else None
+                    store.transicion(p.id_pedido, accion, version=p.version, validar=validar)
+                except inventario.SinDisponibilidad as e:
+                    st.error(f"📦 {e}")
+                except almacen_pedidos.ConflictoVersion:
+                    st.error(f"⚠️ El pedido {p.id_pedido} fue modificado en otra pestaña; vuelve a cargar la página para ver su estado actual.")
+                except almacen_pedidos.TransicionInvalida as e:
+                    st.error(f"❌ {e}")
+                else:
+                    st.success(f"El pedido {p.id_pedido} {mensaje}")
+                    st.rerun()
 
 # =======================
 # Fechas de referencia
 # =======================
 hoy = datetime.date.today()
-inicio_semana = hoy - datetime.timedelta(days=hoy.weekday())   # lunes
-fin_semana = inicio_semana + datetime.timedelta(days=6)       # domingo
+inicio_semana = agenda.inicio_semana(hoy)                 # lunes
+fin_semana = inicio_semana + datetime.timedelta(days=6)   # domingo
+
+
+def mostrar_sobreventas():
+    """Sobreventas pendientes (p. ej. si se bajó el stock después de confirmar)."""
+    if not inventario.leer_stock():   # sin inventario no hay nada que revisar (ni motor que armar)
+        return
+    disponibilidad = inventario.obtener_disponibilidad(PEDIDOS_FILE)
+    for sobreventa in disponibilidad.sobrevendidos(desde=hoy):
+        st.error(f"📦 Sobreventa el {sobreventa['fecha']:%d-%m-%Y}: {sobreventa['descripcion']} ({sobreventa['reservado']} apartados, {sobreventa['stock']} en inventario)")
+
 
 # =======================
 # Sección 1: Eventos de esta semana
 # =======================
-st.header("📅 Eventos de esta semana")
-eventos_semana = [
-    p for p in pedidos
-    if p["estado"] == "confirmado" and p["fecha_evento_dt"] and inicio_semana <= p["fecha_evento_dt"].date() <= fin_semana
-]
+if seccion == SECCIONES[0]:
+    st.header("📅 Eventos de esta semana")
+    mostrar_sobreventas()
+    eventos_semana = agenda.obtener_agenda(PEDIDOS_FILE).semana(hoy)
 
-if eventos_semana:
-    for p in eventos_semana:
-        with st.expander(f"📝 {p['nombre_cliente']} - {p['fecha_evento']} (Pedido {p['id_pedido']})"):
-            st.write(f"📅 Creado: {p['fecha_creacion']}")
-            st.write(f"💰 Total: **${p['total']}**")
-            st.write(f"📌 Estado: **{p['estado']}**")
-            try:
-                st.table(json.loads(p["items"]))
-            except:
-                st.text(p["items"])
-
-            if p["estado"] == "confirmado":
-                if st.button(f"❌ Cancelar evento {p['id_pedido']}", key=f"cancel_semana_{p['id_pedido']}"):
-                    p["estado"] = "cotizacion"
-                    guardar_csv(PEDIDOS_FILE, pedidos, fieldnames=[
-                        "id_pedido","fecha_creacion","id_cliente","nombre_cliente","fecha_evento","items","total","estado"
-                    ])
-                    st.warning(f"El pedido {p['id_pedido']} ha sido regresado a cotización ⚠️")
-                    st.rerun()
-else:
-    st.info("✅ No hay eventos programados para esta semana.")
+    if eventos_semana:
+        for p in paginar(eventos_semana, "semana"):
+            with st.expander(f"📝 {p.nombre_cliente} - {p.texto_fecha_evento} (Pedido {p.id_pedido})"):
+                mostrar_detalle(p, "semana")
+
+                acciones_pedido(p, "semana")
+    else:
+        st.info("✅ No hay eventos programados para esta semana.")
 
 # =======================
 # Sección 2: Resumen mensual de eventos pasados
 # =======================
-st.header("📊 Resumen por mes (eventos pasados)")
-pasados = [
-    p for p in pedidos
-    if p["estado"] in ["confirmado", "recogido"]
-    and p["fecha_evento_dt"]
-    and p["fecha_evento_dt"].date() < hoy
-]
-
-if pasados:
-    # Agrupar por mes
-    pedidos_por_mes = defaultdict(list)
-    totales_por_mes = defaultdict(float)
-
-    for p in pasados:
-        mes = p["fecha_evento_dt"].strftime("%B %Y")
-        pedidos_por_mes[mes].append(p)
-        totales_por_mes[mes] += float(p["total"])
-
-    # Mostrar mes por mes
-    for mes in sorted(pedidos_por_mes.keys(), key=lambda x: datetime.datetime.strptime(x, "%B %Y"), reverse=True):
-        st.subheader(f"📌 {mes} — Total: **${totales_por_mes[mes]:.2f}**")
-
-        for p in pedidos_por_mes[mes]:
-            with st.expander(f"⏳ {p['nombre_cliente']} - {p['fecha_evento']} (Pedido {p['id_pedido']})"):
-                st.write(f"📅 Creado: {p['fecha_creacion']}")
-                st.write(f"💰 Total: **${p['total']}**")
-                st.write(f"📌 Estado: **{p['estado']}**")
-                try:
-                    st.table(json.loads(p["items"]))
-                except:
-                    st.text(p["items"])
-
-                if p["estado"] == "confirmado":
-                    col1, col2 = st.columns(2)
-                    with col1:
-                        if st.button(f"❌ Cancelar evento {p['id_pedido']}", key=f"cancel_pasado_{p['id_pedido']}"):
-                            p["estado"] = "cotizacion"
-                            guardar_csv(PEDIDOS_FILE, pedidos, fieldnames=[
-                                "id_pedido","fecha_creacion","id_cliente","nombre_cliente","fecha_evento","items","total","estado"
-                            ])
-                            st.warning(f"El pedido {p['id_pedido']} ha sido regresado a cotización ⚠️")
-                            st.rerun()
-                    with col2:
-                        if st.button(f"📦 Marcar como recogido {p['id_pedido']}", key=f"recoger_{p['id_pedido']}"):
-                            p["estado"] = "recogido"
-                            guardar_csv(PEDIDOS_FILE, pedidos, fieldnames=[
-                                "id_pedido","fecha_creacion","id_cliente","nombre_cliente","fecha_evento","items","total","estado"
-                            ])
-                            st.success(f"El pedido {p['id_pedido']} ha sido marcado como recogido 📦✅")
-                            st.rerun()
-
-                elif p["estado"] == "recogido":
-                    st.success("📦 Este pedido ya fue recogido. No se puede cancelar ni modificar.")
-else:
-    st.info("Aún no hay eventos pasados registrados.")
+elif seccion == SECCIONES[1]:
+    st.header("📊 Resumen por mes (eventos pasados)")
+    vista = datos_historial.obtener_vista(PEDIDOS_FILE)
+    meses = vista.meses_pasados()
+
+    if meses:
+        # Totales ya agregados por la vista: no se recorre ningún pedido
+        st.table([
+            {"Mes": modelos.nombre_mes(inicio_mes), "Pedidos": cantidad, "Total": f"${modelos.formatear_centavos(total_mes)}"}
+            for inicio_mes, total_mes, cantidad in meses
+        ])
+
+        # Sólo se dibujan los pedidos del mes elegido, una página a la vez
+        totales_por_mes = {inicio_mes: total_mes for inicio_mes, total_mes, _ in meses}
+        inicio_mes = st.selectbox(
+            "Ver pedidos del mes:", list(totales_por_mes), format_func=modelos.nombre_mes, key="mes_pasado"
+        )
+        total_mes = totales_por_mes[inicio_mes]
+        st.subheader(f"📌 {modelos.nombre_mes(inicio_mes)} — Total: **${modelos.formatear_centavos(total_mes)}**")
+
+        for p in paginar(vista.pasados_del_mes(inicio_mes), "pasados"):
+            with st.expander(f"⏳ {p.nombre_cliente} - {p.texto_fecha_evento} (Pedido {p.id_pedido})"):
+                mostrar_detalle(p, "pasado")
+
+                acciones_pedido(p, "pasado")
+    else:
+        st.info("Aún no hay eventos pasados registrados.")
 
+# =======================
+# Sección 2b: Análisis de ingresos (agregados con NumPy)
+# =======================
+elif seccion == SECCIONES[2]:
+    st.header("📈 Análisis de ingresos")
+    import analitica   # NumPy sólo se importa si se abre esta sección
+    analisis = analitica.obtener_analitica(PEDIDOS_FILE)
+    primer_evento, ultimo_evento = analisis.rango() or (hoy, hoy)
+
+    col_desde, col_hasta = st.columns(2)
+    with col_desde:
+        desde_analisis = st.date_input("Desde", value=primer_evento, key="analisis_desde")
+    with col_hasta:
+        hasta_analisis = st.date_input("Hasta", value=max(hoy, ultimo_evento), key="analisis_hasta")
+
+    if desde_analisis > hasta_analisis:
+        st.warning("⚠️ La fecha inicial es posterior a la final.")
+    else:
+        tab_mes, tab_semana, tab_clientes, tab_items, tab_uso = st.tabs(
+            ["Por mes", "Por semana", "Clientes", "Artículos", "Utilización"]
+        )
+        with tab_mes:
+            filas = analisis.por_mes(desde=desde_analisis, hasta=hasta_analisis)
+            if filas:
+                st.bar_chart(
+                    [{"mes": f"{f['mes']:%Y-%m}", "total": f["total_centavos"] / 100} for f in reversed(filas)],
+                    x="mes", y="total"
+                )
+            st.table([
+                {"Mes": modelos.nombre_mes(f["mes"]), "Pedidos": f["pedidos"], "Total": f"${modelos.formatear_centavos(f['total_centavos'])}"}
+                for f in filas
+            ])
+        with tab_semana:
+            st.table([
+                {"Semana del": f"{f['semana']:%d-%m-%Y}", "Pedidos": f["pedidos"], "Total": f"${modelos.formatear_centavos(f['total_centavos'])}"}
+                for f in analisis.por_semana(desde=desde_analisis, hasta=hasta_analisis)
+            ])
+        with tab_clientes:
+            st.table([
+                {"Cliente": f["cliente"], "Pedidos": f["pedidos"], "Total": f"${modelos.formatear_centavos(f['total_centavos'])}"}
+                for f in analisis.por_cliente(desde=desde_analisis, hasta=hasta_analisis, k=MAX_RESULTADOS)
+            ])
+        with tab_items:
+            st.table([
+                {"Artículo": f["descripcion"], "Unidades": f["cantidad"], "Pedidos": f["pedidos"], "Total": f"${modelos.formatear_centavos(f['total_centavos'])}"}
+                for f in analisis.por_item(desde=desde_analisis, hasta=hasta_analisis)
+            ])
+        with tab_uso:
+            st.caption("Porcentaje de días del rango en que cada artículo estuvo rentado.")
+            st.table([
+                {"Artículo": f["descripcion"], "Días en uso": f["dias_en_uso"], "Unidades·día": f["unidades_dia"], "Ocupación": f"{f['ocupacion']:.0%}"}
+                for f in analisis.utilizacion(desde_analisis, hasta_analisis)
+            ])
 
 # =======================
 # Sección 3: Eventos futuros (después de esta semana)
 # =======================
-st.header("🚀 Eventos futuros")
-futuros = [p for p in pedidos if p["estado"] == "confirmado" and p["fecha_evento_dt"] and p["fecha_evento_dt"].date() > fin_semana]
-
-if futuros:
-    for p in futuros:
-        with st.expander(f"📝 {p['nombre_cliente']} - {p['fecha_evento']} (Pedido {p['id_pedido']})"):
-            st.write(f"📅 Creado: {p['fecha_creacion']}")
-            st.write(f"💰 Total: **${p['total']}**")
-            st.write(f"📌 Estado: **{p['estado']}**")
-            try:
-                st.table(json.loads(p["items"]))
-            except:
-                st.text(p["items"])
-
-            if p["estado"] == "confirmado":
-                if st.button(f"❌ Cancelar evento {p['id_pedido']}", key=f"cancel_futuro_{p['id_pedido']}"):
-                    p["estado"] = "cotizacion"
-                    guardar_csv(PEDIDOS_FILE, pedidos, fieldnames=[
-                        "id_pedido","fecha_creacion","id_cliente","nombre_cliente","fecha_evento","items","total","estado"
-                    ])
-                    st.warning(f"El pedido {p['id_pedido']} ha sido regresado a cotización ⚠️")
-                    st.rerun()
-else:
-    st.info("⚠️ No hay eventos futuros programados más allá de esta semana.")
+elif seccion == SECCIONES[3]:
+    st.header("🚀 Eventos futuros")
+    mostrar_sobreventas()
+    futuros = agenda.obtener_agenda(PEDIDOS_FILE).rango(desde=fin_semana + datetime.timedelta(days=1))
+
+    if futuros:
+        for p in paginar(futuros, "futuros"):
+            with st.expander(f"📝 {p.nombre_cliente} - {p.texto_fecha_evento} (Pedido {p.id_pedido})"):
+                mostrar_detalle(p, "futuro")
+
+                acciones_pedido(p, "futuro")
+    else:
+        st.info("⚠️ No hay eventos futuros programados más allá de esta semana.")
 
 # =======================
 # Sección 4: Buscar cliente (con autocompletado)
 # =======================
-st.header("🔍 Buscar cliente")
+elif seccion == SECCIONES[4]:
+    st.header("🔍 Buscar cliente")
 
-# Lista de todos los nombres de cliente
-nombres_clientes = [p["nombre_cliente"] for p in pedidos]
-nombres_clientes_unicos = list(set(nombres_clientes))
+    # Nombres de cliente distintos (el almacén los mantiene al cargar pedidos)
+    nombres_clientes_unicos = store.nombres_clientes()
 
-# Autocompletado para búsqueda de cliente
-nombre_busqueda = st.selectbox(
-    "Escribe o selecciona el nombre del cliente:",
-    nombres_clientes_unicos,
-    key="cliente_autocomplete",
-)
+    # Autocompletado para búsqueda de cliente
+    nombre_busqueda = st.selectbox(
+        "Escribe o selecciona el nombre del cliente:",
+        nombres_clientes_unicos,
+        key="cliente_autocomplete",
+    )
 
-if nombre_busqueda:
-    resultados = [p for p in pedidos if nombre_busqueda.lower() in p["nombre_cliente"].lower()]
+    if nombre_busqueda:
+        vista = datos_historial.obtener_vista(PEDIDOS_FILE)
+        # Todos los pedidos de ese nombre exacto (la lista se pagina abajo);
+        # los que la vista no tenga todavía (recién guardados) se omiten
+        resultados = [p for p in (vista.get(o.id_pedido) for o in store.query(nombre_cliente=nombre_busqueda))
+                      if p is not None]
 
-    if resultados:
-        st.success(f"✅ Se encontraron {len(resultados)} pedidos para '{nombre_busqueda}'")
+        if resultados:
+            st.success(f"✅ Se encontraron {len(resultados)} pedidos para '{nombre_busqueda}'")
 
-        for p in resultados:
-            tipo = "📅 Futuro" if p["fecha_evento_dt"] and p["fecha_evento_dt"].date() >= hoy else "⏳ Pasado"
-            with st.expander(f"{tipo} - {p['nombre_cliente']} - {p['fecha_evento']} (Pedido {p['id_pedido']})"):
-                st.write(f"📅 Creado: {p['fecha_creacion']}")
-                st.write(f"💰 Total: **${p['total']}**")
-                st.write(f"📌 Estado: **{p['estado']}**")
-                try:
-                    st.table(json.loads(p["items"]))
-                except:
-                    st.text(p["items"])
-
-                if p["estado"] == "cotizacion":
-                    if st.button(f"✅ Confirmar pedido {p['id_pedido']}", key=f"conf_nombre_{p['id_pedido']}"):
-                        p["estado"] = "confirmado"
-                        guardar_csv(PEDIDOS_FILE, pedidos, fieldnames=[
-                            "id_pedido", "fecha_creacion", "id_cliente", "nombre_cliente", "fecha_evento", "items", "total", "estado"
-                        ])
-                        st.success(f"El pedido {p['id_pedido']} ha sido confirmado como evento 🎉")
-                        st.rerun()
-
-                elif p["estado"] == "confirmado":
-                    if st.button(f"❌ Cancelar evento {p['id_pedido']}", key=f"cancel_nombre_{p['id_pedido']}"):
-                        p["estado"] = "cotizacion"
-                        guardar_csv(PEDIDOS_FILE, pedidos, fieldnames=[
-                            "id_pedido", "fecha_creacion", "id_cliente", "nombre_cliente", "fecha_evento", "items", "total", "estado"
-                        ])
-                        st.warning(f"El pedido {p['id_pedido']} ha sido regresado a cotización ⚠️")
-                        st.rerun()
+            for p in paginar(resultados, "nombre"):
+                tipo = "📅 Futuro" if p.fecha_evento and p.fecha_evento >= hoy else "⏳ Pasado"
+                with st.expander(f"{tipo} - {p.nombre_cliente} - {p.texto_fecha_evento} (Pedido {p.id_pedido})"):
+                    mostrar_detalle(p, "nombre")
 
-    else:
-        st.warning(f"⚠️ No se encontraron pedidos para '{nombre_busqueda}'")
+                    acciones_pedido(p, "nombre")
 
+        else:
+            st.warning(f"⚠️ No se encontraron pedidos para '{nombre_busqueda}'")
 
 # =======================
 # Sección 5: Buscar por ID de pedido
 # =======================
-st.header("🔎 Buscar por ID de pedido")
-
-id_busqueda = st.text_input("Escribe el ID del pedido:")
-
-if id_busqueda:
-    resultados_id = [p for p in pedidos if p["id_pedido"] == id_busqueda]
-
-    if resultados_id:
-        st.success(f"✅ Se encontró el pedido con ID '{id_busqueda}'")
-
-        for p in resultados_id:
-            tipo = "📅 Futuro" if p["fecha_evento_dt"] and p["fecha_evento_dt"].date() >= hoy else "⏳ Pasado"
-            with st.expander(f"{tipo} - {p['nombre_cliente']} - {p['fecha_evento']} (Pedido {p['id_pedido']})"):
-                st.write(f"📅 Creado: {p['fecha_creacion']}")
-                st.write(f"💰 Total: **${p['total']}**")
-                st.write(f"📌 Estado: **{p['estado']}**")
-                try:
-                    st.table(json.loads(p["items"]))
-                except:
-                    st.text(p["items"])
-
-                if p["estado"] == "cotizacion":
-                    if st.button(f"✅ Confirmar pedido {p['id_pedido']}", key=f"conf_id_{p['id_pedido']}"):
-                        p["estado"] = "confirmado"
-                        guardar_csv(PEDIDOS_FILE, pedidos, fieldnames=[
-                            "id_pedido","fecha_creacion","id_cliente","nombre_cliente","fecha_evento","items","total","estado"
-                        ])
-                        st.success(f"El pedido {p['id_pedido']} ha sido confirmado como evento 🎉")
-                        st.rerun()
-
-                elif p["estado"] == "confirmado":
-                    if st.button(f"❌ Cancelar evento {p['id_pedido']}", key=f"cancel_id_{p['id_pedido']}"):
-                        p["estado"] = "cotizacion"
-                        guardar_csv(PEDIDOS_FILE, pedidos, fieldnames=[
-                            "id_pedido","fecha_creacion","id_cliente","nombre_cliente","fecha_evento","items","total","estado"
-                        ])
-                        st.warning(f"El pedido {p['id_pedido']} ha sido regresado a cotización ⚠️")
-                        st.rerun()
-    else:
-        st.warning(f"⚠️ No se encontró ningún pedido con el ID '{id_busqueda}'")
+elif seccion == SECCIONES[5]:
+    st.header("🔎 Buscar por ID de pedido")
+
+    id_busqueda = st.text_input("Escribe el ID del pedido:")
+
+    if id_busqueda:
+        # Primero coincidencia exacta; si no, ids que empiecen con lo escrito
+        vista = datos_historial.obtener_vista(PEDIDOS_FILE)
+        exacto = vista.get(id_busqueda)
+        if exacto:
+            resultados_id = [exacto]
+        else:
+            resultados_id = [p for p in (vista.get(r.id_pedido) for r in store.buscar(id_busqueda, k=MAX_RESULTADOS))
+                             if p is not None]
+
+        if resultados_id:
+            if len(resultados_id) == 1:
+                st.success(f"✅ Se encontró el pedido con ID '{id_busqueda}'")
+            else:
+                st.success(f"✅ Se encontraron {len(resultados_id)} pedidos con ID parecido a '{id_busqueda}'")
+
+            for p in paginar(resultados_id, "id"):
+                tipo = "📅 Futuro" if p.fecha_evento and p.fecha_evento >= hoy else "⏳ Pasado"
+                with st.expander(f"{tipo} - {p.nombre_cliente} - {p.texto_fecha_evento} (Pedido {p.id_pedido})"):
+                    mostrar_detalle(p, "id")
+
+                    acciones_pedido(p, "id")
+        else:
+            st.warning(f"⚠️ No se encontró ningún pedido con el ID '{id_busqueda}'")
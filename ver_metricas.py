@@ -0,0 +1,60 @@
+import streamlit as st
+import datetime
+import os
+import time
+import metricas
+
+VENTANAS = {
+    "Última hora": 3600,
+    "Últimas 24 horas": 24 * 3600,
+    "Últimos 7 días": 7 * 24 * 3600,
+    "Todo": None,
+}
+
+# =======================
+# Interfaz Streamlit
+# =======================
+st.title("⏱️ Tiempos del flujo de cotización")
+
+ventana = st.sidebar.selectbox("Periodo", list(VENTANAS), index=1)
+segundos = VENTANAS[ventana]
+
+# Lo medido en este proceso que todavía no se escribió
+metricas.vaciar()
+registros = metricas.leer(desde=time.time() - segundos if segundos else None)
+
+if not registros:
+    st.info(f"No hay mediciones en {metricas.METRICAS_FILE} para este periodo.")
+    st.stop()
+
+tamano = os.path.getsize(metricas.METRICAS_FILE) if os.path.exists(metricas.METRICAS_FILE) else 0
+st.caption(f"{len(registros)} mediciones · {metricas.METRICAS_FILE} ({tamano / 1024:.0f} KB)")
+
+# =======================
+# 1. Percentiles por etapa
+# =======================
+st.header("📊 Percentiles por etapa (ms)")
+resumen = metricas.resumen(registros)
+st.bar_chart(
+    [{"etapa": etapa, "p50": r["p50"], "p95": r["p95"]} for etapa, r in resumen.items()],
+    x="etapa", y=["p50", "p95"], stack=False
+)
+st.table([
+    {"Etapa": etapa, "Mediciones": r["n"], "p50": f"{r['p50']:.1f}", "p95": f"{r['p95']:.1f}",
+     "p99": f"{r['p99']:.1f}", "Máximo": f"{r['max']:.1f}"}
+    for etapa, r in resumen.items()
+])
+
+# =======================
+# 2. Cotizaciones más lentas
+# =======================
+st.header("🐢 Cotizaciones más lentas")
+totales = sorted((r for r in registros if r["etapa"] == "total"), key=lambda r: r["ms"], reverse=True)[:10]
+if totales:
+    st.table([
+        {"Cuándo": datetime.datetime.fromtimestamp(r["t"]).strftime("%d-%m-%Y %H:%M:%S"),
+         "Total (s)": f"{r['ms'] / 1000:.2f}", "Desde caché": "♻️" if r.get("cache") else "", "Proceso": r.get("pid")}
+        for r in totales
+    ])
+else:
+    st.info("Todavía no se ha generado ninguna cotización en este periodo.")